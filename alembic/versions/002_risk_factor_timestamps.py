@@ -0,0 +1,27 @@
+"""Add missing risk factor columns
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # The RiskFactor model has always carried these columns; updated_at also
+    # keys the compiled formula cache
+    op.add_column('risk_factors', sa.Column('description', sa.Text(), nullable=True))
+    op.add_column('risk_factors', sa.Column('created_at', sa.DateTime(), nullable=True))
+    op.add_column('risk_factors', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+def downgrade():
+    op.drop_column('risk_factors', 'updated_at')
+    op.drop_column('risk_factors', 'created_at')
+    op.drop_column('risk_factors', 'description')
@@ -0,0 +1,26 @@
+"""Add scorecard content address
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('scorecards', sa.Column('input_hash', sa.String(length=64), nullable=True))
+    op.add_column('scorecards', sa.Column('config_version', sa.Integer(), nullable=True))
+    # Latest scorecard per borrower is looked up on every calculation
+    op.create_index('ix_scorecards_borrower_id_id', 'scorecards', ['borrower_id', 'id'])
+
+def downgrade():
+    op.drop_index('ix_scorecards_borrower_id_id', table_name='scorecards')
+    op.drop_column('scorecards', 'config_version')
+    op.drop_column('scorecards', 'input_hash')
@@ -0,0 +1,29 @@
+"""Add keyset pagination indexes
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Keyset pages ordered by (period_end_date, id), optionally within one borrower
+    op.create_index('ix_trading_accounts_period_end_date_id', 'trading_accounts', ['period_end_date', 'id'])
+    op.create_index('ix_trading_accounts_borrower_id_id', 'trading_accounts', ['borrower_id', 'id'])
+    op.create_index(
+        'ix_trading_accounts_borrower_id_period_end_date_id',
+        'trading_accounts',
+        ['borrower_id', 'period_end_date', 'id']
+    )
+
+def downgrade():
+    op.drop_index('ix_trading_accounts_borrower_id_period_end_date_id', table_name='trading_accounts')
+    op.drop_index('ix_trading_accounts_borrower_id_id', table_name='trading_accounts')
+    op.drop_index('ix_trading_accounts_period_end_date_id', table_name='trading_accounts')
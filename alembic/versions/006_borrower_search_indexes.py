@@ -0,0 +1,68 @@
+"""Add borrower name search indexes
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+# The trigram tokenizer shipped with SQLite 3.34
+_SQLITE_TRIGRAM_VERSION = (3, 34, 0)
+
+def _sqlite_has_trigram(bind):
+    version = bind.execute(sa.text("SELECT sqlite_version()")).scalar()
+    return tuple(int(part) for part in version.split('.')) >= _SQLITE_TRIGRAM_VERSION
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        # Prefix matches as an ordered range scan, substring matches through trigrams
+        op.execute('CREATE INDEX ix_borrowers_name_lower ON borrowers (lower(name) COLLATE "C")')
+        op.execute('CREATE INDEX ix_borrowers_name_trgm ON borrowers USING gin (lower(name) gin_trgm_ops)')
+        return
+
+    op.create_index('ix_borrowers_name_lower', 'borrowers', [sa.text('lower(name)')])
+    if bind.dialect.name != 'sqlite' or not _sqlite_has_trigram(bind):
+        return
+    # External content FTS5 table over borrowers.name, kept in sync by triggers
+    op.execute(
+        "CREATE VIRTUAL TABLE borrowers_fts USING fts5("
+        "name, content='borrowers', content_rowid='id', tokenize='trigram')"
+    )
+    op.execute(
+        "CREATE TRIGGER borrowers_fts_insert AFTER INSERT ON borrowers BEGIN "
+        "INSERT INTO borrowers_fts(rowid, name) VALUES (new.id, new.name); END"
+    )
+    op.execute(
+        "CREATE TRIGGER borrowers_fts_delete AFTER DELETE ON borrowers BEGIN "
+        "INSERT INTO borrowers_fts(borrowers_fts, rowid, name) VALUES ('delete', old.id, old.name); END"
+    )
+    op.execute(
+        "CREATE TRIGGER borrowers_fts_update AFTER UPDATE OF name ON borrowers BEGIN "
+        "INSERT INTO borrowers_fts(borrowers_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+        "INSERT INTO borrowers_fts(rowid, name) VALUES (new.id, new.name); END"
+    )
+    op.execute("INSERT INTO borrowers_fts(borrowers_fts) VALUES ('rebuild')")
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_borrowers_name_trgm')
+        op.execute('DROP INDEX IF EXISTS ix_borrowers_name_lower')
+        return
+
+    if bind.dialect.name == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS borrowers_fts_update')
+        op.execute('DROP TRIGGER IF EXISTS borrowers_fts_delete')
+        op.execute('DROP TRIGGER IF EXISTS borrowers_fts_insert')
+        op.execute('DROP TABLE IF EXISTS borrowers_fts')
+    op.drop_index('ix_borrowers_name_lower', table_name='borrowers')
@@ -0,0 +1,64 @@
+"""Make (borrower, period) unique on trading accounts
+
+Earlier uploads could store a period twice; all but the most recent row
+(highest id) of each borrower and period are deleted. Scorecards of the
+affected borrowers were computed from the deleted rows, so their scores and
+per-account breakdowns are stale: their input_hash and config_version are
+cleared, which makes the next batch run or /scorecards/calculate rescore
+them instead of reusing the memoized result. The number of rows deleted and
+of borrowers affected is logged.
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18
+
+"""
+import logging
+
+from alembic import context, op
+import sqlalchemy as sa
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+SUPERSEDED = (
+    "FROM trading_accounts WHERE id NOT IN ("
+    "SELECT MAX(id) FROM trading_accounts "
+    "GROUP BY borrower_id, period_start_date, period_end_date)"
+)
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Earlier uploads duplicated accounts; keep the most recent row of each period
+    if not context.is_offline_mode():
+        rows, borrowers = op.get_bind().execute(
+            sa.text(f"SELECT COUNT(*), COUNT(DISTINCT borrower_id) {SUPERSEDED}")
+        ).one()
+        if rows:
+            logger.warning("Deleting %d duplicate trading accounts of %d borrowers; "
+                           "their scorecards are stale until rescored", rows, borrowers)
+    # Stop the memo check from reusing scorecards computed from the deleted rows
+    op.execute(
+        "UPDATE scorecards SET input_hash = NULL, config_version = NULL "
+        f"WHERE borrower_id IN (SELECT borrower_id {SUPERSEDED})"
+    )
+    op.execute(f"DELETE {SUPERSEDED}")
+    op.add_column('trading_accounts', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(
+        'ux_trading_accounts_borrower_period',
+        'trading_accounts',
+        ['borrower_id', 'period_start_date', 'period_end_date'],
+        unique=True
+    )
+    op.add_column('upload_jobs', sa.Column('rows_updated', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('upload_jobs', sa.Column('rows_unchanged', sa.Integer(), nullable=False, server_default='0'))
+
+def downgrade():
+    op.drop_column('upload_jobs', 'rows_unchanged')
+    op.drop_column('upload_jobs', 'rows_updated')
+    op.drop_index('ux_trading_accounts_borrower_period', table_name='trading_accounts')
+    op.drop_column('trading_accounts', 'content_hash')
@@ -0,0 +1,32 @@
+"""Run batch scoring as background jobs
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Existing rows are all uploads
+    op.add_column('upload_jobs', sa.Column('kind', sa.String(length=20), nullable=False, server_default='upload'))
+    op.add_column('upload_jobs', sa.Column('parameters', sa.JSON(), nullable=True))
+    op.add_column('upload_jobs', sa.Column('result', sa.JSON(), nullable=True))
+    # Batch scoring jobs have no file; batch mode lets SQLite alter the column
+    with op.batch_alter_table('upload_jobs') as batch_op:
+        batch_op.alter_column('filename', existing_type=sa.String(), nullable=True)
+
+def downgrade():
+    op.execute("DELETE FROM upload_jobs WHERE kind != 'upload'")
+    with op.batch_alter_table('upload_jobs') as batch_op:
+        batch_op.alter_column('filename', existing_type=sa.String(), nullable=False)
+    op.drop_column('upload_jobs', 'result')
+    op.drop_column('upload_jobs', 'parameters')
+    op.drop_column('upload_jobs', 'kind')
@@ -0,0 +1,25 @@
+"""Index trading account financial fields for range filters
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+FIELDS = ('sales', 'purchases', 'total_assets', 'total_liabilities', 'inventory')
+
+def upgrade():
+    # The min_/max_ filters of GET /trading_accounts/ range-scan these
+    for field in FIELDS:
+        op.create_index(f'ix_trading_accounts_{field}', 'trading_accounts', [field])
+
+def downgrade():
+    for field in reversed(FIELDS):
+        op.drop_index(f'ix_trading_accounts_{field}', table_name='trading_accounts')
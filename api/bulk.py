@@ -0,0 +1,120 @@
+"""
+Shared plumbing for the bulk create endpoints.
+
+A bulk request is a JSON array of up to ``BULK_MAX_ITEMS`` items. The whole
+array is validated in one pass with a Pydantic ``TypeAdapter``, endpoints
+add their own per-item checks, and the surviving items are inserted with a
+single executemany INSERT ... RETURNING in one transaction, so ids come back
+in request order.
+
+``mode=atomic`` (the default) rejects the request with 422 if any item
+fails and writes nothing; ``mode=partial`` writes the valid items and
+reports the others. Either way the response lists errors by array index.
+"""
+import os
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy import Table, insert
+from sqlalchemy.orm import Session
+
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "10000"))
+
+
+class BulkParams:
+    """The ``mode`` query parameter."""
+
+    def __init__(self, mode: str = Query("atomic", pattern="^(atomic|partial)$")):
+        self.mode = mode
+
+
+class BulkError(BaseModel):
+    index: int
+    message: str
+
+
+class BulkResponse(BaseModel):
+    mode: str
+    created: int
+    # Items that matched an existing row (trading accounts with on_conflict=update),
+    # split into rows whose figures changed and rows left as they were
+    updated: int = 0
+    unchanged: int = 0
+    failed: int
+    # One entry per request item, None where the item was not written
+    ids: List[Optional[int]]
+    errors: List[BulkError]
+
+
+class BulkErrors:
+    """Per-item error messages collected while checking a bulk request."""
+
+    def __init__(self):
+        self.by_index: Dict[int, List[str]] = defaultdict(list)
+
+    def add(self, index: int, message: str) -> None:
+        self.by_index[index].append(message)
+
+    def __contains__(self, index: int) -> bool:
+        return index in self.by_index
+
+    def as_list(self) -> List[Dict[str, Any]]:
+        return [
+            {'index': index, 'message': message}
+            for index in sorted(self.by_index)
+            for message in self.by_index[index]
+        ]
+
+
+def check_size(items: Sequence[Any]) -> None:
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} items per bulk request")
+
+
+def validate_items(model: Type[BaseModel], items: List[Any], errors: BulkErrors) -> List[Tuple[int, BaseModel]]:
+    """Validate every item against ``model``; returns (index, instance) for the valid ones."""
+    check_size(items)
+    adapter = TypeAdapter(List[model])
+    try:
+        return list(enumerate(adapter.validate_python(items)))
+    except ValidationError as e:
+        for error in e.errors():
+            index, *field = error['loc']
+            location = '.'.join(str(part) for part in field)
+            errors.add(index, f"{location}: {error['msg']}" if location else error['msg'])
+    item_adapter = TypeAdapter(model)
+    return [(index, item_adapter.validate_python(item)) for index, item in enumerate(items) if index not in errors]
+
+
+def raise_if_atomic(params: BulkParams, errors: BulkErrors) -> None:
+    """In atomic mode any item error fails the whole request before anything is written."""
+    if params.mode == 'atomic' and errors.by_index:
+        raise HTTPException(status_code=422, detail={
+            'message': "No items were written because some items are invalid",
+            'errors': errors.as_list(),
+        })
+
+
+def insert_returning_ids(db: Session, table: Table, rows: List[Dict[str, Any]]) -> List[int]:
+    """Insert ``rows`` with one executemany statement; ids in the order of ``rows``."""
+    if not rows:
+        return []
+    result = db.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows)
+    return list(result.scalars())
+
+
+def bulk_response(params: BulkParams, total: int, ids_by_index: Dict[int, int], errors: BulkErrors,
+                  updated: int = 0, unchanged: int = 0) -> Dict[str, Any]:
+    """``ids_by_index`` maps request positions to the ids written or matched; ``updated``
+    of them are existing rows that were changed and ``unchanged`` existing rows left as is."""
+    return {
+        'mode': params.mode,
+        'created': len(ids_by_index) - updated - unchanged,
+        'updated': updated,
+        'unchanged': unchanged,
+        'failed': total - len(ids_by_index),
+        'ids': [ids_by_index.get(index) for index in range(total)],
+        'errors': errors.as_list(),
+    }
@@ -1,8 +1,19 @@
+import os
 from fastapi import APIRouter
 from .borrowers import router as borrowers_router
 from .inventory import router as inventory_router
 from .trading_accounts import router as trading_accounts_router
 from .risk_factors import router as risk_factors_router
+from .scorecards import router as scorecards_router
+from .jobs import router as jobs_router
+from .dashboard import router as dashboard_router
+from .debug import router as debug_router
+from .profiles import router as profiles_router
+from services.profiling import ENABLED as PROFILING_ENABLED
+
+# /debug exposes per-worker pool and SQL statistics without authentication;
+# it is only mounted when explicitly enabled
+DEBUG_ENDPOINTS = os.getenv("DEBUG_ENDPOINTS", "false").lower() in ("1", "true", "yes")
 
 router = APIRouter()
 
@@ -11,3 +22,10 @@ router.include_router(borrowers_router)
 router.include_router(inventory_router)
 router.include_router(trading_accounts_router)
 router.include_router(risk_factors_router)
+router.include_router(scorecards_router)
+router.include_router(jobs_router)
+router.include_router(dashboard_router)
+if DEBUG_ENDPOINTS:
+    router.include_router(debug_router)
+if PROFILING_ENABLED:
+    router.include_router(profiles_router)
@@ -1,19 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, List
 from pydantic import BaseModel
-from models.database import SessionLocal
+from api.bulk import BulkErrors, BulkParams, BulkResponse, bulk_response, insert_returning_ids, raise_if_atomic, validate_items
+from api.pagination import PageParams, paginate_async
+from models.database import get_async_db, get_db
 from models.entities import Borrower
+from services.borrower_search import invalidate_search_index, search_borrowers
 
 router = APIRouter(prefix="/borrowers", tags=["Borrowers"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 class BorrowerCreate(BaseModel):
     name: str
 
@@ -30,16 +28,42 @@ def create_borrower(borrower: BorrowerCreate, db: Session = Depends(get_db)):
     db.add(db_borrower)
     db.commit()
     db.refresh(db_borrower)
+    invalidate_search_index()
     return db_borrower
 
+@router.post("/bulk", response_model=BulkResponse)
+def create_borrowers_bulk(
+    items: List[Any] = Body(..., description="JSON array of borrowers"),
+    params: BulkParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    """Create many borrowers in one transaction; ids are returned in request order"""
+    errors = BulkErrors()
+    valid = validate_items(BorrowerCreate, items, errors)
+    raise_if_atomic(params, errors)
+    ids = insert_returning_ids(db, Borrower.__table__, [borrower.dict() for _, borrower in valid])
+    db.commit()
+    if ids:
+        invalidate_search_index()
+    return bulk_response(params, len(items), dict(zip((index for index, _ in valid), ids)), errors)
+
 @router.get("/", response_model=List[BorrowerResponse])
-def list_borrowers(db: Session = Depends(get_db)):
-    borrowers = db.query(Borrower).all()
-    return borrowers
+async def list_borrowers(response: Response, page: PageParams = Depends(), db: AsyncSession = Depends(get_async_db)):
+    """One page of borrowers by id; the next page's cursor is in the X-Next-Cursor header"""
+    return await paginate_async(db, select(Borrower), Borrower, page, response)
+
+@router.get("/search", response_model=List[BorrowerResponse])
+def search(
+    q: str = Query(..., min_length=1, max_length=200, description="Prefix or substring of the name"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    """Best matching borrowers by name: exact, then prefix, then substring matches"""
+    return [{'id': borrower_id, 'name': name} for borrower_id, name in search_borrowers(db, q, limit)]
 
 @router.get("/{borrower_id}", response_model=BorrowerResponse)
-def get_borrower(borrower_id: int, db: Session = Depends(get_db)):
-    db_borrower = db.query(Borrower).filter(Borrower.id == borrower_id).first()
+async def get_borrower(borrower_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_borrower = await db.get(Borrower, borrower_id)
     if not db_borrower:
         raise HTTPException(status_code=404, detail="Borrower not found")
     return db_borrower
@@ -52,6 +76,7 @@ def update_borrower(borrower_id: int, borrower: BorrowerCreate, db: Session = De
     db_borrower.name = borrower.name
     db.commit()
     db.refresh(db_borrower)
+    invalidate_search_index()
     return db_borrower
 
 @router.delete("/{borrower_id}")
@@ -61,4 +86,5 @@ def delete_borrower(borrower_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Borrower not found")
     db.delete(db_borrower)
     db.commit()
+    invalidate_search_index()
     return {"detail": "Borrower deleted"}
\ No newline at end of file
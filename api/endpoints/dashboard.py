@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from pydantic import BaseModel
+from datetime import date, datetime
+from models.database import get_db
+from services.dashboard import portfolio_summary
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+class Counts(BaseModel):
+    borrowers: int
+    trading_accounts: int
+    risk_factors: int
+    inventory_items: int
+    scorecards: int
+
+class AccountTotals(BaseModel):
+    borrowers_with_accounts: int
+    sales: float
+    purchases: float
+    total_assets: float
+    total_liabilities: float
+    inventory: float
+    latest_period_end: Optional[date] = None
+
+class LatestScores(BaseModel):
+    scored_borrowers: int
+    average: Optional[float] = None
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+
+class RiskClassSummary(BaseModel):
+    risk_classification: Optional[str] = None
+    borrowers: int
+    average_score: Optional[float] = None
+
+class InventoryTotals(BaseModel):
+    quantity: int
+    total_value: float
+
+class BorrowerTotals(BaseModel):
+    borrower_id: int
+    name: str
+    accounts: int
+    sales: float
+    total_assets: float
+    total_liabilities: float
+    final_score: Optional[float] = None
+    risk_classification: Optional[str] = None
+
+class RecentScorecard(BaseModel):
+    id: int
+    borrower_id: int
+    borrower_name: Optional[str] = None
+    final_score: float
+    risk_classification: Optional[str] = None
+    generated_at: Optional[datetime] = None
+
+class DashboardSummary(BaseModel):
+    counts: Counts
+    trading_accounts: AccountTotals
+    latest_scores: LatestScores
+    risk_classes: List[RiskClassSummary]
+    inventory: InventoryTotals
+    top_borrowers: List[BorrowerTotals]
+    recent_scorecards: List[RecentScorecard]
+    computed_at: datetime
+
+@router.get("/summary", response_model=DashboardSummary)
+def get_summary(
+    top: int = Query(5, ge=0, le=50, description="Borrowers to list by total sales"),
+    fresh: bool = Query(False, description="Bypass the short-lived summary cache"),
+    db: Session = Depends(get_db)
+):
+    """Portfolio counts and totals, aggregated in the database; the risk class
+    distribution and scores use each borrower's latest scorecard"""
+    return portfolio_summary(db, top, max_age=0 if fresh else None)
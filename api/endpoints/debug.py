@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Query
+from models.database import pool_stats
+from services.sql_stats import top_statements
+
+# Read-only operational introspection; only mounted when DEBUG_ENDPOINTS is set
+router = APIRouter(prefix="/debug", tags=["Debug"])
+
+@router.get("/pool-stats")
+def get_pool_stats():
+    """This worker's connection pools: size, checked out, overflow, checkout waits and timeouts"""
+    return pool_stats()
+
+@router.get("/sql-stats")
+def get_sql_stats(
+    top: int = Query(20, ge=1, le=500),
+    sort: str = Query("total", pattern="^(total|mean|max|count)$")
+):
+    """This worker's most expensive statements, normalized, with counts and latencies"""
+    return top_statements(top, sort)
@@ -1,20 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel, Field
 from datetime import datetime
-from models.database import SessionLocal
+from api.pagination import PageParams, paginate_async
+from models.database import get_async_db, get_db
 from models.inventory import InventoryItem
 
 router = APIRouter(prefix="/inventory", tags=["Inventory"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 class InventoryItemCreate(BaseModel):
     item_name: str = Field(...)
     quantity: int = Field(...)
@@ -33,7 +29,7 @@ class InventoryItemResponse(BaseModel):
     quantity: int
     unit_price: float
     total_value: float
-    location: str = None
+    location: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
@@ -54,8 +50,8 @@ def create_inventory_item(item: InventoryItemCreate, db: Session = Depends(get_d
     return db_item
 
 @router.get("/{item_id}", response_model=InventoryItemResponse)
-def get_inventory_item(item_id: int, db: Session = Depends(get_db)):
-    db_item = db.query(InventoryItem).filter(InventoryItem.id == item_id).first()
+async def get_inventory_item(item_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_item = await db.get(InventoryItem, item_id)
     if not db_item:
         raise HTTPException(status_code=404, detail="Inventory item not found")
     return db_item
@@ -81,7 +77,21 @@ def delete_inventory_item(item_id: int, db: Session = Depends(get_db)):
     db.commit()
     return {"detail": "Inventory item deleted"}
 
-@router.get("/", response_model=List[dict])
-def list_inventory_items(db: Session = Depends(get_db)):
-    # Return empty list for now to get the frontend working
-    return []
+@router.get("/", response_model=List[InventoryItemResponse])
+async def list_inventory_items(
+    response: Response,
+    page: PageParams = Depends(),
+    location: Optional[str] = None,
+    min_quantity: Optional[int] = None,
+    max_quantity: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """One page of inventory items by id; the next page's cursor is in the X-Next-Cursor header"""
+    query = select(InventoryItem)
+    if location is not None:
+        query = query.filter(InventoryItem.location == location)
+    if min_quantity is not None:
+        query = query.filter(InventoryItem.quantity >= min_quantity)
+    if max_quantity is not None:
+        query = query.filter(InventoryItem.quantity <= max_quantity)
+    return await paginate_async(db, query, InventoryItem, page, response)
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+from datetime import datetime
+from models.database import get_db
+from models.upload_job import UploadJob
+from services.upload_jobs import job_status
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+class RowError(BaseModel):
+    row: int
+    column: str
+    value: Optional[str] = None
+    message: str
+
+class JobResponse(BaseModel):
+    # Batch scoring jobs count borrowers in the rows_* fields and report their summary in result
+    id: int
+    kind: str
+    status: str
+    filename: Optional[str] = None
+    total_rows: Optional[int] = None
+    rows_read: int
+    rows_inserted: int
+    rows_updated: int
+    rows_unchanged: int
+    rows_rejected: int
+    progress: Optional[float] = None
+    rows_per_second: Optional[float] = None
+    errors: List[RowError]
+    errors_truncated: bool
+    message: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    """Progress, throughput and row errors of a background upload or batch scoring run"""
+    job = db.get(UploadJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException, Query, Response
+from services.profiling import ProfileError, collapsed, load_profile, speedscope
+
+# Request profiles; only mounted when profiling is configured. Profile ids are
+# random and only handed to signed or operator-selected requests.
+router = APIRouter(prefix="/profiles", tags=["Profiling"])
+
+@router.get("/{profile_id}")
+def get_profile(
+    profile_id: str,
+    format: str = Query("collapsed", pattern="^(collapsed|speedscope|meta)$")
+):
+    """A request profile as collapsed stacks (flamegraph.pl, speedscope), speedscope JSON, or its metadata"""
+    try:
+        found = load_profile(profile_id)
+    except ProfileError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if found is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    meta, samples = found
+    if format == "meta":
+        return meta
+    if format == "speedscope":
+        name = f"{meta['method']} {meta['path']} ({meta['duration_ms']:.0f} ms)"
+        return speedscope(samples, name, meta["interval_ms"] / 1000)
+    return Response(collapsed(samples), media_type="text/plain")
@@ -1,20 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel, Field
-from models.database import SessionLocal
+from api.bulk import BulkErrors, BulkParams, BulkResponse, bulk_response, insert_returning_ids, raise_if_atomic, validate_items
+from api.pagination import PageParams, paginate_async
+from models.database import get_async_db, get_db
 from models.risk_factors import RiskFactor
+from services.formula import FormulaError, compile_formula
+from services.rating_scale import RatingScaleError, compile_rating_scale
+from services.risk_config import bump_config_version, invalidate_risk_config
+from services.rescoring import rescore_factor_change, rescore_factors_change
 from datetime import datetime
 
 router = APIRouter(prefix="/risk_factors", tags=["Risk Factors"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 class RatingScale(BaseModel):
     min: float
     max: float
@@ -39,54 +40,124 @@ class RiskFactorUpdate(BaseModel):
 class RiskFactorResponse(BaseModel):
     id: int
     name: str
-    description: str = None
+    description: Optional[str] = None
     factor_type: str
-    formula: str = None
+    formula: Optional[str] = None
     weight: float
-    rating_scale: Dict[str, Dict[str, float]]
+    rating_scale: Optional[Dict[str, Dict[str, float]]] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True
 
+def validate_formula(formula: str):
+    """Compile a formula up front so invalid ones are rejected before they are stored"""
+    if not formula:
+        return
+    try:
+        compile_formula(formula)
+    except FormulaError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid formula: {str(e)}")
+
+def validate_rating_scale(rating_scale: Dict[str, Dict[str, float]]):
+    try:
+        compile_rating_scale(rating_scale)
+    except RatingScaleError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid rating scale: {str(e)}")
+
 @router.post("/", response_model=RiskFactorResponse)
-def create_risk_factor(risk_factor: RiskFactorCreate, db: Session = Depends(get_db)):
+def create_risk_factor(risk_factor: RiskFactorCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    validate_formula(risk_factor.formula)
+    validate_rating_scale(risk_factor.rating_scale)
     db_risk_factor = RiskFactor(**risk_factor.dict())
     db.add(db_risk_factor)
+    bump_config_version(db)
     db.commit()
     db.refresh(db_risk_factor)
+    invalidate_risk_config(db_risk_factor.id)
+    background_tasks.add_task(rescore_factor_change, db_risk_factor.id)
     return db_risk_factor
 
+@router.post("/bulk", response_model=BulkResponse)
+def create_risk_factors_bulk(
+    background_tasks: BackgroundTasks,
+    items: List[Any] = Body(..., description="JSON array of risk factors"),
+    params: BulkParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    """Create many risk factors under a single config version bump; ids are returned in request order"""
+    errors = BulkErrors()
+    valid = []
+    for index, risk_factor in validate_items(RiskFactorCreate, items, errors):
+        try:
+            if risk_factor.formula:
+                compile_formula(risk_factor.formula)
+        except FormulaError as e:
+            errors.add(index, f"Invalid formula: {str(e)}")
+        try:
+            compile_rating_scale(risk_factor.rating_scale)
+        except RatingScaleError as e:
+            errors.add(index, f"Invalid rating scale: {str(e)}")
+        if index not in errors:
+            valid.append((index, risk_factor))
+    raise_if_atomic(params, errors)
+    ids = insert_returning_ids(db, RiskFactor.__table__, [risk_factor.dict() for _, risk_factor in valid])
+    if ids:
+        bump_config_version(db)
+    db.commit()
+    for factor_id in ids:
+        invalidate_risk_config(factor_id)
+    if ids:
+        background_tasks.add_task(rescore_factors_change, ids)
+    return bulk_response(params, len(items), dict(zip((index for index, _ in valid), ids)), errors)
+
 @router.get("/{factor_id}", response_model=RiskFactorResponse)
-def get_risk_factor(factor_id: int, db: Session = Depends(get_db)):
-    db_risk_factor = db.query(RiskFactor).filter(RiskFactor.id == factor_id).first()
+async def get_risk_factor(factor_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_risk_factor = await db.get(RiskFactor, factor_id)
     if not db_risk_factor:
         raise HTTPException(status_code=404, detail="Risk factor not found")
     return db_risk_factor
 
 @router.put("/{factor_id}", response_model=RiskFactorResponse)
-def update_risk_factor(factor_id: int, risk_factor: RiskFactorUpdate, db: Session = Depends(get_db)):
+def update_risk_factor(factor_id: int, risk_factor: RiskFactorUpdate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     db_risk_factor = db.query(RiskFactor).filter(RiskFactor.id == factor_id).first()
     if not db_risk_factor:
         raise HTTPException(status_code=404, detail="Risk factor not found")
     update_data = risk_factor.dict(exclude_unset=True)
+    validate_formula(update_data.get('formula'))
+    validate_rating_scale(update_data.get('rating_scale'))
     for key, value in update_data.items():
         setattr(db_risk_factor, key, value)
+    bump_config_version(db)
     db.commit()
     db.refresh(db_risk_factor)
+    invalidate_risk_config(factor_id)
+    # Recompute just this factor's column in the stored scorecards
+    background_tasks.add_task(rescore_factor_change, factor_id)
     return db_risk_factor
 
 @router.delete("/{factor_id}")
-def delete_risk_factor(factor_id: int, db: Session = Depends(get_db)):
+def delete_risk_factor(factor_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     db_risk_factor = db.query(RiskFactor).filter(RiskFactor.id == factor_id).first()
     if not db_risk_factor:
         raise HTTPException(status_code=404, detail="Risk factor not found")
     db.delete(db_risk_factor)
+    bump_config_version(db)
     db.commit()
+    invalidate_risk_config(factor_id)
+    background_tasks.add_task(rescore_factor_change, factor_id)
     return {"detail": "Risk factor deleted"}
 
-@router.get("/", response_model=List[dict])
-def list_risk_factors(db: Session = Depends(get_db)):
-    # Return empty list for now to get the frontend working
-    return []
+@router.get("/", response_model=List[RiskFactorResponse])
+async def list_risk_factors(
+    response: Response,
+    page: PageParams = Depends(),
+    factor_type: Optional[str] = Query(None, pattern="^(financial|non_financial)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """One page of risk factors by id; the next page's cursor is in the X-Next-Cursor header"""
+    query = select(RiskFactor)
+    if factor_type is not None:
+        query = query.filter(RiskFactor.factor_type == factor_type)
+    return await paginate_async(db, query, RiskFactor, page, response)
@@ -1,54 +1,269 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from models.database import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, defer
+from api.export import ExportParams, stream_export
+from api.endpoints.jobs import JobResponse
+from api.pagination import PageParams, paginate_async
+from models.database import get_async_db, get_db
+from models.entities import Borrower
 from models.scorecard import Scorecard
 from services.calculation_service import CalculationService
-from pydantic import BaseModel
-from typing import List
+from services.upload_jobs import job_status, queue_batch, submit
+from services.stress_testing import StressSpec, run_stress_test
+from services.what_if import build_scenarios, run_what_if
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
 import datetime
 
 router = APIRouter(prefix="/scorecards", tags=["scorecards"])
 
-# Dependency to get database session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 class ScorecardCreate(BaseModel):
     borrower_id: int
-    trading_account_id: int
+    trading_account_id: Optional[int] = None
 
 class ScorecardResponse(BaseModel):
     id: int
     borrower_id: int
-    trading_account_id: int
-    risk_factor_id: int
-    score: float
-    created_at: datetime.datetime
+    final_score: float
+    score_breakdown: Optional[Dict[str, Any]] = None
+    risk_classification: Optional[str] = None
+    generated_at: datetime.datetime
 
     class Config:
         from_attributes = True
 
-@router.get("/", response_model=List[dict])
-def get_all_scorecards(db: Session = Depends(get_db)):
-    """Get all scorecards"""
-    # Return empty list for now to get the frontend working
-    return []
+class ScorecardSummary(BaseModel):
+    id: int
+    borrower_id: int
+    final_score: float
+    risk_classification: Optional[str] = None
+    generated_at: datetime.datetime
+
+    class Config:
+        from_attributes = True
+
+class AccountFactorScore(BaseModel):
+    trading_account_id: int
+    ratio: Optional[float] = None
+    band: Optional[str] = None
+    rating: float
+    contribution: float
+
+class FactorScore(BaseModel):
+    factor_id: int
+    name: str
+    weight: float
+    contribution: float
+    accounts: List[AccountFactorScore] = []
+
+class NonFinancialScore(BaseModel):
+    name: str
+    weight: float
+    score: float
+    contribution: float
+
+class ScoreBreakdownResponse(BaseModel):
+    scorecard_id: int
+    borrower_id: int
+    final_score: float
+    risk_classification: Optional[str] = None
+    generated_at: datetime.datetime
+    config_version: Optional[int] = None
+    factors: List[FactorScore]
+    non_financial: List[NonFinancialScore]
+
+class BorrowerFilter(BaseModel):
+    name_contains: Optional[str] = None
+    period_from: Optional[datetime.date] = None
+    period_to: Optional[datetime.date] = None
+
+class BatchScoreRequest(BaseModel):
+    # Exactly one of borrower_ids, filter or whole_portfolio selects the borrowers
+    borrower_ids: Optional[List[int]] = None
+    filter: Optional[BorrowerFilter] = None
+    whole_portfolio: bool = False
+    chunk_size: Optional[int] = Field(None, gt=0, le=50000)
+    max_workers: Optional[int] = Field(None, gt=0, le=64)
+
+class WhatIfScenario(BaseModel):
+    name: Optional[str] = None
+    # Relative change per trading account field, e.g. {"sales": -0.2} for a 20% drop
+    shocks: Dict[str, float]
+
+class WhatIfRequest(BaseModel):
+    # Either borrower_ids or whole_portfolio selects the borrowers
+    borrower_ids: Optional[List[int]] = None
+    whole_portfolio: bool = False
+    scenarios: List[WhatIfScenario] = []
+    # Field -> list of relative shocks; every combination becomes a scenario
+    grid: Optional[Dict[str, List[float]]] = None
+    include_borrowers: bool = True
+
+class WhatIfScenarioResult(BaseModel):
+    name: str
+    shocks: Dict[str, float]
+    mean_delta: float
+    min_delta: float
+    max_delta: float
+    downgrades: int
+    upgrades: int
+    scores: Optional[List[float]] = None
+    deltas: Optional[List[float]] = None
+
+class WhatIfResponse(BaseModel):
+    config_version: int
+    borrower_ids: List[int]
+    baseline_scores: List[float]
+    accounts: int
+    scenarios: List[WhatIfScenarioResult]
+    elapsed_seconds: float
+
+class ShockDistribution(BaseModel):
+    distribution: Literal['normal', 'lognormal', 'uniform'] = 'normal'
+    # normal: relative shock mean/std; lognormal: mean/std of the log multiplier
+    mean: float = 0.0
+    std: float = 0.0
+    # uniform: relative shock range
+    low: float = 0.0
+    high: float = 0.0
+
+class StressTestRequest(BaseModel):
+    # Either borrower_ids or whole_portfolio selects the borrowers
+    borrower_ids: Optional[List[int]] = None
+    whole_portfolio: bool = False
+    draws: int = Field(10000, gt=0, le=10_000_000)
+    seed: int = 0
+    shocks: Dict[str, ShockDistribution]
+    # Correlations between shocked fields, rows and columns in the order of shocks
+    correlation: Optional[List[List[float]]] = None
+    # Draw a separate shock for every account instead of one per draw for the portfolio
+    per_account: bool = False
+    histogram_bins: int = Field(20, gt=0, le=200)
+    chunk_size: Optional[int] = Field(None, gt=0, le=100000)
+    max_workers: Optional[int] = Field(None, gt=0, le=64)
+    include_borrowers: bool = True
+
+class ClassificationDistribution(BaseModel):
+    mean: float
+    std: float
+    p05: int
+    p50: int
+    p95: int
+
+class ScoreHistogram(BaseModel):
+    low: float
+    high: float
+    counts: List[int]
+
+class BorrowerScoreDistribution(BaseModel):
+    borrower_id: int
+    mean: float
+    std: float
+    min: float
+    max: float
+    classification_probabilities: Dict[str, float]
+    histogram: ScoreHistogram
+
+class StressTestResponse(BaseModel):
+    config_version: int
+    draws: int
+    seed: int
+    chunk_size: int
+    chunks: int
+    workers: int
+    borrowers: int
+    accounts: int
+    classifications: Dict[str, ClassificationDistribution]
+    elapsed_seconds: float
+    borrower_scores: Optional[List[BorrowerScoreDistribution]] = None
+
+class ScorecardFilters:
+    """Server-side filters for the scorecard list and export"""
+    def __init__(
+        self,
+        borrower_id: Optional[int] = None,
+        risk_classification: Optional[str] = None,
+        min_score: Optional[float] = None,
+        max_score: Optional[float] = None,
+    ):
+        self.borrower_id = borrower_id
+        self.risk_classification = risk_classification
+        self.min_score = min_score
+        self.max_score = max_score
+
+    def apply(self, query):
+        if self.borrower_id is not None:
+            query = query.filter(Scorecard.borrower_id == self.borrower_id)
+        if self.risk_classification is not None:
+            query = query.filter(Scorecard.risk_classification == self.risk_classification)
+        if self.min_score is not None:
+            query = query.filter(Scorecard.final_score >= self.min_score)
+        if self.max_score is not None:
+            query = query.filter(Scorecard.final_score <= self.max_score)
+        return query
+
+@router.get("/", response_model=List[ScorecardSummary])
+async def get_all_scorecards(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: ScorecardFilters = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """One page of scorecards by id, without breakdowns; the next page's cursor is in the X-Next-Cursor header"""
+    query = filters.apply(select(Scorecard).options(defer(Scorecard.score_breakdown)))
+    return await paginate_async(db, query, Scorecard, page, response)
+
+@router.get("/export")
+def export_scorecards(
+    params: ExportParams = Depends(),
+    filters: ScorecardFilters = Depends(),
+    include_breakdown: bool = Query(False, description="Add the stored score breakdown as JSON")
+):
+    """Stream every matching scorecard as CSV or NDJSON"""
+    columns = [
+        Scorecard.id, Scorecard.borrower_id, Scorecard.final_score, Scorecard.risk_classification,
+        Scorecard.generated_at, Scorecard.config_version, Scorecard.input_hash,
+    ]
+    if include_breakdown:
+        columns.append(Scorecard.score_breakdown)
+    statement = filters.apply(select(*columns).order_by(Scorecard.id))
+    return stream_export(statement, params, "scorecards")
 
 @router.get("/{scorecard_id}", response_model=ScorecardResponse)
-def get_scorecard(scorecard_id: int, db: Session = Depends(get_db)):
+async def get_scorecard(scorecard_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific scorecard by ID"""
-    scorecard = db.query(Scorecard).filter(Scorecard.id == scorecard_id).first()
+    scorecard = await db.get(Scorecard, scorecard_id)
     if not scorecard:
         raise HTTPException(status_code=404, detail="Scorecard not found")
     return scorecard
 
+@router.get("/{scorecard_id}/breakdown", response_model=ScoreBreakdownResponse)
+async def get_scorecard_breakdown(scorecard_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Explain a scorecard from the breakdown stored when it was scored"""
+    scorecard = await db.get(Scorecard, scorecard_id)
+    if not scorecard:
+        raise HTTPException(status_code=404, detail="Scorecard not found")
+    if not scorecard.score_breakdown:
+        raise HTTPException(status_code=404, detail="Scorecard has no stored breakdown; recalculate it")
+    return {
+        'scorecard_id': scorecard.id,
+        'borrower_id': scorecard.borrower_id,
+        'final_score': scorecard.final_score,
+        'risk_classification': scorecard.risk_classification,
+        'generated_at': scorecard.generated_at,
+        'config_version': scorecard.score_breakdown.get('config_version'),
+        'factors': scorecard.score_breakdown.get('factors', []),
+        'non_financial': scorecard.score_breakdown.get('non_financial', []),
+    }
+
 @router.post("/calculate", response_model=ScorecardResponse)
 def calculate_scorecard(scorecard_data: ScorecardCreate, db: Session = Depends(get_db)):
     """Calculate and create a new scorecard"""
+    # Sync def: the service queries, evaluates formulas and writes on the threadpool,
+    # keeping that work off the event loop
+    if not db.get(Borrower, scorecard_data.borrower_id):
+        raise HTTPException(status_code=404, detail="Borrower not found")
     try:
         # Use the calculation service to generate scorecard
         calculation_service = CalculationService(db)
@@ -60,13 +275,83 @@ def calculate_scorecard(scorecard_data: ScorecardCreate, db: Session = Depends(g
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error calculating scorecard: {str(e)}")
 
+@router.post("/batch", response_model=JobResponse, status_code=202)
+def calculate_scorecards_batch(request: BatchScoreRequest, db: Session = Depends(get_db)):
+    """Queue a parallel scoring run that bulk-inserts one scorecard per borrower.
+
+    Returns the job at once; poll GET /jobs/{id} for progress and, once it succeeds, the run's summary.
+    """
+    modes = [request.borrower_ids is not None, request.filter is not None, request.whole_portfolio]
+    if sum(modes) != 1:
+        raise HTTPException(
+            status_code=400,
+            detail="Specify exactly one of borrower_ids, filter or whole_portfolio"
+        )
+    batch_filter = request.filter or BorrowerFilter()
+    job = queue_batch(
+        db,
+        borrower_ids=request.borrower_ids,
+        name_contains=batch_filter.name_contains,
+        period_from=batch_filter.period_from,
+        period_to=batch_filter.period_to,
+        chunk_size=request.chunk_size,
+        max_workers=request.max_workers,
+    )
+    submit(job.id)
+    return job_status(job)
+
+@router.post("/what-if", response_model=WhatIfResponse)
+def what_if_scorecards(request: WhatIfRequest, db: Session = Depends(get_db)):
+    """Score shocked copies of borrowers' trading accounts without saving anything"""
+    if (request.borrower_ids is not None) == request.whole_portfolio:
+        raise HTTPException(status_code=400, detail="Specify exactly one of borrower_ids or whole_portfolio")
+    try:
+        scenarios = build_scenarios(
+            [(scenario.name, scenario.shocks) for scenario in request.scenarios],
+            request.grid,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return run_what_if(db, request.borrower_ids, scenarios, include_borrowers=request.include_borrowers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error running what-if analysis: {str(e)}")
+
+@router.post("/stress-test", response_model=StressTestResponse)
+def stress_test_scorecards(request: StressTestRequest, db: Session = Depends(get_db)):
+    """Monte Carlo distribution of scores and risk classifications under random shocks"""
+    if (request.borrower_ids is not None) == request.whole_portfolio:
+        raise HTTPException(status_code=400, detail="Specify exactly one of borrower_ids or whole_portfolio")
+    try:
+        spec = StressSpec(
+            {field: shock.model_dump() for field, shock in request.shocks.items()},
+            correlation=request.correlation,
+            per_account=request.per_account,
+            histogram_bins=request.histogram_bins,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return run_stress_test(
+            db,
+            request.borrower_ids,
+            spec,
+            draws=request.draws,
+            seed=request.seed,
+            chunk_size=request.chunk_size,
+            max_workers=request.max_workers,
+            include_borrowers=request.include_borrowers,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error running stress test: {str(e)}")
+
 @router.delete("/{scorecard_id}")
-def delete_scorecard(scorecard_id: int, db: Session = Depends(get_db)):
+async def delete_scorecard(scorecard_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a scorecard"""
-    scorecard = db.query(Scorecard).filter(Scorecard.id == scorecard_id).first()
+    scorecard = await db.get(Scorecard, scorecard_id)
     if not scorecard:
         raise HTTPException(status_code=404, detail="Scorecard not found")
     
-    db.delete(scorecard)
-    db.commit()
+    await db.delete(scorecard)
+    await db.commit()
     return {"message": "Scorecard deleted successfully"}
\ No newline at end of file
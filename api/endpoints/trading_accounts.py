@@ -1,21 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException, Query, Response, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
-from models.database import SessionLocal
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.exc import IntegrityError
+from api.bulk import BulkErrors, BulkParams, BulkResponse, bulk_response, insert_returning_ids, raise_if_atomic, validate_items
+from api.export import ExportParams, stream_export
+from api.pagination import PageParams, paginate_async
+from models.database import get_async_db, get_db
 from models.entities import TradingAccount, Borrower
-import pandas as pd
-from io import BytesIO
+from services.ingestion import (
+    KEY_COLUMNS, NUMERIC_COLUMNS, IngestionError, account_content_hash, ingest_trading_accounts, upload_summary,
+)
+from services.formula import ACCOUNT_FIELDS
+from services.rescoring import rescore_account_change, rescore_borrowers
+from services.upload_jobs import job_status, stage_upload, submit
 from datetime import datetime, date
 
 router = APIRouter(prefix="/trading_accounts", tags=["Trading Accounts"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+DUPLICATE_PERIOD = "A trading account for this borrower and period already exists"
 
 class TradingAccountCreate(BaseModel):
     borrower_id: int
@@ -57,75 +62,225 @@ class TradingAccountResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class TradingAccountFilters:
+    """Server-side filters for the trading account list"""
+    def __init__(
+        self,
+        borrower_id: Optional[int] = None,
+        period_from: Optional[date] = Query(None, description="Earliest period_end_date"),
+        period_to: Optional[date] = Query(None, description="Latest period_end_date"),
+        min_sales: Optional[float] = None,
+        max_sales: Optional[float] = None,
+        min_purchases: Optional[float] = None,
+        max_purchases: Optional[float] = None,
+        min_total_assets: Optional[float] = None,
+        max_total_assets: Optional[float] = None,
+        min_total_liabilities: Optional[float] = None,
+        max_total_liabilities: Optional[float] = None,
+        min_inventory: Optional[float] = None,
+        max_inventory: Optional[float] = None,
+    ):
+        self.borrower_id = borrower_id
+        self.period_from = period_from
+        self.period_to = period_to
+        self.ranges = {
+            'sales': (min_sales, max_sales),
+            'purchases': (min_purchases, max_purchases),
+            'total_assets': (min_total_assets, max_total_assets),
+            'total_liabilities': (min_total_liabilities, max_total_liabilities),
+            'inventory': (min_inventory, max_inventory),
+        }
+
+    def apply(self, query):
+        if self.borrower_id is not None:
+            query = query.filter(TradingAccount.borrower_id == self.borrower_id)
+        if self.period_from is not None:
+            query = query.filter(TradingAccount.period_end_date >= self.period_from)
+        if self.period_to is not None:
+            query = query.filter(TradingAccount.period_end_date <= self.period_to)
+        for field, (low, high) in self.ranges.items():
+            column = getattr(TradingAccount, field)
+            if low is not None:
+                query = query.filter(column >= low)
+            if high is not None:
+                query = query.filter(column <= high)
+        return query
+
 @router.post("/", response_model=TradingAccountResponse)
-def create_trading_account(account: TradingAccountCreate, db: Session = Depends(get_db)):
-    db_account = TradingAccount(**account.dict())
+def create_trading_account(account: TradingAccountCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    data = account.dict()
+    db_account = TradingAccount(**data, content_hash=account_content_hash(data))
     db.add(db_account)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=DUPLICATE_PERIOD)
     db.refresh(db_account)
+    background_tasks.add_task(rescore_borrowers, [db_account.borrower_id])
     return db_account
 
+@router.post("/bulk", response_model=BulkResponse)
+def create_trading_accounts_bulk(
+    background_tasks: BackgroundTasks,
+    items: List[Any] = Body(..., description="JSON array of trading accounts"),
+    params: BulkParams = Depends(),
+    on_conflict: str = Query("error", pattern="^(error|update)$",
+                             description="What to do with a period the borrower already has"),
+    db: Session = Depends(get_db)
+):
+    """Create many trading accounts in one transaction; ids are returned in request order.
+
+    With on_conflict=update an existing borrower/period is updated in place and its id returned.
+    """
+    accounts = TradingAccount.__table__
+    errors = BulkErrors()
+    valid = validate_items(TradingAccountCreate, items, errors)
+
+    requested = {account.borrower_id for _, account in valid}
+    known = set(db.execute(select(Borrower.id).where(Borrower.id.in_(sorted(requested)))).scalars())
+    existing = {
+        (borrower_id, start, end): (account_id, content_hash)
+        for account_id, borrower_id, start, end, content_hash in db.execute(
+            select(accounts.c.id, *(accounts.c[column] for column in KEY_COLUMNS), accounts.c.content_hash)
+            .where(accounts.c.borrower_id.in_(sorted(known)))
+            .where(accounts.c.period_start_date.in_(sorted({account.period_start_date for _, account in valid})))
+        )
+    }
+    seen: Dict[tuple, int] = {}
+    records = []
+    for index, account in valid:
+        key = (account.borrower_id, account.period_start_date, account.period_end_date)
+        if account.borrower_id not in known:
+            errors.add(index, f"borrower_id: Borrower {account.borrower_id} not found")
+        elif key in seen:
+            errors.add(index, f"Same borrower and period as item {seen[key]}")
+        elif key in existing and on_conflict == 'error':
+            errors.add(index, DUPLICATE_PERIOD)
+        else:
+            seen[key] = index
+            data = account.dict()
+            records.append((index, key, {**data, 'content_hash': account_content_hash(data)}))
+    raise_if_atomic(params, errors)
+
+    ids_by_index = {}
+    inserts, updates = [], []
+    changed_borrowers = set()
+    for index, key, record in records:
+        found = existing.get(key)
+        if found is None:
+            inserts.append((index, record))
+            changed_borrowers.add(record['borrower_id'])
+            continue
+        ids_by_index[index] = found[0]
+        if found[1] != record['content_hash']:
+            changes = {column: record[column] for column in NUMERIC_COLUMNS + ('content_hash',)}
+            updates.append({'account_id': found[0], **changes})
+            changed_borrowers.add(record['borrower_id'])
+    try:
+        ids = insert_returning_ids(db, accounts, [record for _, record in inserts])
+        if updates:
+            db.execute(update(accounts).where(accounts.c.id == bindparam('account_id')), updates)
+        db.commit()
+    except IntegrityError:
+        # Another writer added one of these periods since they were checked
+        db.rollback()
+        raise HTTPException(status_code=409, detail=DUPLICATE_PERIOD)
+    ids_by_index.update(zip((index for index, _ in inserts), ids))
+    background_tasks.add_task(rescore_borrowers, changed_borrowers)
+    return bulk_response(params, len(items), ids_by_index, errors, updated=len(updates),
+                         unchanged=len(records) - len(inserts) - len(updates))
+
 @router.get("/", response_model=List[TradingAccountResponse])
-def list_trading_accounts(db: Session = Depends(get_db)):
-    accounts = db.query(TradingAccount).options(joinedload(TradingAccount.borrower)).all()
-    return accounts
+async def list_trading_accounts(
+    response: Response,
+    page: PageParams = Depends(),
+    filters: TradingAccountFilters = Depends(),
+    sort: str = Query("id", pattern="^(id|period_end_date)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """One page of trading accounts; the next page's cursor is in the X-Next-Cursor header"""
+    query = filters.apply(select(TradingAccount).options(joinedload(TradingAccount.borrower)))
+    return await paginate_async(db, query, TradingAccount, page, response, sort=sort)
+
+@router.get("/export")
+def export_trading_accounts(
+    params: ExportParams = Depends(),
+    filters: TradingAccountFilters = Depends()
+):
+    """Stream every matching trading account, with its borrower's name, as CSV or NDJSON"""
+    accounts = TradingAccount.__table__
+    statement = filters.apply(
+        select(*accounts.columns, Borrower.name.label('borrower_name'))
+        .outerjoin(Borrower, Borrower.id == accounts.c.borrower_id)
+        .order_by(accounts.c.id)
+    )
+    return stream_export(statement, params, "trading_accounts")
 
 @router.get("/{account_id}", response_model=TradingAccountResponse)
-def get_trading_account(account_id: int, db: Session = Depends(get_db)):
-    db_account = db.query(TradingAccount).options(joinedload(TradingAccount.borrower)).filter(TradingAccount.id == account_id).first()
+async def get_trading_account(account_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_account = await db.get(TradingAccount, account_id, options=[joinedload(TradingAccount.borrower)])
     if not db_account:
         raise HTTPException(status_code=404, detail="Trading account not found")
     return db_account
 
 @router.put("/{account_id}", response_model=TradingAccountResponse)
-def update_trading_account(account_id: int, account: TradingAccountUpdate, db: Session = Depends(get_db)):
+def update_trading_account(account_id: int, account: TradingAccountUpdate, background_tasks: BackgroundTasks,
+                           db: Session = Depends(get_db)):
     db_account = db.query(TradingAccount).filter(TradingAccount.id == account_id).first()
     if not db_account:
         raise HTTPException(status_code=404, detail="Trading account not found")
     update_data = account.dict(exclude_unset=True)
+    changed_fields = [key for key, value in update_data.items() if getattr(db_account, key) != value]
     for key, value in update_data.items():
         setattr(db_account, key, value)
-    db.commit()
+    db_account.content_hash = account_content_hash({field: getattr(db_account, field) for field in ACCOUNT_FIELDS})
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=DUPLICATE_PERIOD)
     db.refresh(db_account)
+    # Only factors whose formulas read a changed field are recomputed
+    background_tasks.add_task(rescore_account_change, db_account.borrower_id, changed_fields)
     return db_account
 
 @router.delete("/{account_id}")
-def delete_trading_account(account_id: int, db: Session = Depends(get_db)):
+def delete_trading_account(account_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     db_account = db.query(TradingAccount).filter(TradingAccount.id == account_id).first()
     if not db_account:
         raise HTTPException(status_code=404, detail="Trading account not found")
+    borrower_id = db_account.borrower_id
     db.delete(db_account)
     db.commit()
+    background_tasks.add_task(rescore_borrowers, [borrower_id])
     return {"detail": "Trading account deleted"}
 
 @router.post("/upload")
-def upload_trading_accounts(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    if not file.filename.endswith(('.xlsx', '.xls')):
-        raise HTTPException(status_code=400, detail="Invalid file type. Please upload an Excel file.")
+def upload_trading_accounts(
+    response: Response,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    background: bool = Query(False, description="Stage the file and ingest it in a background job"),
+    db: Session = Depends(get_db)
+):
+    """Ingest an .xlsx, .xls, .csv or .parquet file in chunks; invalid rows are skipped and reported.
+
+    With background=true the file is staged and a job id returned at once; poll GET /jobs/{id}.
+    """
+    if background:
+        try:
+            job = stage_upload(db, file.file, file.filename or '')
+        except IngestionError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        submit(job.id)
+        response.status_code = 202
+        return job_status(job)
     try:
-        contents = file.file.read()
-        df = pd.read_excel(BytesIO(contents))
-        required_columns = [
-            'borrower_id', 'sales', 'purchases', 'total_assets', 'total_liabilities',
-            'inventory', 'period_start_date', 'period_end_date'
-        ]
-        if not all(col in df.columns for col in required_columns):
-            raise HTTPException(status_code=400, detail="Missing required columns in Excel file.")
-        created_accounts = []
-        for _, row in df.iterrows():
-            account = TradingAccount(
-                borrower_id=int(row['borrower_id']),
-                sales=float(row['sales']),
-                purchases=float(row['purchases']),
-                total_assets=float(row['total_assets']),
-                total_liabilities=float(row['total_liabilities']),
-                inventory=float(row['inventory']),
-                period_start_date=pd.to_datetime(row['period_start_date']).date(),
-                period_end_date=pd.to_datetime(row['period_end_date']).date()
-            )
-            db.add(account)
-            created_accounts.append(account)
-        db.commit()
-        return {"detail": f"Uploaded {len(created_accounts)} trading accounts."}
+        report = ingest_trading_accounts(db, file.file, file.filename or '')
+    except IngestionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+    background_tasks.add_task(rescore_borrowers, report.borrower_ids)
+    return {"detail": upload_summary(report), **report.as_dict()}
@@ -0,0 +1,126 @@
+"""
+Streaming CSV/NDJSON exports.
+
+Rows are read through a server-side cursor ``EXPORT_BATCH_SIZE`` at a time
+and each batch is encoded, optionally gzipped, and handed to the client
+before the next is fetched, so memory use does not grow with the export.
+The stream runs in its own session because it outlives the request
+handler.
+"""
+import csv
+import io
+import json
+import os
+import zlib
+from datetime import date, datetime
+from typing import Any, Callable, Iterator, List, Tuple
+
+from fastapi import Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import JSON, Date, DateTime, Select
+
+from models.database import SessionLocal
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+MEDIA_TYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+class ExportParams:
+    """Common ``format``/``gzip`` query parameters."""
+
+    def __init__(
+        self,
+        format: str = Query("csv", pattern="^(csv|ndjson)$"),
+        gzip: bool = Query(False, description="Compress the file with gzip"),
+    ):
+        self.format = format
+        self.gzip = gzip
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _csv_converters(statement: Select) -> List[Tuple[int, Callable[[Any], Any]]]:
+    """(position, converter) for the columns the csv module would not write as we want."""
+    converters = []
+    for i, column in enumerate(statement.selected_columns):
+        if isinstance(column.type, JSON):
+            converters.append((i, lambda value: json.dumps(value, default=_json_default, separators=(',', ':'))))
+        elif isinstance(column.type, DateTime):
+            converters.append((i, datetime.isoformat))
+        elif isinstance(column.type, Date):
+            converters.append((i, date.isoformat))
+    return converters
+
+
+def _encode_csv(statement: Select, batches: Iterator[List[tuple]]) -> Iterator[bytes]:
+    columns = [column.key for column in statement.selected_columns]
+    converters = _csv_converters(statement)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        if converters:
+            rows = [list(row) for row in rows]
+            for row in rows:
+                for i, convert in converters:
+                    if row[i] is not None:
+                        row[i] = convert(row[i])
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _encode_ndjson(statement: Select, batches: Iterator[List[tuple]]) -> Iterator[bytes]:
+    columns = [column.key for column in statement.selected_columns]
+    for rows in batches:
+        yield ''.join(
+            json.dumps(dict(zip(columns, row)), default=_json_default, separators=(',', ':')) + '\n'
+            for row in rows
+        ).encode()
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _batches(statement: Select) -> Iterator[List[tuple]]:
+    db = SessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def stream_export(statement: Select, params: ExportParams, filename: str) -> StreamingResponse:
+    """Stream the rows of ``statement`` as a CSV or NDJSON file download.
+
+    Column labels of ``statement`` become the CSV header and NDJSON keys.
+    """
+    encode = _encode_csv if params.format == 'csv' else _encode_ndjson
+    body = encode(statement, _batches(statement))
+    filename = f"{filename}.{params.format}"
+    media_type = MEDIA_TYPES[params.format]
+    if params.gzip:
+        body = _gzip(body)
+        filename += '.gz'
+        media_type = 'application/gzip'
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,73 @@
+"""
+ASGI middleware recording request metrics by route template.
+
+Requests are labelled with the matching route's path template (for example
+``/api/v1/borrowers/{borrower_id}``), never the raw path, so label
+cardinality stays bounded; paths that match no route share ``unmatched``.
+Latency runs until the last body chunk is sent, which for streamed exports
+is the whole download.
+"""
+import time
+from typing import Sequence
+
+from fastapi import Response
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from services.metrics import (
+    CONTENT_TYPE_LATEST, http_request_duration, http_requests, http_requests_in_progress, http_response_size,
+    render_metrics,
+)
+
+
+class MetricsMiddleware:
+    """Pass the application's ``routes`` so requests can be labelled before they are routed."""
+
+    def __init__(self, app: ASGIApp, routes: Sequence[BaseRoute]):
+        self.app = app
+        self.routes = routes
+
+    def route_template(self, scope: Scope) -> str:
+        partial = None
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+            if match == Match.PARTIAL and partial is None:
+                partial = route.path
+        return partial or "unmatched"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        template = self.route_template(scope)
+        start = time.perf_counter()
+        status = 500
+        size = 0
+        in_progress = http_requests_in_progress.labels(method, template)
+        in_progress.inc()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            labels = (method, template, str(status))
+            http_requests.labels(*labels).inc()
+            http_request_duration.labels(*labels).observe(time.perf_counter() - start)
+            http_response_size.labels(*labels).observe(size)
+
+
+def metrics_response() -> Response:
+    # CONTENT_TYPE_LATEST already names the charset; media_type would append another
+    return Response(render_metrics(), headers={"Content-Type": CONTENT_TYPE_LATEST})
@@ -0,0 +1,119 @@
+"""
+Keyset pagination for list endpoints.
+
+Pages are ordered by a sort column plus the primary key as a tie-breaker,
+and the next page starts strictly after the last row of the previous one, so
+every page is an index range scan no matter how deep the client pages.
+List endpoints keep returning a plain JSON array; the cursor for the next
+page, if there is one, is sent in the ``X-Next-Cursor`` response header and
+passed back as the ``cursor`` query parameter.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """Common ``limit``/``cursor``/``order`` query parameters."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Rows per page"),
+        cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+        order: str = Query("asc", pattern="^(asc|desc)$"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.order = order
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(value: Any, python_type: type) -> Any:
+    if value is None:
+        return None
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(sort: str, order: str, value: Any, row_id: int) -> str:
+    payload = json.dumps({'s': sort, 'o': order, 'v': _encode_value(value), 'id': row_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: str, order: str, value_type: Optional[type] = None) -> Dict[str, Any]:
+    """Decode and validate a cursor; ``value_type`` converts its sort value, so a
+    value that does not fit the sort column is rejected like any other bad cursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload['s'] != sort or payload['o'] != order:
+            raise ValueError
+        payload['id'] = int(payload['id'])
+        if value_type is not None:
+            payload['v'] = _decode_value(payload['v'], value_type)
+        return payload
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor for this sort order")
+
+
+def _keyset(statement: Select, model, page: PageParams, sort: str) -> Select:
+    """Order ``statement`` by the keyset and limit it to one row past the page."""
+    id_column = model.id
+    sort_column = getattr(model, sort)
+    descending = page.order == "desc"
+
+    if page.cursor:
+        payload = decode_cursor(page.cursor, sort, page.order,
+                                None if sort == "id" else sort_column.type.python_type)
+        last_id = payload['id']
+        if sort == "id":
+            statement = statement.filter(id_column < last_id if descending else id_column > last_id)
+        else:
+            key = tuple_(sort_column, id_column)
+            value = payload['v']
+            statement = statement.filter(key < (value, last_id) if descending else key > (value, last_id))
+
+    if sort == "id":
+        ordering = [id_column.desc() if descending else id_column.asc()]
+    else:
+        ordering = [
+            sort_column.desc() if descending else sort_column.asc(),
+            id_column.desc() if descending else id_column.asc(),
+        ]
+    return statement.order_by(*ordering).limit(page.limit + 1)
+
+
+def _page(rows: List[Any], page: PageParams, response: Response, sort: str) -> List[Any]:
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(sort, page.order, getattr(last, sort), last.id)
+    return rows
+
+
+async def paginate_async(db: AsyncSession, statement: Select, model, page: PageParams, response: Response,
+                         sort: str = "id") -> List[Any]:
+    """Apply keyset ordering, the cursor and the page size to a ``select(model)`` statement.
+
+    ``sort`` names a column of ``model``; rows with equal sort values are
+    ordered by primary key. Sets the next-page cursor header on ``response``.
+    """
+    result = await db.execute(_keyset(statement, model, page, sort))
+    return _page(list(result.scalars().all()), page, response, sort)
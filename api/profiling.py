@@ -0,0 +1,72 @@
+"""
+ASGI middleware that profiles opted-in requests (see ``services.profiling``).
+
+It is only installed when profiling is configured. A profiled response
+carries ``X-Profile-Id``; the profile is saved once the last body chunk is
+sent and served by ``GET /api/v1/profiles/{profile_id}``.
+"""
+import os
+import time
+import uuid
+from datetime import datetime
+
+from anyio import to_thread
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from services.profiling import INTERVAL_SECONDS, PROFILE_PATHS, StackSampler, save_profile, verify
+
+PROFILE_HEADER = b"x-profile"
+
+
+class ProfilingMiddleware:
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    def trigger(self, scope: Scope):
+        """'header' or 'path' when the request should be profiled, else None"""
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return "header" if verify(scope["path"], value.decode("latin-1")) else None
+        if PROFILE_PATHS and scope["path"].startswith(PROFILE_PATHS):
+            return "path"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        trigger = self.trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        sampler = StackSampler()
+        created_at = datetime.utcnow()
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            samples = await to_thread.run_sync(sampler.stop)
+            meta = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status,
+                "trigger": trigger,
+                "duration_ms": round(duration * 1000, 3),
+                "interval_ms": INTERVAL_SECONDS * 1000,
+                "samples": sum(samples.values()),
+                "pid": os.getpid(),
+                "created_at": created_at.isoformat(),
+            }
+            await to_thread.run_sync(save_profile, profile_id, samples, meta)
@@ -0,0 +1,285 @@
+"""
+End-to-end load test of the FastAPI app.
+
+By default the app is imported in-process and driven through httpx's ASGI
+transport against a fresh SQLite database, migrated with Alembic and seeded
+with a synthetic portfolio. Pass ``--base-url`` to drive a running server
+(local uvicorn, Postgres-backed, ...) over HTTP instead; it must already
+hold borrowers.
+
+Each concurrency level runs for ``--duration`` seconds with that many
+clients replaying a weighted mix of requests. The report gives per-route
+p50/p95/p99 latency, throughput and error rate per level, and the level at
+which total throughput stopped growing:
+
+    python -m benchmarks.load_test --concurrency 1,4,16,64 --duration 10
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000 --mix list_trading_accounts=80,calculate_scorecard=20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# benchmarks.run_benchmarks and the app import models.database, which builds its
+# engines from DATABASE_URL on first import; they are imported once that is set
+
+API = "/api/v1"
+DEFAULT_MIX = "list_trading_accounts=50,create_trading_account=20,upload_excel=5,calculate_scorecard=25"
+# Throughput gains below this fraction count as saturated
+SATURATION_GAIN = 0.05
+
+
+class LoadContext:
+    """State shared by the clients of one run."""
+
+    def __init__(self, borrower_ids: List[int], upload_rows: int):
+        self.borrower_ids = borrower_ids
+        self.excel = excel_upload(borrower_ids, upload_rows)
+
+
+def excel_upload(borrower_ids: List[int], rows: int) -> bytes:
+    rng = random.Random(0)
+    frame = pd.DataFrame([
+        {
+            'borrower_id': rng.choice(borrower_ids),
+            'sales': rng.uniform(1e5, 5e6),
+            'purchases': rng.uniform(5e4, 4e6),
+            'total_assets': rng.uniform(1e5, 1e7),
+            'total_liabilities': rng.uniform(1e4, 8e6),
+            'inventory': rng.uniform(0, 2e6),
+            'period_start_date': date(2025, 1, 1),
+            'period_end_date': date(2025, 12, 31),
+        }
+        for _ in range(rows)
+    ])
+    buffer = BytesIO()
+    frame.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+async def list_trading_accounts(client: httpx.AsyncClient, rng: random.Random, ctx: LoadContext):
+    return await client.get(f"{API}/trading_accounts/")
+
+
+async def create_trading_account(client: httpx.AsyncClient, rng: random.Random, ctx: LoadContext):
+    # A random period, so creates rarely collide with an existing (borrower, period)
+    start = date(1900, 1, 1) + timedelta(days=rng.randrange(73000))
+    return await client.post(f"{API}/trading_accounts/", json={
+        'borrower_id': rng.choice(ctx.borrower_ids),
+        'sales': rng.uniform(1e5, 5e6),
+        'purchases': rng.uniform(5e4, 4e6),
+        'total_assets': rng.uniform(1e5, 1e7),
+        'total_liabilities': rng.uniform(1e4, 8e6),
+        'inventory': rng.uniform(0, 2e6),
+        'period_start_date': start.isoformat(),
+        'period_end_date': (start + timedelta(days=364)).isoformat(),
+    })
+
+
+async def upload_excel(client: httpx.AsyncClient, rng: random.Random, ctx: LoadContext):
+    files = {'file': ('accounts.xlsx', ctx.excel,
+                      'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')}
+    return await client.post(f"{API}/trading_accounts/upload", files=files)
+
+
+async def calculate_scorecard(client: httpx.AsyncClient, rng: random.Random, ctx: LoadContext):
+    return await client.post(f"{API}/scorecards/calculate", json={'borrower_id': rng.choice(ctx.borrower_ids)})
+
+
+OPERATIONS = {
+    'list_trading_accounts': list_trading_accounts,
+    'create_trading_account': create_trading_account,
+    'upload_excel': upload_excel,
+    'calculate_scorecard': calculate_scorecard,
+}
+
+
+def parse_mix(mix: str) -> List[Tuple[str, float]]:
+    weights = []
+    for item in mix.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise SystemExit(f"Unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        weights.append((name, float(weight or 1)))
+    return weights
+
+
+async def client_loop(client: httpx.AsyncClient, ctx: LoadContext, mix: List[Tuple[str, float]],
+                      seed: int, deadline: float, samples: List[Tuple[str, float, str]]) -> None:
+    rng = random.Random(seed)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            response = await OPERATIONS[name](client, rng, ctx)
+            outcome = str(response.status_code)
+        except Exception as e:
+            outcome = type(e).__name__
+        samples.append((name, time.perf_counter() - started, outcome))
+
+
+def is_error(outcome: str) -> bool:
+    return not (outcome.isdigit() and int(outcome) < 400)
+
+
+def summarise(samples: List[Tuple[str, float, str]], elapsed: float) -> Dict[str, Any]:
+    routes = {}
+    for name in sorted({name for name, _, _ in samples}):
+        latencies = np.array([latency for n, latency, _ in samples if n == name]) * 1e3
+        outcomes = Counter(outcome for n, _, outcome in samples if n == name)
+        errors = sum(count for outcome, count in outcomes.items() if is_error(outcome))
+        routes[name] = {
+            'requests': len(latencies),
+            'throughput_rps': round(len(latencies) / elapsed, 2),
+            'error_rate': round(errors / len(latencies), 4),
+            'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+            'p95_ms': round(float(np.percentile(latencies, 95)), 2),
+            'p99_ms': round(float(np.percentile(latencies, 99)), 2),
+            'outcomes': dict(sorted(outcomes.items())),
+        }
+    errors = sum(1 for _, _, outcome in samples if is_error(outcome))
+    return {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / elapsed, 2),
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'routes': routes,
+    }
+
+
+async def run_level(client: httpx.AsyncClient, ctx: LoadContext, mix: List[Tuple[str, float]],
+                    concurrency: int, duration: float, seed: int) -> Dict[str, Any]:
+    samples: List[Tuple[str, float, str]] = []
+    started = time.perf_counter()
+    deadline = started + duration
+    # Every client at every level gets its own stream, so creates at a later
+    # level don't replay periods an earlier level already stored
+    await asyncio.gather(*(
+        client_loop(client, ctx, mix, (seed * 1000 + concurrency) * 1000 + i, deadline, samples)
+        for i in range(concurrency)
+    ))
+    return {'concurrency': concurrency, **summarise(samples, time.perf_counter() - started)}
+
+
+def saturation_point(levels: List[Dict[str, Any]]) -> Optional[int]:
+    """First concurrency level after which more clients stopped adding throughput."""
+    for previous, current in zip(levels, levels[1:]):
+        if current['throughput_rps'] < previous['throughput_rps'] * (1 + SATURATION_GAIN):
+            return previous['concurrency']
+    return None
+
+
+def prepare_database(args, workdir: str) -> None:
+    """Migrate and seed the in-process app's database and point the app at it."""
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'load_test.db')}"
+    # Read by models.database for the app's sync and async engines, and by the
+    # batch scoring and stress test worker processes
+    os.environ['DATABASE_URL'] = database_url
+    from benchmarks.run_benchmarks import migrate
+    from benchmarks.synthetic_portfolio import generate_portfolio, seed_database
+    from models.database import SessionLocal
+
+    migrate(database_url)
+    db = SessionLocal()
+    try:
+        seed_database(db, generate_portfolio(args.accounts, seed=args.seed))
+    finally:
+        db.close()
+
+
+async def run(args, workdir: str) -> Dict[str, Any]:
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+        target = args.base_url
+    else:
+        prepare_database(args, workdir)
+        from main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+                                   timeout=args.timeout)
+        target = "main:app (in-process)"
+
+    async with client:
+        response = await client.get(f"{API}/borrowers/")
+        response.raise_for_status()
+        borrower_ids = [borrower['id'] for borrower in response.json()]
+        if not borrower_ids:
+            raise SystemExit("The target has no borrowers to score")
+        ctx = LoadContext(borrower_ids, args.upload_rows)
+        mix = parse_mix(args.mix)
+
+        levels = []
+        for concurrency in [int(level) for level in args.concurrency.split(',') if level]:
+            print(f"Concurrency {concurrency} for {args.duration}s...", flush=True)
+            level = await run_level(client, ctx, mix, concurrency, args.duration, args.seed)
+            levels.append(level)
+            print_level(level)
+
+    from benchmarks.run_benchmarks import git_revision
+    return {
+        'git': git_revision(),
+        'created_at': datetime.utcnow().isoformat() + 'Z',
+        'target': target,
+        'parameters': {
+            'mix': args.mix,
+            'duration': args.duration,
+            'accounts': None if args.base_url else args.accounts,
+            'seed': args.seed,
+        },
+        'levels': levels,
+        'saturation_concurrency': saturation_point(levels),
+    }
+
+
+def print_level(level: Dict[str, Any]) -> None:
+    print(f"  total: {level['requests']} requests, {level['throughput_rps']} req/s, "
+          f"{level['error_rate']:.2%} errors")
+    for name, route in level['routes'].items():
+        print(f"  {name:<24} {route['requests']:>7} req {route['throughput_rps']:>9} req/s "
+              f"p50 {route['p50_ms']:>9} ms  p95 {route['p95_ms']:>9} ms  p99 {route['p99_ms']:>9} ms  "
+              f"errors {route['error_rate']:.2%} {route['outcomes']}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a traffic mix against the API at rising concurrency")
+    parser.add_argument('--base-url', help="drive a running server instead of the in-process app")
+    parser.add_argument('--database-url', help="database for the in-process app (default: temporary SQLite)")
+    parser.add_argument('--accounts', type=int, default=2000, help="trading accounts to seed")
+    parser.add_argument('--concurrency', default='1,2,4,8,16,32')
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per concurrency level")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="operation=weight pairs")
+    parser.add_argument('--upload-rows', type=int, default=20, help="rows in the uploaded Excel file")
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='load-test-results.json')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        report = asyncio.run(run(args, workdir))
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saturation at concurrency: {report['saturation_concurrency'] or 'not reached'}")
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
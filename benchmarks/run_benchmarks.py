@@ -0,0 +1,224 @@
+"""
+Scoring engine benchmarks.
+
+For each portfolio size a fresh SQLite database is migrated with Alembic and
+seeded from ``benchmarks.synthetic_portfolio``, then the run measures:
+
+* formula and rating scale compile time for every factor;
+* scalar per-account latency, the loop ``CalculationService`` runs;
+* ``CalculationService.compute_final_score`` per borrower, including its query;
+* vectorized throughput of ``score_accounts`` in memory and of
+  ``score_portfolio`` including the column load;
+* peak Python memory (tracemalloc) of a full portfolio load and score.
+
+Results are written as JSON tagged with the git commit so runs can be
+compared across commits:
+
+    python -m benchmarks.run_benchmarks --sizes 1000,100000 --output after.json
+    python -m benchmarks.run_benchmarks --compare before.json --output after.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from benchmarks.synthetic_portfolio import generate_portfolio, seed_database  # noqa: E402
+from services.calculation_service import CalculationService  # noqa: E402
+from services.formula import compile_formula  # noqa: E402
+from services.rating_scale import compile_rating_scale  # noqa: E402
+from services.risk_config import get_risk_config, invalidate_risk_config  # noqa: E402
+from services.scoring_engine import AccountColumns, load_account_columns, score_accounts, score_portfolio  # noqa: E402
+
+# Metrics where a larger value is better; everything else is a duration or size
+HIGHER_IS_BETTER = {'accounts_per_second', 'portfolio_accounts_per_second'}
+
+
+def git_revision() -> Dict[str, Any]:
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    try:
+        return {'commit': git('rev-parse', 'HEAD') or None, 'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+    except OSError:
+        return {'commit': None, 'dirty': None}
+
+
+def best_of(repeats: int, func: Callable[[], Any]) -> float:
+    """Fastest wall time of ``repeats`` calls, in seconds."""
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def migrate(database_url: str) -> None:
+    # alembic/env.py reads the target database from DATABASE_URL
+    previous = os.environ.get('DATABASE_URL')
+    os.environ['DATABASE_URL'] = database_url
+    try:
+        config = Config(str(ROOT / 'alembic.ini'))
+        config.set_main_option('script_location', str(ROOT / 'alembic'))
+        command.upgrade(config, 'head')
+    finally:
+        if previous is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = previous
+
+
+def benchmark_size(n_accounts: int, args, workdir: str) -> Dict[str, Any]:
+    portfolio = generate_portfolio(n_accounts, n_factors=args.factors, complexity=args.complexity,
+                                   accounts_per_borrower=args.accounts_per_borrower, seed=args.seed)
+    database_url = f"sqlite:///{os.path.join(workdir, f'bench_{n_accounts}.db')}"
+    migrate(database_url)
+    engine = create_engine(database_url)
+    db = sessionmaker(bind=engine)()
+    result: Dict[str, Any] = {'accounts': n_accounts, 'borrowers': portfolio.n_borrowers}
+    try:
+        started = time.perf_counter()
+        seed_database(db, portfolio)
+        result['seed_seconds'] = round(time.perf_counter() - started, 3)
+
+        def compile_all():
+            compile_formula.cache_clear()
+            for factor in portfolio.factors:
+                compile_formula(factor['formula'])
+                compile_rating_scale(factor['rating_scale'])
+        result['compile_ms'] = best_of(args.repeats, compile_all) * 1e3
+
+        invalidate_risk_config()
+        config = get_risk_config(db)
+        factors = config.financial_factors
+
+        # The per-account loop of CalculationService.compute_factor_scores, without the query
+        rows = portfolio.account_rows(0, args.scalar_sample)
+
+        def scalar_loop():
+            for factor in factors:
+                for row in rows:
+                    factor.scale.band_for(factor.formula.evaluate(row))
+        result['scalar_us_per_account'] = best_of(args.repeats, scalar_loop) / len(rows) * 1e6
+
+        service = CalculationService(db)
+        sample = list(range(1, min(portfolio.n_borrowers, args.service_sample) + 1))
+
+        def service_calls():
+            for borrower_id in sample:
+                service.compute_final_score(borrower_id)
+        result['service_ms_per_borrower'] = best_of(args.repeats, service_calls) / len(sample) * 1e3
+
+        accounts = AccountColumns(
+            np.arange(1, len(portfolio) + 1, dtype=np.int64), portfolio.borrower_ids, portfolio.columns)
+        engine_seconds = best_of(args.repeats, lambda: score_accounts(accounts, config))
+        result['engine_seconds'] = engine_seconds
+        result['accounts_per_second'] = n_accounts / engine_seconds if engine_seconds else None
+
+        portfolio_seconds = best_of(args.repeats, lambda: score_portfolio(db))
+        result['portfolio_seconds'] = portfolio_seconds
+        result['portfolio_accounts_per_second'] = n_accounts / portfolio_seconds if portfolio_seconds else None
+
+        tracemalloc.start()
+        score_accounts(load_account_columns(db), config)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result['peak_memory_mb'] = peak / 2 ** 20
+    finally:
+        db.close()
+        engine.dispose()
+        invalidate_risk_config()
+    return {key: round(value, 4) if isinstance(value, float) else value for key, value in result.items()}
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """One line per (size, metric) with the relative change against ``baseline``."""
+    lines = []
+    previous = {run['accounts']: run for run in baseline.get('results', [])}
+    for run in current['results']:
+        before = previous.get(run['accounts'])
+        if not before:
+            continue
+        for metric, value in run.items():
+            old = before.get(metric)
+            if metric in ('accounts', 'borrowers') or not isinstance(value, (int, float)) or not old:
+                continue
+            change = (value - old) / old * 100
+            better = change > 0 if metric in HIGHER_IS_BETTER else change < 0
+            lines.append(f"{run['accounts']:>9} {metric:<32} {old:>14.4f} -> {value:>14.4f} "
+                         f"{change:+7.1f}% {'better' if better else 'worse' if change else ''}")
+    return lines
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the scoring engine on synthetic portfolios")
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help="comma separated trading account counts (1000 to 1000000)")
+    parser.add_argument('--factors', type=int, default=8)
+    parser.add_argument('--complexity', type=int, default=2, help="operators per formula")
+    parser.add_argument('--accounts-per-borrower', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--scalar-sample', type=int, default=20000,
+                        help="accounts timed on the scalar path")
+    parser.add_argument('--service-sample', type=int, default=50,
+                        help="borrowers timed through CalculationService")
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    report = {
+        'git': git_revision(),
+        'created_at': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'parameters': {
+            'factors': args.factors,
+            'complexity': args.complexity,
+            'accounts_per_borrower': args.accounts_per_borrower,
+            'seed': args.seed,
+            'repeats': args.repeats,
+        },
+        'results': [],
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            print(f"Benchmarking {size} accounts...", flush=True)
+            result = benchmark_size(size, args, workdir)
+            report['results'].append(result)
+            print(json.dumps(result), flush=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Compared with {baseline.get('git', {}).get('commit')}:")
+        for line in compare(baseline, report):
+            print(line)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,21 @@
-import { Borrower, TradingAccount, RiskFactor, Scorecard, CreateTradingAccountForm } from './types';
+import { Borrower, TradingAccount, RiskFactor, Scorecard, CreateTradingAccountForm, DashboardSummary } from './types';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'https://web-production-7c20.up.railway.app/api/v1';
 
+// List endpoints are keyset paginated; the next page's cursor comes back in this header
+const NEXT_CURSOR_HEADER = 'X-Next-Cursor';
+// Rows per page in list views; more are loaded on demand
+export const PAGE_SIZE = 100;
+// Page size when a complete (small) list is needed
+const FULL_LIST_PAGE_SIZE = 1000;
+
+export interface Page<T> {
+    items: T[];
+    nextCursor: string | null;
+}
+
+export type ListParams = Record<string, string | number | undefined>;
+
 // API client for making requests to our backend
 export class ApiClient {
     private static async request<T>(
@@ -23,9 +37,45 @@ export class ApiClient {
         return response.json();
     }
 
-    // Borrowers
-    static async getBorrowers() {
-        return this.request<Borrower[]>('/borrowers/');
+    // Fetch one page of a list endpoint
+    static async requestPage<T>(endpoint: string, params: ListParams = {}): Promise<Page<T>> {
+        const query = new URLSearchParams();
+        Object.entries(params).forEach(([key, value]) => {
+            if (value !== undefined && value !== '') {
+                query.set(key, String(value));
+            }
+        });
+        const response = await fetch(`${API_BASE_URL}${endpoint}?${query.toString()}`, {
+            headers: { 'Content-Type': 'application/json' },
+        });
+
+        if (!response.ok) {
+            throw new Error(`API call failed: ${response.statusText}`);
+        }
+
+        return { items: await response.json(), nextCursor: response.headers.get(NEXT_CURSOR_HEADER) };
+    }
+
+    // Follow the cursors through every page of a list endpoint; only for lists that stay small
+    private static async requestAll<T>(endpoint: string, params: ListParams = {}): Promise<T[]> {
+        const items: T[] = [];
+        let cursor: string | undefined;
+        do {
+            const page = await this.requestPage<T>(endpoint, { ...params, limit: FULL_LIST_PAGE_SIZE, cursor });
+            items.push(...page.items);
+            cursor = page.nextCursor ?? undefined;
+        } while (cursor);
+        return items;
+    }
+
+    // Borrowers; list getters return one page, pass its nextCursor as `cursor` for the next
+    static async getBorrowers(params: ListParams = {}) {
+        return this.requestPage<Borrower>('/borrowers/', { limit: PAGE_SIZE, ...params });
+    }
+
+    // Ranked name matches for typeahead; only the top `limit` come back
+    static async searchBorrowers(q: string, limit = 10) {
+        return this.request<Borrower[]>(`/borrowers/search?${new URLSearchParams({ q, limit: String(limit) })}`);
     }
 
     static async createBorrower(data: { name: string }) {
@@ -49,8 +99,8 @@ export class ApiClient {
     }
 
     // Inventory
-    static async getInventory() {
-        return this.request<any[]>('/inventory/');
+    static async getInventory(params: ListParams = {}) {
+        return this.requestPage<any>('/inventory/', { limit: PAGE_SIZE, ...params });
     }
 
     static async createInventoryItem(data: any) {
@@ -61,8 +111,8 @@ export class ApiClient {
     }
 
     // Trading Accounts
-    static async getTradingAccounts() {
-        return this.request<TradingAccount[]>('/trading_accounts/');
+    static async getTradingAccounts(params: ListParams = {}) {
+        return this.requestPage<TradingAccount>('/trading_accounts/', { limit: PAGE_SIZE, ...params });
     }
 
     static async createTradingAccount(data: CreateTradingAccountForm) {
@@ -85,9 +135,9 @@ export class ApiClient {
         });
     }
 
-    // Risk Factors
+    // Risk Factors; the configuration is small and always needed whole
     static async getRiskFactors() {
-        return this.request<RiskFactor[]>('/risk_factors/');
+        return this.requestAll<RiskFactor>('/risk_factors/');
     }
 
     static async createRiskFactor(data: Omit<RiskFactor, 'id'>) {
@@ -111,8 +161,8 @@ export class ApiClient {
     }
 
     // Scorecards
-    static async getScorecards() {
-        return this.request<Scorecard[]>('/scorecards/');
+    static async getScorecards(params: ListParams = {}) {
+        return this.requestPage<Scorecard>('/scorecards/', { limit: PAGE_SIZE, ...params });
     }
 
     static async calculateScorecard(data: { borrower_id: number; trading_account_id: number }) {
@@ -121,4 +171,9 @@ export class ApiClient {
             body: JSON.stringify(data),
         });
     }
+
+    // Dashboard
+    static async getDashboardSummary(top = 5) {
+        return this.request<DashboardSummary>(`/dashboard/summary?top=${top}`);
+    }
 }
@@ -49,6 +49,60 @@ export interface Scorecard {
     created_at: string;
 }
 
+// GET /dashboard/summary: aggregates computed in the database
+export interface DashboardSummary {
+    counts: {
+        borrowers: number;
+        trading_accounts: number;
+        risk_factors: number;
+        inventory_items: number;
+        scorecards: number;
+    };
+    trading_accounts: {
+        borrowers_with_accounts: number;
+        sales: number;
+        purchases: number;
+        total_assets: number;
+        total_liabilities: number;
+        inventory: number;
+        latest_period_end: string | null;
+    };
+    latest_scores: {
+        scored_borrowers: number;
+        average: number | null;
+        minimum: number | null;
+        maximum: number | null;
+    };
+    risk_classes: {
+        risk_classification: string | null;
+        borrowers: number;
+        average_score: number | null;
+    }[];
+    inventory: {
+        quantity: number;
+        total_value: number;
+    };
+    top_borrowers: {
+        borrower_id: number;
+        name: string;
+        accounts: number;
+        sales: number;
+        total_assets: number;
+        total_liabilities: number;
+        final_score: number | null;
+        risk_classification: string | null;
+    }[];
+    recent_scorecards: {
+        id: number;
+        borrower_id: number;
+        borrower_name: string | null;
+        final_score: number;
+        risk_classification: string | null;
+        generated_at: string | null;
+    }[];
+    computed_at: string;
+}
+
 // Form interfaces for creating new records
 export interface CreateTradingAccountForm {
     borrower_id: number;
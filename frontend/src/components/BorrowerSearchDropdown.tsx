@@ -1,10 +1,14 @@
 'use client';
 
 import { useState, useEffect, useRef } from 'react';
+import { ApiClient } from '../api/client';
 import { Borrower } from '../api/types';
 
+// Wait for a pause in typing before asking the server
+const SEARCH_DEBOUNCE_MS = 150;
+const SEARCH_LIMIT = 10;
+
 interface Props {
-    borrowers: Borrower[];
     selectedBorrower: Borrower | null;
     onSelect: (borrower: Borrower | null) => void;
     onCreateNew: (name: string) => void;
@@ -13,7 +17,6 @@ interface Props {
 }
 
 export default function BorrowerSearchDropdown({ 
-    borrowers, 
     selectedBorrower, 
     onSelect, 
     onCreateNew,
@@ -25,11 +28,35 @@ export default function BorrowerSearchDropdown({
     const [displayValue, setDisplayValue] = useState(selectedBorrower?.name || '');
     const dropdownRef = useRef<HTMLDivElement>(null);
     const inputRef = useRef<HTMLInputElement>(null);
+    const [filteredBorrowers, setFilteredBorrowers] = useState<Borrower[]>([]);
+    const [searching, setSearching] = useState(false);
 
-    // Filter borrowers based on search term
-    const filteredBorrowers = borrowers.filter(borrower =>
-        borrower.name.toLowerCase().includes(searchTerm.toLowerCase())
-    );
+    // Ask the server for the best matches once typing pauses
+    useEffect(() => {
+        const term = searchTerm.trim();
+        if (!term) {
+            setFilteredBorrowers([]);
+            setSearching(false);
+            return;
+        }
+        let cancelled = false;
+        setSearching(true);
+        const timer = setTimeout(async () => {
+            try {
+                const results = await ApiClient.searchBorrowers(term, SEARCH_LIMIT);
+                if (!cancelled) setFilteredBorrowers(results);
+            } catch (error) {
+                console.error('Error searching borrowers:', error);
+            } finally {
+                if (!cancelled) setSearching(false);
+            }
+        }, SEARCH_DEBOUNCE_MS);
+        // A newer keystroke supersedes this search
+        return () => {
+            cancelled = true;
+            clearTimeout(timer);
+        };
+    }, [searchTerm]);
 
     // Handle selection
     const handleSelect = (borrower: Borrower) => {
@@ -128,7 +155,7 @@ export default function BorrowerSearchDropdown({
                         </div>
                     ) : (
                         <div className="px-4 py-2 text-gray-500">
-                            No businesses found
+                            {!searchTerm.trim() ? 'Type to search businesses' : searching ? 'Searching...' : 'No businesses found'}
                         </div>
                     )}
                     
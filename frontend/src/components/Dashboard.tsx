@@ -2,7 +2,7 @@
 
 import { useState, useEffect } from 'react';
 import { ApiClient } from '../api/client';
-import { TradingAccount, RiskFactor, Scorecard, InventoryItem } from '../api/types';
+import { TradingAccount, RiskFactor, Scorecard, InventoryItem, DashboardSummary } from '../api/types';
 import TradingAccountsTab from './TradingAccountsTab';
 import RiskFactorsTab from './RiskFactorsTab';
 import InventoryTab from './InventoryTab';
@@ -12,12 +12,21 @@ import { AuthProvider } from './AuthContext';
 import UserProfile from './UserProfile';
 import ProtectedAction from './ProtectedAction';
 
+type PagedList = 'accounts' | 'scorecards' | 'inventory';
+
 function Dashboard() {
     const [activeTab, setActiveTab] = useState('home');
     const [accounts, setAccounts] = useState<TradingAccount[]>([]);
     const [riskFactors, setRiskFactors] = useState<RiskFactor[]>([]);
     const [scorecards, setScorecards] = useState<Scorecard[]>([]);
     const [inventory, setInventory] = useState<InventoryItem[]>([]);
+    const [summary, setSummary] = useState<DashboardSummary | null>(null);
+    // Cursor of the next page of each paginated list; null once the last page is loaded
+    const [cursors, setCursors] = useState<Record<PagedList, string | null>>({
+        accounts: null,
+        scorecards: null,
+        inventory: null,
+    });
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState<string | null>(null);
 
@@ -27,15 +36,31 @@ function Dashboard() {
             setError(null);
             
             console.log('Fetching data from API...');
+
+            // The overview only needs counts and totals, aggregated server-side in one call
+            if (activeTab === 'overview') {
+                setSummary(await ApiClient.getDashboardSummary());
+                return;
+            }
             
+            // Totals for the tabs come from the summary; the lists load one page at a time
+            try {
+                setSummary(await ApiClient.getDashboardSummary());
+            } catch (e) {
+                console.error('Error fetching dashboard summary:', e);
+                setSummary(null);
+            }
+
             // Try each endpoint individually and log results
             try {
-                const accountsData = await ApiClient.getTradingAccounts();
-                console.log('Trading accounts:', accountsData);
-                setAccounts(accountsData);
+                const accountsPage = await ApiClient.getTradingAccounts();
+                console.log('Trading accounts:', accountsPage.items);
+                setAccounts(accountsPage.items);
+                setCursor('accounts', accountsPage.nextCursor);
             } catch (e) {
                 console.error('Error fetching trading accounts:', e);
                 setAccounts([]);
+                setCursor('accounts', null);
             }
             
             try {
@@ -48,21 +73,25 @@ function Dashboard() {
             }
             
             try {
-                const scorecardsData = await ApiClient.getScorecards();
-                console.log('Scorecards:', scorecardsData);
-                setScorecards(scorecardsData);
+                const scorecardsPage = await ApiClient.getScorecards();
+                console.log('Scorecards:', scorecardsPage.items);
+                setScorecards(scorecardsPage.items);
+                setCursor('scorecards', scorecardsPage.nextCursor);
             } catch (e) {
                 console.error('Error fetching scorecards:', e);
                 setScorecards([]);
+                setCursor('scorecards', null);
             }
             
             try {
-                const inventoryData = await ApiClient.getInventory();
-                console.log('Inventory:', inventoryData);
-                setInventory(inventoryData);
+                const inventoryPage = await ApiClient.getInventory();
+                console.log('Inventory:', inventoryPage.items);
+                setInventory(inventoryPage.items);
+                setCursor('inventory', inventoryPage.nextCursor);
             } catch (e) {
                 console.error('Error fetching inventory:', e);
                 setInventory([]);
+                setCursor('inventory', null);
             }
 
         } catch (error) {
@@ -73,6 +102,31 @@ function Dashboard() {
         }
     };
 
+    const setCursor = (list: PagedList, cursor: string | null) => {
+        setCursors((current) => ({ ...current, [list]: cursor }));
+    };
+
+    // Append the next page of one list
+    const loadMore = async (list: PagedList) => {
+        const cursor = cursors[list];
+        if (!cursor) {
+            return;
+        }
+        if (list === 'accounts') {
+            const page = await ApiClient.getTradingAccounts({ cursor });
+            setAccounts((current) => [...current, ...page.items]);
+            setCursor(list, page.nextCursor);
+        } else if (list === 'scorecards') {
+            const page = await ApiClient.getScorecards({ cursor });
+            setScorecards((current) => [...current, ...page.items]);
+            setCursor(list, page.nextCursor);
+        } else {
+            const page = await ApiClient.getInventory({ cursor });
+            setInventory((current) => [...current, ...page.items]);
+            setCursor(list, page.nextCursor);
+        }
+    };
+
     useEffect(() => {
         // Only fetch data if not on home tab
         if (activeTab !== 'home') {
@@ -196,22 +250,50 @@ function Dashboard() {
                         <div className="grid grid-cols-1 md:grid-cols-4 gap-6">
                             <div className="card">
                                 <h3 className="text-lg font-semibold mb-2 text-gray-700">Trading Accounts</h3>
-                                <p className="text-3xl font-bold text-primary-600">{accounts.length}</p>
+                                <p className="text-3xl font-bold text-primary-600">{summary?.counts.trading_accounts ?? 0}</p>
+                                <p className="text-sm text-gray-500">
+                                    {summary?.trading_accounts.borrowers_with_accounts ?? 0} borrowers
+                                </p>
                             </div>
                             <div className="card">
                                 <h3 className="text-lg font-semibold mb-2 text-gray-700">Risk Factors</h3>
-                                <p className="text-3xl font-bold text-yellow-600">{riskFactors.length}</p>
+                                <p className="text-3xl font-bold text-yellow-600">{summary?.counts.risk_factors ?? 0}</p>
                             </div>
                             <div className="card">
                                 <h3 className="text-lg font-semibold mb-2 text-gray-700">Inventory Items</h3>
-                                <p className="text-3xl font-bold text-green-600">{inventory.length}</p>
+                                <p className="text-3xl font-bold text-green-600">{summary?.counts.inventory_items ?? 0}</p>
+                                <p className="text-sm text-gray-500">
+                                    Total value {(summary?.inventory.total_value ?? 0).toLocaleString()}
+                                </p>
                             </div>
                             <div className="card">
                                 <h3 className="text-lg font-semibold mb-2 text-gray-700">Scorecards</h3>
-                                <p className="text-3xl font-bold text-purple-600">{scorecards.length}</p>
+                                <p className="text-3xl font-bold text-purple-600">{summary?.counts.scorecards ?? 0}</p>
+                                {summary?.latest_scores.average != null && (
+                                    <p className="text-sm text-gray-500">
+                                        Average latest score {summary.latest_scores.average.toFixed(2)}
+                                    </p>
+                                )}
                             </div>
                         </div>
 
+                        {/* Risk Class Distribution */}
+                        <div className="card">
+                            <h3 className="text-xl font-semibold mb-4">Risk Classes</h3>
+                            {summary && summary.risk_classes.length > 0 ? (
+                                <div className="grid grid-cols-2 md:grid-cols-4 gap-4">
+                                    {summary.risk_classes.map((riskClass) => (
+                                        <div key={riskClass.risk_classification ?? 'unclassified'}>
+                                            <p className="text-sm text-gray-500">{riskClass.risk_classification ?? 'Unclassified'}</p>
+                                            <p className="text-2xl font-bold text-gray-900">{riskClass.borrowers}</p>
+                                        </div>
+                                    ))}
+                                </div>
+                            ) : (
+                                <p className="text-gray-500">No borrowers scored yet.</p>
+                            )}
+                        </div>
+
                         {/* Quick Actions */}
                         <div className="card">
                             <h3 className="text-xl font-semibold mb-4">Quick Actions</h3>
@@ -246,25 +328,29 @@ function Dashboard() {
                         {/* Recent Activity */}
                         <div className="card">
                             <h3 className="text-xl font-semibold mb-4">Recent Scorecards</h3>
-                            {scorecards.length > 0 ? (
+                            {summary && summary.recent_scorecards.length > 0 ? (
                                 <div className="overflow-x-auto">
                                     <table className="min-w-full divide-y divide-gray-200">
                                         <thead className="bg-gray-50">
                                             <tr>
                                                 <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">ID</th>
+                                                <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Borrower</th>
                                                 <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Score</th>
                                                 <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase">Created</th>
                                             </tr>
                                         </thead>
                                         <tbody className="divide-y divide-gray-200">
-                                            {scorecards.slice(0, 5).map((scorecard) => (
+                                            {summary.recent_scorecards.map((scorecard) => (
                                                 <tr key={scorecard.id}>
                                                     <td className="px-6 py-4 text-sm text-gray-900">{scorecard.id}</td>
+                                                    <td className="px-6 py-4 text-sm text-gray-900">
+                                                        {scorecard.borrower_name ?? scorecard.borrower_id}
+                                                    </td>
                                                     <td className="px-6 py-4 text-sm font-medium text-primary-600">
-                                                        {scorecard.score.toFixed(2)}
+                                                        {scorecard.final_score.toFixed(2)}
                                                     </td>
                                                     <td className="px-6 py-4 text-sm text-gray-500">
-                                                        {new Date(scorecard.created_at).toLocaleDateString()}
+                                                        {scorecard.generated_at ? new Date(scorecard.generated_at).toLocaleDateString() : ''}
                                                     </td>
                                                 </tr>
                                             ))}
@@ -279,7 +365,13 @@ function Dashboard() {
                 )}
 
                 {activeTab === 'accounts' && (
-                    <TradingAccountsTab accounts={accounts} onRefresh={fetchData} />
+                    <TradingAccountsTab
+                        accounts={accounts}
+                        total={summary?.counts.trading_accounts}
+                        hasMore={cursors.accounts !== null}
+                        onLoadMore={() => loadMore('accounts')}
+                        onRefresh={fetchData}
+                    />
                 )}
 
                 {activeTab === 'risks' && (
@@ -287,11 +379,24 @@ function Dashboard() {
                 )}
 
                 {activeTab === 'inventory' && (
-                    <InventoryTab inventory={inventory} onRefresh={fetchData} />
+                    <InventoryTab
+                        inventory={inventory}
+                        summary={summary}
+                        hasMore={cursors.inventory !== null}
+                        onLoadMore={() => loadMore('inventory')}
+                        onRefresh={fetchData}
+                    />
                 )}
 
                 {activeTab === 'scorecards' && (
-                    <ScorecardsTab scorecards={scorecards} accounts={accounts} onRefresh={fetchData} />
+                    <ScorecardsTab
+                        scorecards={scorecards}
+                        accounts={accounts}
+                        total={summary?.counts.scorecards}
+                        hasMore={cursors.scorecards !== null}
+                        onLoadMore={() => loadMore('scorecards')}
+                        onRefresh={fetchData}
+                    />
                 )}
             </div>
         </div>
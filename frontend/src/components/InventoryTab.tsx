@@ -2,14 +2,20 @@
 
 import { useState } from 'react';
 import { ApiClient } from '../api/client';
-import { InventoryItem, CreateInventoryItemForm } from '../api/types';
+import { InventoryItem, CreateInventoryItemForm, DashboardSummary } from '../api/types';
+import LoadMoreButton from './LoadMoreButton';
 
 interface Props {
+    // The pages loaded so far
     inventory: InventoryItem[];
+    // Server-side totals over all items
+    summary: DashboardSummary | null;
+    hasMore: boolean;
+    onLoadMore: () => Promise<void>;
     onRefresh: () => void;
 }
 
-export default function InventoryTab({ inventory, onRefresh }: Props) {
+export default function InventoryTab({ inventory, summary, hasMore, onLoadMore, onRefresh }: Props) {
     const [showForm, setShowForm] = useState(false);
     const [loading, setLoading] = useState(false);
     const [formData, setFormData] = useState<CreateInventoryItemForm>({
@@ -40,7 +46,10 @@ export default function InventoryTab({ inventory, onRefresh }: Props) {
         }
     };
 
-    const totalValue = inventory.reduce((sum, item) => sum + item.total_value, 0);
+    // Totals cover every item, not just the loaded pages, when the summary is available
+    const totalItems = summary?.counts.inventory_items ?? inventory.length;
+    const totalQuantity = summary?.inventory.quantity ?? inventory.reduce((sum, item) => sum + item.quantity, 0);
+    const totalValue = summary?.inventory.total_value ?? inventory.reduce((sum, item) => sum + item.total_value, 0);
 
     return (
         <div className="space-y-6">
@@ -59,13 +68,11 @@ export default function InventoryTab({ inventory, onRefresh }: Props) {
             <div className="grid grid-cols-1 md:grid-cols-3 gap-6">
                 <div className="card">
                     <h3 className="text-lg font-semibold mb-2 text-gray-700">Total Items</h3>
-                    <p className="text-3xl font-bold text-primary-600">{inventory.length}</p>
+                    <p className="text-3xl font-bold text-primary-600">{totalItems}</p>
                 </div>
                 <div className="card">
                     <h3 className="text-lg font-semibold mb-2 text-gray-700">Total Quantity</h3>
-                    <p className="text-3xl font-bold text-green-600">
-                        {inventory.reduce((sum, item) => sum + item.quantity, 0)}
-                    </p>
+                    <p className="text-3xl font-bold text-green-600">{totalQuantity}</p>
                 </div>
                 <div className="card">
                     <h3 className="text-lg font-semibold mb-2 text-gray-700">Total Value</h3>
@@ -153,7 +160,9 @@ export default function InventoryTab({ inventory, onRefresh }: Props) {
 
             {/* Inventory List */}
             <div className="card">
-                <h3 className="text-lg font-semibold mb-4">All Inventory Items ({inventory.length})</h3>
+                <h3 className="text-lg font-semibold mb-4">
+                    All Inventory Items ({hasMore ? `${inventory.length} of ${totalItems}` : inventory.length})
+                </h3>
                 {inventory.length > 0 ? (
                     <div className="overflow-x-auto">
                         <table className="min-w-full divide-y divide-gray-200">
@@ -184,6 +193,7 @@ export default function InventoryTab({ inventory, onRefresh }: Props) {
                                 ))}
                             </tbody>
                         </table>
+                        <LoadMoreButton hasMore={hasMore} onLoadMore={onLoadMore} />
                     </div>
                 ) : (
                     <p className="text-gray-500">No inventory items found. Add your first item above.</p>
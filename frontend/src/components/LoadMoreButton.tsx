@@ -0,0 +1,37 @@
+'use client';
+
+import { useState } from 'react';
+
+interface Props {
+    hasMore: boolean;
+    onLoadMore: () => Promise<void>;
+}
+
+// Fetches the next page of a list view; hidden once the last page is loaded
+export default function LoadMoreButton({ hasMore, onLoadMore }: Props) {
+    const [loading, setLoading] = useState(false);
+
+    if (!hasMore) {
+        return null;
+    }
+
+    const handleClick = async () => {
+        setLoading(true);
+        try {
+            await onLoadMore();
+        } catch (error) {
+            console.error('Error loading more rows:', error);
+            alert('Failed to load more rows');
+        } finally {
+            setLoading(false);
+        }
+    };
+
+    return (
+        <div className="flex justify-center mt-4">
+            <button onClick={handleClick} disabled={loading} className="btn-secondary disabled:opacity-50">
+                {loading ? 'Loading...' : 'Load more'}
+            </button>
+        </div>
+    );
+}
@@ -3,14 +3,20 @@
 import { useState } from 'react';
 import { ApiClient } from '../api/client';
 import { Scorecard, TradingAccount } from '../api/types';
+import LoadMoreButton from './LoadMoreButton';
 
 interface Props {
+    // The pages loaded so far
     scorecards: Scorecard[];
     accounts: TradingAccount[];
+    // All scorecards, of which `scorecards` are the pages loaded so far
+    total?: number;
+    hasMore: boolean;
+    onLoadMore: () => Promise<void>;
     onRefresh: () => void;
 }
 
-export default function ScorecardsTab({ scorecards, accounts, onRefresh }: Props) {
+export default function ScorecardsTab({ scorecards, accounts, total, hasMore, onLoadMore, onRefresh }: Props) {
     const [loading, setLoading] = useState(false);
     const [selectedBorrower, setSelectedBorrower] = useState<number | ''>('');
     const [selectedAccount, setSelectedAccount] = useState<number | ''>('');
@@ -38,7 +44,7 @@ export default function ScorecardsTab({ scorecards, accounts, onRefresh }: Props
         }
     };
 
-    // Get unique borrower IDs from accounts
+    // Get unique borrower IDs from the loaded accounts
     const uniqueBorrowerIds = Array.from(new Set(accounts.map(acc => acc.borrower_id)));
     
     // Filter accounts by selected borrower
@@ -61,11 +67,14 @@ export default function ScorecardsTab({ scorecards, accounts, onRefresh }: Props
             <div className="grid grid-cols-1 md:grid-cols-3 gap-6">
                 <div className="card">
                     <h3 className="text-lg font-semibold mb-2 text-gray-700">Total Scorecards</h3>
-                    <p className="text-3xl font-bold text-primary-600">{scorecards.length}</p>
+                    <p className="text-3xl font-bold text-primary-600">{total ?? scorecards.length}</p>
                 </div>
                 <div className="card">
                     <h3 className="text-lg font-semibold mb-2 text-gray-700">Average Score</h3>
                     <p className="text-3xl font-bold text-green-600">{averageScore.toFixed(2)}</p>
+                    {hasMore && (
+                        <p className="text-sm text-gray-500">Over the {scorecards.length} loaded</p>
+                    )}
                 </div>
                 <div className="card">
                     <h3 className="text-lg font-semibold mb-2 text-gray-700">Risk Level</h3>
@@ -132,7 +141,9 @@ export default function ScorecardsTab({ scorecards, accounts, onRefresh }: Props
 
             {/* Scorecards List */}
             <div className="card">
-                <h3 className="text-lg font-semibold mb-4">All Scorecards ({scorecards.length})</h3>
+                <h3 className="text-lg font-semibold mb-4">
+                    All Scorecards ({hasMore ? `${scorecards.length} of ${total ?? 'more'}` : scorecards.length})
+                </h3>
                 {scorecards.length > 0 ? (
                     <div className="overflow-x-auto">
                         <table className="min-w-full divide-y divide-gray-200">
@@ -176,6 +187,7 @@ export default function ScorecardsTab({ scorecards, accounts, onRefresh }: Props
                                     })}
                             </tbody>
                         </table>
+                        <LoadMoreButton hasMore={hasMore} onLoadMore={onLoadMore} />
                     </div>
                 ) : (
                     <div className="text-center py-8">
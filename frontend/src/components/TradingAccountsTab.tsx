@@ -1,20 +1,24 @@
 'use client';
 
-import { useState, useEffect } from 'react';
+import { useState } from 'react';
 import { ApiClient } from '../api/client';
 import { TradingAccount, CreateTradingAccountForm, Borrower } from '../api/types';
 import BorrowerSearchDropdown from './BorrowerSearchDropdown';
 import ProtectedAction from './ProtectedAction';
+import LoadMoreButton from './LoadMoreButton';
 
 interface Props {
     accounts: TradingAccount[];
+    // All trading accounts, of which `accounts` are the pages loaded so far
+    total?: number;
+    hasMore: boolean;
+    onLoadMore: () => Promise<void>;
     onRefresh: () => void;
 }
 
-export default function TradingAccountsTab({ accounts, onRefresh }: Props) {
+export default function TradingAccountsTab({ accounts, total, hasMore, onLoadMore, onRefresh }: Props) {
     const [showForm, setShowForm] = useState(false);
     const [loading, setLoading] = useState(false);
-    const [borrowers, setBorrowers] = useState<Borrower[]>([]);
     const [selectedBorrower, setSelectedBorrower] = useState<Borrower | null>(null);
     const [formData, setFormData] = useState<CreateTradingAccountForm>({
         borrower_id: 0,
@@ -27,20 +31,6 @@ export default function TradingAccountsTab({ accounts, onRefresh }: Props) {
         period_end_date: ''
     });
 
-    // Load borrowers on component mount
-    useEffect(() => {
-        loadBorrowers();
-    }, []);
-
-    const loadBorrowers = async () => {
-        try {
-            const borrowersData = await ApiClient.getBorrowers();
-            setBorrowers(borrowersData);
-        } catch (error) {
-            console.error('Error loading borrowers:', error);
-        }
-    };
-
     const handleBorrowerSelect = (borrower: Borrower | null) => {
         setSelectedBorrower(borrower);
         setFormData({...formData, borrower_id: borrower?.id || 0});
@@ -49,7 +39,6 @@ export default function TradingAccountsTab({ accounts, onRefresh }: Props) {
     const handleCreateNewBorrower = async (name: string) => {
         try {
             const newBorrower = await ApiClient.createBorrower({ name });
-            setBorrowers([...borrowers, newBorrower]);
             setSelectedBorrower(newBorrower);
             setFormData({...formData, borrower_id: newBorrower.id});
         } catch (error) {
@@ -127,7 +116,6 @@ export default function TradingAccountsTab({ accounts, onRefresh }: Props) {
                                     Business Name <span className="text-red-500">*</span>
                                 </label>
                                 <BorrowerSearchDropdown
-                                    borrowers={borrowers}
                                     selectedBorrower={selectedBorrower}
                                     onSelect={handleBorrowerSelect}
                                     onCreateNew={handleCreateNewBorrower}
@@ -246,7 +234,9 @@ export default function TradingAccountsTab({ accounts, onRefresh }: Props) {
 
             {/* Accounts List */}
             <div className="card">
-                <h3 className="text-lg font-semibold mb-4">All Trading Accounts ({accounts.length})</h3>
+                <h3 className="text-lg font-semibold mb-4">
+                    All Trading Accounts ({hasMore ? `${accounts.length} of ${total ?? 'more'}` : accounts.length})
+                </h3>
                 {accounts.length > 0 ? (
                     <div className="overflow-x-auto">
                         <table className="min-w-full divide-y divide-gray-200">
@@ -291,6 +281,7 @@ export default function TradingAccountsTab({ accounts, onRefresh }: Props) {
                                 ))}
                             </tbody>
                         </table>
+                        <LoadMoreButton hasMore={hasMore} onLoadMore={onLoadMore} />
                     </div>
                 ) : (
                     <p className="text-gray-500">No trading accounts found. Create your first account above.</p>
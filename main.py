@@ -3,10 +3,18 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from models.database import SessionLocal
 from api.endpoints import router as api_router
+from api.metrics import MetricsMiddleware, metrics_response
+from api.profiling import ProfilingMiddleware
+from services.metrics import mark_process_dead
+from services.profiling import ENABLED as PROFILING_ENABLED
+from services.upload_jobs import resume_jobs
 import uvicorn
+import logging
 import os
 from datetime import datetime
 
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+
 # Production-ready FastAPI configuration
 app = FastAPI(
     title="Financial Scorecard System",
@@ -32,19 +40,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    # List endpoints return the next page's cursor in a header
+    expose_headers=["X-Next-Cursor", "X-Profile-Id"],
 )
 
-# Database Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Sampling profiles of signed or operator-selected requests; absent unless configured
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Request count, latency and size per route template; outermost so it times everything
+app.add_middleware(MetricsMiddleware, routes=app.routes)
 
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
+@app.on_event("startup")
+def resume_upload_jobs():
+    # Pick up background uploads and batch runs interrupted by a restart
+    try:
+        resume_jobs()
+    except Exception:
+        logging.getLogger(__name__).exception("Could not resume upload jobs")
+
+@app.on_event("shutdown")
+def release_metrics():
+    # In multiprocess mode this worker's in-progress gauges must not outlive it
+    mark_process_dead(os.getpid())
+
 @app.get("/")
 def root():
     return {
@@ -63,6 +85,11 @@ def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text format, summed across workers in multiprocess mode"""
+    return metrics_response()
+
 @app.get("/health/full")
 def full_health_check():
     try:
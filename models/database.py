@@ -1,7 +1,22 @@
-from sqlalchemy import create_engine
+"""
+Engines, session factories and the shared session dependencies.
+
+Each API worker process gets a sync engine for ``def`` endpoints and an async
+one for ``async def`` endpoints. Their pools split ``DB_MAX_CONNECTIONS``
+between the ``WEB_CONCURRENCY`` uvicorn workers, unless ``DB_POOL_SIZE`` and
+``DB_MAX_OVERFLOW`` are set per pool. Both pools record checkout waits and
+timeouts so exhaustion under load shows up in ``pool_stats()``.
+"""
+from sqlalchemy import create_engine, event, exc, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from dotenv import load_dotenv
+from services.sql_stats import instrument_engine
+from typing import Any, Dict
 import os
+import threading
+import time
 
 load_dotenv()
 
@@ -12,9 +27,160 @@ elif not DATABASE_URL:
     # Fallback to SQLite for development
     DATABASE_URL = "sqlite:///./scorecard.db"
 
-engine = create_engine(DATABASE_URL, echo=True)
+# Connections the database allows this service, shared by every worker's two pools
+MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "40"))
+WORKERS = max(int(os.getenv("WEB_CONCURRENCY", "1")), 1)
+_per_pool = max(MAX_CONNECTIONS // (WORKERS * 2), 2)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", str(_per_pool // 2)))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", str(_per_pool - _per_pool // 2)))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Seconds before a connection is replaced, below typical server/proxy idle timeouts
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# Log every statement through SQLAlchemy; services.sql_stats logs slow and sampled ones regardless
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+
+SQLITE_PRAGMAS = {
+    # Readers do not block the writer and vice versa
+    "journal_mode": "WAL",
+    # Safe with WAL; fsync only at checkpoints
+    "synchronous": "NORMAL",
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    "temp_store": "MEMORY",
+    # Negative values are KiB: 64 MiB page cache per connection
+    "cache_size": -65536,
+}
+
+
+class PoolStatsMixin:
+    """Counts checkouts, time spent waiting for a connection, and pool timeouts."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return connection
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "size": self.size(),
+                "max_overflow": self._max_overflow,
+                "checked_out": self.checkedout(),
+                "checked_in": self.checkedin(),
+                # QueuePool counts overflow from -size; report only connections beyond the pool
+                "overflow": max(self.overflow(), 0),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "average_wait_ms": round(self.wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            }
+
+
+class StatsQueuePool(PoolStatsMixin, QueuePool):
+    pass
+
+
+class StatsAsyncQueuePool(PoolStatsMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _engine_options(url: str, poolclass) -> Dict[str, Any]:
+    options: Dict[str, Any] = {"echo": DB_ECHO}
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # In-memory databases live in one connection; keep SQLAlchemy's pool for them
+        return options
+    options.update(
+        poolclass=poolclass,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=POOL_PRE_PING,
+    )
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL, StatsQueuePool))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The same database through an asyncio driver, for async def endpoints
+ASYNC_DRIVERS = {
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def async_url(url: str) -> str:
+    """``url`` with its driver swapped for the asyncio one"""
+    scheme, rest = url.split("://", 1)
+    scheme = ASYNC_DRIVERS.get(scheme, scheme)
+    if scheme == "postgresql+asyncpg":
+        # asyncpg spells libpq's sslmode as ssl
+        rest = rest.replace("sslmode=", "ssl=")
+    return f"{scheme}://{rest}"
+
+ASYNC_DATABASE_URL = async_url(DATABASE_URL)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL, StatsAsyncQueuePool))
+# Objects stay readable after commit; async sessions cannot lazy-load expired attributes
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+if DATABASE_URL.startswith("sqlite"):
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+
+def get_db():
+    """Request-scoped session for sync endpoints"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """Request-scoped session for async endpoints"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Live pool occupancy and checkout waits of this worker's engines"""
+    stats = {"workers": WORKERS, "max_connections": MAX_CONNECTIONS}
+    for name, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+        stats[name] = pool.stats() if isinstance(pool, PoolStatsMixin) else {"pool": type(pool).__name__}
+    return stats
+
 # Import all models to ensure they are registered
 from models.entities import Base
 
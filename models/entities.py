@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime, Date
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime, Date, Index
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.sql import func
 
@@ -23,8 +23,23 @@ class TradingAccount(Base):
     period_end_date = Column(Date, nullable=False)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    # Digest of the five figures; uploads skip rows whose digest is unchanged
+    content_hash = Column(String(64), nullable=True)
     borrower = relationship('Borrower', back_populates='trading_accounts')
 
+    __table_args__ = (
+        Index('ux_trading_accounts_borrower_period', 'borrower_id', 'period_start_date', 'period_end_date', unique=True),
+        Index('ix_trading_accounts_period_end_date_id', 'period_end_date', 'id'),
+        Index('ix_trading_accounts_borrower_id_id', 'borrower_id', 'id'),
+        Index('ix_trading_accounts_borrower_id_period_end_date_id', 'borrower_id', 'period_end_date', 'id'),
+        # Range filters on the financial fields
+        Index('ix_trading_accounts_sales', 'sales'),
+        Index('ix_trading_accounts_purchases', 'purchases'),
+        Index('ix_trading_accounts_total_assets', 'total_assets'),
+        Index('ix_trading_accounts_total_liabilities', 'total_liabilities'),
+        Index('ix_trading_accounts_inventory', 'inventory'),
+    )
+
 class InventoryItem(Base):
     __tablename__ = 'inventory_items'
     id = Column(Integer, primary_key=True)
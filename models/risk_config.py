@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.sql import func
+
+Base = declarative_base()
+
+class RiskConfigVersion(Base):
+    """Single-row counter bumped whenever a risk factor changes, so every
+    worker process can cheaply tell whether its cached risk configuration is stale."""
+    __tablename__ = 'risk_config_version'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
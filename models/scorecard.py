@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.types import JSON
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.sql import func
+from models.entities import Borrower
 
 Base = declarative_base()
 
@@ -9,8 +10,15 @@ class Scorecard(Base):
     __tablename__ = 'scorecards'
 
     id = Column(Integer, primary_key=True)
-    borrower_id = Column(Integer, ForeignKey('borrowers.id'), nullable=False)
+    borrower_id = Column(Integer, ForeignKey(Borrower.__table__.c.id), nullable=False)
     final_score = Column(Float, nullable=False)
     score_breakdown = Column(JSON, nullable=True)
     risk_classification = Column(String, nullable=True)
     generated_at = Column(DateTime, default=func.now())
+    # Content address: digest of the borrower's account rows plus the risk config version
+    input_hash = Column(String(64), nullable=True)
+    config_version = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index('ix_scorecards_borrower_id_id', 'borrower_id', 'id'),
+    )
@@ -0,0 +1,45 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Index
+from sqlalchemy.types import JSON
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+class UploadJob(Base):
+    """A background job: a staged trading account upload or a batch scoring run.
+
+    For uploads, progress is written in the same transaction as each chunk of
+    rows, so ``chunks_committed`` is where a restarted job picks up. For batch
+    scoring the row counters count borrowers: ``rows_read`` scored,
+    ``rows_inserted`` given a new scorecard and ``rows_unchanged`` skipped.
+    """
+    __tablename__ = 'upload_jobs'
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(20), nullable=False, default='upload')
+    status = Column(String(20), nullable=False, default='queued')
+    filename = Column(String, nullable=True)
+    staged_path = Column(String, nullable=True)
+    chunk_size = Column(Integer, nullable=False)
+    total_rows = Column(Integer, nullable=True)
+    rows_read = Column(Integer, nullable=False, default=0)
+    rows_inserted = Column(Integer, nullable=False, default=0)
+    rows_updated = Column(Integer, nullable=False, default=0)
+    rows_unchanged = Column(Integer, nullable=False, default=0)
+    rows_rejected = Column(Integer, nullable=False, default=0)
+    chunks_committed = Column(Integer, nullable=False, default=0)
+    errors = Column(JSON, nullable=True)
+    errors_truncated = Column(Boolean, nullable=False, default=False)
+    message = Column(Text, nullable=True)
+    # Batch scoring: the borrower selection and options, and the run's summary
+    parameters = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # Refreshed with every committed chunk; a running job whose heartbeat is
+    # stale belongs to a worker that died
+    heartbeat_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_upload_jobs_status', 'status'),
+    )
@@ -0,0 +1,188 @@
+"""
+Borrower name typeahead search.
+
+A query is answered in two indexed steps and the candidates are ranked in
+Python:
+
+1. prefix matches on ``lower(name)`` as a range scan of the
+   ``ix_borrowers_name_lower`` expression index;
+2. only if that found fewer than ``limit`` names, substring matches through
+   the trigram index: the ``borrowers_fts`` FTS5 table on SQLite, the pg_trgm
+   GIN index on Postgres. Trigram indexes cannot answer queries shorter than
+   three characters, so those are prefix-only.
+
+Each step reads at most ``SEARCH_CANDIDATES`` rows, which bounds the work per
+keystroke regardless of table size. Results rank exact matches first, then
+name prefixes, then word prefixes, then other substrings; ties go to the
+shorter name.
+
+Databases without the migration 006 indexes (e.g. created with
+``create_all``) fall back to an in-memory prefix index over names and their
+words, rebuilt after local writes and at most every ``BORROWER_SEARCH_INDEX_TTL``
+seconds otherwise.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from models.entities import Borrower
+
+SEARCH_CANDIDATES = int(os.getenv("BORROWER_SEARCH_CANDIDATES", "500"))
+MEMORY_INDEX_TTL = float(os.getenv("BORROWER_SEARCH_INDEX_TTL", "60"))
+# Shortest query a trigram index can match
+TRIGRAM_MIN_LENGTH = 3
+
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING = range(4)
+
+_borrowers = Borrower.__table__
+
+
+def rank(query: str, candidates: Dict[int, str], limit: int) -> List[Tuple[int, str]]:
+    """Top ``limit`` of ``candidates`` (id -> name) for the lower-cased ``query``."""
+    def key(item):
+        borrower_id, name = item
+        lowered = name.lower()
+        if lowered == query:
+            tier = EXACT
+        elif lowered.startswith(query):
+            tier = PREFIX
+        elif any(word.startswith(query) for word in lowered.split()):
+            tier = WORD_PREFIX
+        else:
+            tier = SUBSTRING
+        return tier, len(name), lowered, borrower_id
+    return sorted(candidates.items(), key=key)[:limit]
+
+
+def _prefix_upper_bound(prefix: str) -> str:
+    """Smallest string greater than every string starting with ``prefix``."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class PrefixIndex:
+    """Sorted (token, borrower id) pairs for every name and each word in it.
+
+    A flattened prefix trie: the tokens under a prefix are one contiguous run
+    found by bisection, at one list entry per token instead of one node per
+    character.
+    """
+
+    def __init__(self, rows: List[Tuple[int, str]]):
+        entries = []
+        for borrower_id, name in rows:
+            lowered = name.lower()
+            entries.append((lowered, borrower_id))
+            words = lowered.split()
+            entries.extend((word, borrower_id) for word in words[1:] if word != lowered)
+        entries.sort()
+        self.tokens = [token for token, _ in entries]
+        self.ids = [borrower_id for _, borrower_id in entries]
+        self.names = dict(rows)
+
+    def search(self, query: str, limit: int) -> List[Tuple[int, str]]:
+        candidates: Dict[int, str] = {}
+        i = bisect_left(self.tokens, query)
+        while i < len(self.tokens) and self.tokens[i].startswith(query) and len(candidates) < SEARCH_CANDIDATES:
+            borrower_id = self.ids[i]
+            candidates[borrower_id] = self.names[borrower_id]
+            i += 1
+        return rank(query, candidates, limit)
+
+
+_backends: Dict[str, str] = {}
+_memory_index: Optional[PrefixIndex] = None
+_memory_built_at = 0.0
+_lock = threading.Lock()
+
+
+def _detect_backend(db: Session) -> str:
+    dialect = db.get_bind().dialect.name
+    if dialect == 'sqlite':
+        found = db.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'borrowers_fts'"
+        )).first()
+        return 'fts5' if found else 'memory'
+    if dialect == 'postgresql':
+        found = db.execute(text(
+            "SELECT 1 FROM pg_indexes WHERE tablename = 'borrowers' AND indexname = 'ix_borrowers_name_trgm'"
+        )).first()
+        return 'trigram' if found else 'memory'
+    return 'memory'
+
+
+def search_backend(db: Session) -> str:
+    """'fts5', 'trigram' or 'memory' for the database behind ``db``."""
+    url = str(db.get_bind().url)
+    backend = _backends.get(url)
+    if backend is None:
+        backend = _backends[url] = _detect_backend(db)
+    return backend
+
+
+def _prefix_candidates(db: Session, query: str, postgres: bool) -> Dict[int, str]:
+    key = func.lower(_borrowers.c.name)
+    if postgres:
+        # Byte order, matching the index, so the range holds exactly the prefix matches
+        key = key.collate('C')
+    rows = db.execute(
+        select(_borrowers.c.id, _borrowers.c.name)
+        .where(key >= query, key < _prefix_upper_bound(query))
+        .order_by(key)
+        .limit(SEARCH_CANDIDATES)
+    )
+    return dict(rows.all())
+
+
+def _substring_candidates(db: Session, query: str, backend: str) -> Dict[int, str]:
+    if backend == 'fts5':
+        # A quoted FTS5 string; the trigram tokenizer matches it anywhere in the name
+        rows = db.execute(text(
+            "SELECT b.id, b.name FROM borrowers_fts JOIN borrowers b ON b.id = borrowers_fts.rowid "
+            "WHERE borrowers_fts MATCH :match LIMIT :limit"
+        ), {'match': '"' + query.replace('"', '""') + '"', 'limit': SEARCH_CANDIDATES})
+    else:
+        pattern = '%' + query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        rows = db.execute(
+            select(_borrowers.c.id, _borrowers.c.name)
+            .where(func.lower(_borrowers.c.name).like(pattern, escape='\\'))
+            .limit(SEARCH_CANDIDATES)
+        )
+    return dict(rows.all())
+
+
+def _get_memory_index(db: Session) -> PrefixIndex:
+    global _memory_index, _memory_built_at
+    with _lock:
+        if _memory_index is None or time.monotonic() - _memory_built_at > MEMORY_INDEX_TTL:
+            rows = db.execute(select(_borrowers.c.id, _borrowers.c.name)).all()
+            _memory_index = PrefixIndex([(borrower_id, name) for borrower_id, name in rows])
+            _memory_built_at = time.monotonic()
+        return _memory_index
+
+
+def invalidate_search_index() -> None:
+    """Drop the in-memory index after borrowers were created, renamed or deleted."""
+    global _memory_index
+    with _lock:
+        _memory_index = None
+
+
+def search_borrowers(db: Session, query: str, limit: int = 10) -> List[Tuple[int, str]]:
+    """The ``limit`` best (id, name) matches for ``query``, best first."""
+    query = query.strip().lower()
+    if not query:
+        return []
+    backend = search_backend(db)
+    if backend == 'memory':
+        return _get_memory_index(db).search(query, limit)
+
+    candidates = _prefix_candidates(db, query, backend == 'trigram')
+    if len(candidates) < limit and len(query) >= TRIGRAM_MIN_LENGTH:
+        for borrower_id, name in _substring_candidates(db, query, backend).items():
+            candidates.setdefault(borrower_id, name)
+    return rank(query, candidates, limit)
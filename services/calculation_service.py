@@ -1,66 +1,146 @@
 from models.database import SessionLocal
-from models.trading_account import TradingAccount
+from models.entities import TradingAccount
 from models.risk_factors import RiskFactor
-from models.entities import Scorecard
+from models.scorecard import Scorecard
+from services.formula import ACCOUNT_FIELDS, compile_formula
+from services.rating_scale import CompiledRatingScale, get_compiled_rating_scale
+from services.risk_config import RiskConfig, get_risk_config
+from services.scoring_engine import (
+    account_factor_entry,
+    accounts_digest,
+    build_score_breakdown,
+    final_score_from_cells,
+)
 from sqlalchemy.orm import Session
-import operator
-import re
-from typing import Any, Dict
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
 
+# Lower score bounds for each risk classification, best first; anything below is High Risk
+RISK_CLASSIFICATIONS = [
+    (0.7, 'Low Risk'),
+    (0.4, 'Medium Risk'),
+]
+
+CLASSIFICATION_LABELS = [classification for _, classification in RISK_CLASSIFICATIONS] + ['High Risk']
+
+def classify_score(score: float) -> str:
+    for threshold, classification in RISK_CLASSIFICATIONS:
+        if score >= threshold:
+            return classification
+    return 'High Risk'
+
+def classification_indices(scores: np.ndarray) -> np.ndarray:
+    """Vectorized classify_score, as indices into CLASSIFICATION_LABELS"""
+    thresholds = np.array([threshold for threshold, _ in RISK_CLASSIFICATIONS], dtype=float)
+    return np.sum(np.asarray(scores, dtype=float)[..., None] < thresholds, axis=-1)
+
 class CalculationService:
     def __init__(self, db: Session):
         self.db = db
 
     def calculate_ratio(self, trading_account_data: Dict[str, Any], formula: str) -> float:
-        # Only allow safe variable names and operators
-        allowed_names = set(trading_account_data.keys())
-        code = formula
-        # Replace variable names in formula with their values
-        for name in allowed_names:
-            code = re.sub(rf'\b{name}\b', str(trading_account_data[name]), code)
-        # Only allow safe characters
-        if not re.match(r'^[\d\s\+\-\*/\.\(\)]+$', code):
-            raise ValueError("Unsafe formula detected")
-        try:
-            return eval(code, {"__builtins__": None}, {})
-        except Exception:
-            return 0.0
+        # Formulas are parsed and validated once, then reused from the compile cache
+        return compile_formula(formula).evaluate(trading_account_data)
 
-    def get_rating_for_ratio(self, ratio_name: str, value: float) -> float:
-        risk_factor = self.db.query(RiskFactor).filter(RiskFactor.name == ratio_name).first()
-        if not risk_factor or not risk_factor.rating_scale:
-            return 0.0
-        for rating, bounds in risk_factor.rating_scale.items():
-            if bounds['min'] <= value <= bounds['max']:
-                return bounds.get('score', 0.0)
-        return 0.0
+    def get_rating_for_ratio(self, ratio_name: str, value: float,
+                             rating_scale: Optional[CompiledRatingScale] = None) -> float:
+        # Scoring loops pass the factor's compiled scale; looking it up by name is
+        # only a fallback for one-off callers
+        if rating_scale is None:
+            risk_factor = self.db.query(RiskFactor).filter(RiskFactor.name == ratio_name).first()
+            if not risk_factor or not risk_factor.rating_scale:
+                return 0.0
+            rating_scale = get_compiled_rating_scale(risk_factor)
+        return rating_scale.score_for(value)
 
-    def calculate_final_score(self, borrower_id: int) -> float:
-        accounts = self.db.query(TradingAccount).filter(TradingAccount.borrower_id == borrower_id).all()
-        risk_factors = self.db.query(RiskFactor).all()
-        final_score = 0.0
-        for account in accounts:
-            account_data = account.__dict__
-            for risk in risk_factors:
-                if risk.factor_type == 'financial' and risk.formula:
-                    ratio = self.calculate_ratio(account_data, risk.formula)
-                    rating_score = self.get_rating_for_ratio(risk.name, ratio)
-                    final_score += rating_score * risk.weight
-        # Dummy non-financial factors (replace with actual table if available)
-        non_financial_factors = [
-            {'name': 'Management Quality', 'weight': 0.1, 'score': 0.8},
-            {'name': 'Market Position', 'weight': 0.1, 'score': 0.7}
-        ]
-        for nf in non_financial_factors:
-            final_score += nf['score'] * nf['weight']
-        # Save to Scorecard
+    def get_accounts(self, borrower_id: int) -> List[TradingAccount]:
+        return (
+            self.db.query(TradingAccount)
+            .filter(TradingAccount.borrower_id == borrower_id)
+            .order_by(TradingAccount.id)
+            .all()
+        )
+
+    def compute_factor_scores(self, borrower_id: int, accounts: Optional[List[TradingAccount]] = None,
+                              config: Optional[RiskConfig] = None
+                              ) -> Tuple[RiskConfig, List[float], List[List[Dict[str, Any]]]]:
+        """Weighted contribution of each financial factor for one borrower,
+        plus the ratio, band, rating and contribution of each account behind it"""
+        if accounts is None:
+            accounts = self.get_accounts(borrower_id)
+        if config is None:
+            config = get_risk_config(self.db)
+        # Accumulate per factor, then across factors, in the same order as
+        # services.scoring_engine so both paths produce identical floats
+        factor_scores = []
+        factor_accounts = []
+        for factor in config.financial_factors:
+            factor_score = 0.0
+            entries = []
+            for account in accounts:
+                ratio = factor.formula.evaluate(account.__dict__)
+                band, rating_score = factor.scale.band_for(ratio)
+                contribution = rating_score * factor.weight
+                factor_score += contribution
+                entries.append(account_factor_entry(account.id, ratio, band, rating_score, contribution))
+            factor_scores.append(factor_score)
+            factor_accounts.append(entries)
+        return config, factor_scores, factor_accounts
+
+    def compute_final_score(self, borrower_id: int) -> float:
+        """Score one borrower without persisting anything"""
+        _, factor_scores, _ = self.compute_factor_scores(borrower_id)
+        # Adds the dummy non-financial factors (replace with actual table if available)
+        return final_score_from_cells(factor_scores)
+
+    def calculate_scorecard(self, borrower_id: int, trading_account_id: Optional[int] = None) -> Scorecard:
+        """Score a borrower and save the result as a new Scorecard.
+
+        The score covers all of the borrower's trading accounts; when
+        ``trading_account_id`` is given it must belong to the borrower. If the
+        borrower's latest scorecard was computed from the same account rows
+        under the same risk config version it is returned as is and nothing
+        is written.
+        """
+        if trading_account_id is not None:
+            account = self.db.query(TradingAccount).filter(TradingAccount.id == trading_account_id).first()
+            if not account or account.borrower_id != borrower_id:
+                raise ValueError(f"Trading account {trading_account_id} does not belong to borrower {borrower_id}")
+        accounts = self.get_accounts(borrower_id)
+        config = get_risk_config(self.db)
+        input_hash = accounts_digest(
+            np.array([account.id for account in accounts], dtype=np.int64),
+            {
+                field: np.array([getattr(account, field) for account in accounts], dtype=np.float64)
+                for field in ACCOUNT_FIELDS
+            },
+        )
+        latest = (
+            self.db.query(Scorecard)
+            .filter(Scorecard.borrower_id == borrower_id)
+            .order_by(Scorecard.id.desc())
+            .first()
+        )
+        if latest and latest.input_hash == input_hash and latest.config_version == config.version:
+            return latest
+
+        config, factor_scores, factor_accounts = self.compute_factor_scores(borrower_id, accounts, config)
+        final_score = final_score_from_cells(factor_scores)
         scorecard = Scorecard(
             borrower_id=borrower_id,
-            score=final_score,
-            created_at=datetime.utcnow()
+            final_score=final_score,
+            score_breakdown=build_score_breakdown(config.version, config.financial_factors, factor_scores,
+                                                  factor_accounts),
+            risk_classification=classify_score(final_score),
+            generated_at=datetime.utcnow(),
+            input_hash=input_hash,
+            config_version=config.version
         )
         self.db.add(scorecard)
         self.db.commit()
         self.db.refresh(scorecard)
-        return final_score
+        return scorecard
+
+    def calculate_final_score(self, borrower_id: int) -> float:
+        return self.calculate_scorecard(borrower_id).final_score
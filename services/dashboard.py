@@ -0,0 +1,158 @@
+"""
+Portfolio summary for the dashboard.
+
+Every figure is an aggregate computed in the database, so the payload stays
+the same size however many borrowers, accounts and scorecards there are.
+Results are cached per process for ``DASHBOARD_CACHE_SECONDS`` (0 disables
+the cache); a dashboard refresh within that window costs no queries.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models.entities import Borrower, TradingAccount
+from models.inventory import InventoryItem
+from models.risk_factors import RiskFactor
+from models.scorecard import Scorecard
+
+CACHE_SECONDS = float(os.getenv("DASHBOARD_CACHE_SECONDS", "5"))
+
+_accounts = TradingAccount.__table__
+_scorecards = Scorecard.__table__
+_inventory = InventoryItem.__table__
+
+_cache: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+_lock = threading.Lock()
+
+
+def _latest_ids():
+    """Id of each borrower's most recent scorecard, served by ix_scorecards_borrower_id_id."""
+    return select(func.max(_scorecards.c.id)).group_by(_scorecards.c.borrower_id)
+
+
+def _counts(db: Session) -> Dict[str, int]:
+    counts = select(
+        select(func.count()).select_from(Borrower.__table__).scalar_subquery().label('borrowers'),
+        select(func.count()).select_from(_accounts).scalar_subquery().label('trading_accounts'),
+        select(func.count()).select_from(RiskFactor.__table__).scalar_subquery().label('risk_factors'),
+        select(func.count()).select_from(_inventory).scalar_subquery().label('inventory_items'),
+        select(func.count()).select_from(_scorecards).scalar_subquery().label('scorecards'),
+    )
+    return dict(db.execute(counts).one()._mapping)
+
+
+def _account_totals(db: Session) -> Dict[str, Any]:
+    row = db.execute(select(
+        func.count(func.distinct(_accounts.c.borrower_id)).label('borrowers_with_accounts'),
+        func.coalesce(func.sum(_accounts.c.sales), 0.0).label('sales'),
+        func.coalesce(func.sum(_accounts.c.purchases), 0.0).label('purchases'),
+        func.coalesce(func.sum(_accounts.c.total_assets), 0.0).label('total_assets'),
+        func.coalesce(func.sum(_accounts.c.total_liabilities), 0.0).label('total_liabilities'),
+        func.coalesce(func.sum(_accounts.c.inventory), 0.0).label('inventory'),
+        func.max(_accounts.c.period_end_date).label('latest_period_end'),
+    )).one()
+    return dict(row._mapping)
+
+
+def _risk_classes(db: Session) -> Dict[str, Any]:
+    latest = _scorecards.c.id.in_(_latest_ids())
+    stats = db.execute(select(
+        func.count().label('scored_borrowers'),
+        func.avg(_scorecards.c.final_score).label('average'),
+        func.min(_scorecards.c.final_score).label('minimum'),
+        func.max(_scorecards.c.final_score).label('maximum'),
+    ).where(latest)).one()
+    classes = db.execute(
+        select(
+            _scorecards.c.risk_classification,
+            func.count().label('borrowers'),
+            func.avg(_scorecards.c.final_score).label('average_score'),
+        )
+        .where(latest)
+        .group_by(_scorecards.c.risk_classification)
+        .order_by(func.count().desc())
+    ).all()
+    return {
+        'latest_scores': dict(stats._mapping),
+        'risk_classes': [
+            {'risk_classification': name, 'borrowers': borrowers, 'average_score': average}
+            for name, borrowers, average in classes
+        ],
+    }
+
+
+def _inventory_totals(db: Session) -> Dict[str, Any]:
+    row = db.execute(select(
+        func.coalesce(func.sum(_inventory.c.quantity), 0).label('quantity'),
+        func.coalesce(func.sum(_inventory.c.quantity * _inventory.c.unit_price), 0.0).label('total_value'),
+    )).one()
+    return dict(row._mapping)
+
+
+def _top_borrowers(db: Session, top: int) -> List[Dict[str, Any]]:
+    """The ``top`` borrowers by total sales with their account totals and latest score."""
+    if top <= 0:
+        return []
+    totals = (
+        select(
+            _accounts.c.borrower_id,
+            func.count().label('accounts'),
+            func.sum(_accounts.c.sales).label('sales'),
+            func.sum(_accounts.c.total_assets).label('total_assets'),
+            func.sum(_accounts.c.total_liabilities).label('total_liabilities'),
+        )
+        .group_by(_accounts.c.borrower_id)
+        .order_by(func.sum(_accounts.c.sales).desc(), _accounts.c.borrower_id)
+        .limit(top)
+        .subquery()
+    )
+    latest = select(_scorecards).where(_scorecards.c.id.in_(_latest_ids())).subquery()
+    rows = db.execute(
+        select(
+            totals.c.borrower_id, Borrower.name, totals.c.accounts, totals.c.sales,
+            totals.c.total_assets, totals.c.total_liabilities,
+            latest.c.final_score, latest.c.risk_classification,
+        )
+        .join(Borrower, Borrower.id == totals.c.borrower_id)
+        .outerjoin(latest, latest.c.borrower_id == totals.c.borrower_id)
+        .order_by(totals.c.sales.desc(), totals.c.borrower_id)
+    ).all()
+    return [dict(row._mapping) for row in rows]
+
+
+def _recent_scorecards(db: Session, limit: int = 5) -> List[Dict[str, Any]]:
+    rows = db.execute(
+        select(_scorecards.c.id, _scorecards.c.borrower_id, Borrower.name.label('borrower_name'),
+               _scorecards.c.final_score, _scorecards.c.risk_classification, _scorecards.c.generated_at)
+        .outerjoin(Borrower, Borrower.id == _scorecards.c.borrower_id)
+        .order_by(_scorecards.c.id.desc())
+        .limit(limit)
+    ).all()
+    return [dict(row._mapping) for row in rows]
+
+
+def portfolio_summary(db: Session, top: int = 5, max_age: Optional[float] = None) -> Dict[str, Any]:
+    """Counts, totals, risk class distribution and the top borrowers, cached for ``max_age`` seconds."""
+    max_age = CACHE_SECONDS if max_age is None else max_age
+    now = time.monotonic()
+    with _lock:
+        cached = _cache.get(top)
+    if cached is not None and now - cached[0] < max_age:
+        return cached[1]
+    summary = {
+        'counts': _counts(db),
+        'trading_accounts': _account_totals(db),
+        **_risk_classes(db),
+        'inventory': _inventory_totals(db),
+        'top_borrowers': _top_borrowers(db, top),
+        'recent_scorecards': _recent_scorecards(db),
+        'computed_at': datetime.utcnow(),
+    }
+    with _lock:
+        _cache[top] = (now, summary)
+    return summary
@@ -0,0 +1,204 @@
+"""
+Formula compilation for financial risk factors.
+
+A ``RiskFactor.formula`` such as ``"total_assets / total_liabilities"`` is
+parsed once into a Python AST, checked against a whitelist of arithmetic
+nodes and trading-account fields, and compiled into a plain function that
+takes the referenced fields as positional float arguments. The same AST is
+also compiled into a column-wise variant that evaluates over NumPy arrays.
+"""
+import ast
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+
+from services.metrics import record_cache
+
+# Numeric trading account columns a formula is allowed to reference
+ACCOUNT_FIELDS = ('sales', 'purchases', 'total_assets', 'total_liabilities', 'inventory')
+
+_BINARY_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div)
+_UNARY_OPS = (ast.UAdd, ast.USub)
+
+# Name of the division callback injected into the column-wise variant
+_DIVIDE = '__divide'
+
+
+class FormulaError(ValueError):
+    """Raised when a formula is not a safe arithmetic expression over account fields."""
+
+
+class CompiledFormula:
+    """A validated formula compiled into ``func(*values)``.
+
+    ``variables`` lists the account fields the formula reads, in the order
+    ``func`` expects them.
+    """
+    __slots__ = ('source', 'variables', 'func', 'array_func')
+
+    def __init__(self, source: str, variables: Tuple[str, ...], func, array_func):
+        self.source = source
+        self.variables = variables
+        self.func = func
+        self.array_func = array_func
+
+    def __call__(self, *values: float) -> float:
+        return self.func(*values)
+
+    def evaluate(self, row: Mapping[str, Any]) -> float:
+        """Evaluate against a mapping of field name to value.
+
+        Division by zero (or any other arithmetic failure) yields 0.0, which is
+        what the original string-substitution evaluator returned.
+        """
+        try:
+            values = [float(row[name]) for name in self.variables]
+        except KeyError as e:
+            raise FormulaError(f"Missing value for formula variable {e.args[0]!r}")
+        try:
+            return self.func(*values)
+        except ArithmeticError:
+            return 0.0
+
+    def evaluate_columns(self, columns: Mapping[str, np.ndarray]) -> np.ndarray:
+        """Evaluate over whole columns at once.
+
+        Columns may be of any shape as long as they broadcast together. Matches
+        ``evaluate`` element for element: wherever any division in the formula
+        has a zero denominator the result is 0.0.
+        """
+        shape = np.broadcast_shapes(*(np.shape(column) for column in columns.values()))
+        zero_division = []
+
+        def divide(numerator, denominator):
+            zero_division.append(np.equal(denominator, 0))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.true_divide(numerator, denominator)
+
+        try:
+            values = [np.asarray(columns[name], dtype=float) for name in self.variables]
+        except KeyError as e:
+            raise FormulaError(f"Missing column for formula variable {e.args[0]!r}")
+        with np.errstate(over='ignore', invalid='ignore'):
+            result = np.array(np.broadcast_to(self.array_func(divide, *values), shape), dtype=float)
+        for mask in zero_division:
+            result[np.broadcast_to(mask, shape)] = 0.0
+        return result
+
+    def __repr__(self):
+        return f"CompiledFormula({self.source!r})"
+
+
+class _FormulaValidator(ast.NodeVisitor):
+    def __init__(self, allowed_names):
+        self.allowed_names = allowed_names
+        self.names = set()
+
+    def visit_Expression(self, node):
+        self.visit(node.body)
+
+    def visit_BinOp(self, node):
+        if not isinstance(node.op, _BINARY_OPS):
+            raise FormulaError(f"Operator {type(node.op).__name__} is not allowed")
+        self.visit(node.left)
+        self.visit(node.right)
+
+    def visit_UnaryOp(self, node):
+        if not isinstance(node.op, _UNARY_OPS):
+            raise FormulaError(f"Operator {type(node.op).__name__} is not allowed")
+        self.visit(node.operand)
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise FormulaError(f"Constant {node.value!r} is not allowed")
+
+    def visit_Name(self, node):
+        if node.id not in self.allowed_names:
+            raise FormulaError(f"Unknown variable {node.id!r}")
+        self.names.add(node.id)
+
+    def generic_visit(self, node):
+        raise FormulaError(f"Unsafe formula element: {type(node).__name__}")
+
+
+class _DivisionRewriter(ast.NodeTransformer):
+    """Rewrite ``a / b`` into ``__divide(a, b)`` for the column-wise variant."""
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Div):
+            return ast.Call(
+                func=ast.Name(id=_DIVIDE, ctx=ast.Load()),
+                args=[node.left, node.right],
+                keywords=[],
+            )
+        return node
+
+
+def _compile_lambda(params, body):
+    args = ast.arguments(
+        posonlyargs=[],
+        args=[ast.arg(arg=name) for name in params],
+        kwonlyargs=[],
+        kw_defaults=[],
+        defaults=[],
+    )
+    tree = ast.Expression(body=ast.Lambda(args=args, body=body))
+    ast.fix_missing_locations(tree)
+    code = compile(tree, '<formula>', 'eval')
+    return eval(code, {'__builtins__': {}}, {})
+
+
+@lru_cache(maxsize=1024)
+def compile_formula(formula: str, allowed_names: Tuple[str, ...] = ACCOUNT_FIELDS) -> CompiledFormula:
+    """Parse, validate and compile a formula string. Results are memoized by source."""
+    if not formula or not formula.strip():
+        raise FormulaError("Formula is empty")
+    try:
+        tree = ast.parse(formula.strip(), mode='eval')
+    except SyntaxError as e:
+        raise FormulaError(f"Invalid formula syntax: {e.msg}")
+
+    validator = _FormulaValidator(set(allowed_names))
+    validator.visit(tree)
+    variables = tuple(sorted(validator.names))
+
+    # Wrap the validated expression in ``lambda <variables>: <expr>``
+    func = _compile_lambda(variables, tree.body)
+    array_body = _DivisionRewriter().visit(ast.parse(formula.strip(), mode='eval').body)
+    array_func = _compile_lambda((_DIVIDE,) + variables, array_body)
+    return CompiledFormula(formula, variables, func, array_func)
+
+
+# Compiled formulas per risk factor id, tagged with the factor's updated_at
+_factor_cache: Dict[int, Tuple[Any, CompiledFormula]] = {}
+_factor_cache_lock = threading.Lock()
+
+
+def get_compiled_formula(risk_factor) -> Optional[CompiledFormula]:
+    """Return the compiled formula for a RiskFactor, reusing the cached one
+    while the factor's id, updated_at and formula text are unchanged."""
+    if not risk_factor.formula:
+        return None
+    cached = _factor_cache.get(risk_factor.id)
+    if cached is not None:
+        updated_at, compiled = cached
+        if updated_at == risk_factor.updated_at and compiled.source == risk_factor.formula:
+            record_cache('formula', hit=True)
+            return compiled
+    record_cache('formula', hit=False)
+    compiled = compile_formula(risk_factor.formula)
+    with _factor_cache_lock:
+        _factor_cache[risk_factor.id] = (risk_factor.updated_at, compiled)
+    return compiled
+
+
+def clear_formula_cache(factor_id: Optional[int] = None) -> None:
+    """Drop cached compiled formulas for one factor, or for all factors."""
+    with _factor_cache_lock:
+        if factor_id is None:
+            _factor_cache.clear()
+        else:
+            _factor_cache.pop(factor_id, None)
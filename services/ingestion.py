@@ -0,0 +1,325 @@
+"""
+Chunked ingestion of trading account files.
+
+Uploads are read ``INGEST_CHUNK_SIZE`` rows at a time: .xlsx through
+openpyxl in read-only mode, CSV through pandas' chunked reader and Parquet
+by record batch (needs pyarrow). Each chunk is validated and coerced column
+by column and then upserted on (borrower_id, period_start_date,
+period_end_date): new periods with one bulk INSERT, periods whose content
+hash changed with one executemany UPDATE, and unchanged rows not at all, so
+re-uploading a file costs only the rows that differ. Each chunk commits on
+its own, so neither memory nor transaction size grows with the file.
+Invalid rows are skipped and reported, numbered as in a spreadsheet with the
+header as row 1. Readers yield frames indexed by that row number.
+"""
+import hashlib
+import os
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from models.entities import Borrower, TradingAccount
+from services.formula import ACCOUNT_FIELDS
+
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "10000"))
+# Rows listed in the error report; later errors are only counted
+MAX_REPORTED_ERRORS = int(os.getenv("INGEST_MAX_REPORTED_ERRORS", "1000"))
+
+NUMERIC_COLUMNS = ACCOUNT_FIELDS
+DATE_COLUMNS = ('period_start_date', 'period_end_date')
+REQUIRED_COLUMNS = ('borrower_id',) + NUMERIC_COLUMNS + DATE_COLUMNS
+# One trading account per borrower and period; matches the unique index
+KEY_COLUMNS = ('borrower_id', 'period_start_date', 'period_end_date')
+
+SUPPORTED_EXTENSIONS = ('.xlsx', '.xls', '.csv', '.parquet')
+
+# Spreadsheet row of the first data row
+_FIRST_ROW = 2
+
+
+class IngestionError(ValueError):
+    """The file as a whole cannot be ingested (type, columns, dependencies)."""
+
+
+class IngestionReport:
+    """Counts and per-row errors of one ingestion."""
+
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_inserted = 0
+        self.rows_updated = 0
+        self.rows_unchanged = 0
+        self.rows_rejected = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.errors_truncated = False
+        self.chunks = 0
+        self.borrower_ids: Set[int] = set()
+
+    def reject(self, rows: np.ndarray, column: str, values: pd.Series, message: str) -> None:
+        for row, value in zip(rows.tolist(), values.tolist()):
+            if len(self.errors) >= MAX_REPORTED_ERRORS:
+                self.errors_truncated = True
+                return
+            self.errors.append({
+                'row': row,
+                'column': column,
+                'value': None if pd.isna(value) else str(value),
+                'message': message,
+            })
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'rows_read': self.rows_read,
+            'rows_inserted': self.rows_inserted,
+            'rows_updated': self.rows_updated,
+            'rows_unchanged': self.rows_unchanged,
+            'rows_rejected': self.rows_rejected,
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+            'errors_truncated': self.errors_truncated,
+        }
+
+
+def upload_summary(report: IngestionReport) -> str:
+    return (f"Inserted {report.rows_inserted}, updated {report.rows_updated} and left "
+            f"{report.rows_unchanged} unchanged trading accounts.")
+
+
+def account_content_hash(values: Dict[str, Any]) -> str:
+    """Digest of an account's figures; its key columns are not included."""
+    figures = np.array([values[column] for column in NUMERIC_COLUMNS], dtype=np.float64)
+    return hashlib.sha256(figures.tobytes()).hexdigest()
+
+
+def _content_hashes(columns: Dict[str, np.ndarray]) -> List[str]:
+    figures = np.column_stack([columns[column] for column in NUMERIC_COLUMNS]).astype(np.float64)
+    return [hashlib.sha256(row.tobytes()).hexdigest() for row in figures]
+
+
+def _frames(header: Tuple[Any, ...], rows: Iterator[Tuple[Any, ...]], chunk_size: int) -> Iterator[pd.DataFrame]:
+    columns = [str(name).strip() if name is not None else '' for name in header]
+    chunk, row_numbers = [], []
+    for row_number, row in enumerate(rows, _FIRST_ROW):
+        # Read-only worksheets often end in formatted but empty rows
+        if row.count(None) == len(row):
+            continue
+        chunk.append(row[:len(columns)])
+        row_numbers.append(row_number)
+        if len(chunk) >= chunk_size:
+            yield pd.DataFrame.from_records(chunk, columns=columns, index=row_numbers)
+            chunk, row_numbers = [], []
+    if chunk:
+        yield pd.DataFrame.from_records(chunk, columns=columns, index=row_numbers)
+
+
+def _numbered(frames: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    first_row = _FIRST_ROW
+    for frame in frames:
+        frame.index = pd.RangeIndex(first_row, first_row + len(frame))
+        first_row += len(frame)
+        yield frame
+
+
+def read_xlsx_chunks(file: BinaryIO, chunk_size: int) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield from _frames(header, rows, chunk_size)
+    finally:
+        workbook.close()
+
+
+def read_xls_chunks(file: BinaryIO, chunk_size: int) -> Iterator[pd.DataFrame]:
+    # The legacy binary format has no streaming reader; load it once and slice
+    frame = pd.read_excel(file)
+    yield from _numbered(frame.iloc[start:start + chunk_size] for start in range(0, len(frame), chunk_size))
+
+
+def read_csv_chunks(file: BinaryIO, chunk_size: int) -> Iterator[pd.DataFrame]:
+    yield from _numbered(pd.read_csv(file, chunksize=chunk_size, skipinitialspace=True))
+
+
+def read_parquet_chunks(file: BinaryIO, chunk_size: int) -> Iterator[pd.DataFrame]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise IngestionError("Parquet uploads need pyarrow installed on the server.")
+    batches = pq.ParquetFile(file).iter_batches(batch_size=chunk_size)
+    yield from _numbered(batch.to_pandas() for batch in batches)
+
+
+READERS = {
+    '.xlsx': read_xlsx_chunks,
+    '.xls': read_xls_chunks,
+    '.csv': read_csv_chunks,
+    '.parquet': read_parquet_chunks,
+}
+
+
+def reader_for(filename: str):
+    extension = os.path.splitext(filename.lower())[1]
+    if extension not in READERS:
+        raise IngestionError(
+            f"Invalid file type. Please upload one of: {', '.join(SUPPORTED_EXTENSIONS)}."
+        )
+    return READERS[extension]
+
+
+def _known_borrowers(db: Session, borrower_ids: np.ndarray) -> np.ndarray:
+    ids = np.unique(borrower_ids).tolist()
+    found = db.execute(select(Borrower.id).where(Borrower.id.in_(ids))).scalars().all()
+    return np.isin(borrower_ids, np.array(found, dtype=np.int64))
+
+
+def _to_dates(values: pd.Series) -> pd.Series:
+    dates = pd.to_datetime(values, errors='coerce')
+    # The format is inferred from the first value; parse stragglers one by one
+    retry = dates.isna() & values.notna()
+    if retry.any():
+        dates[retry] = pd.to_datetime(values[retry], errors='coerce', format='mixed')
+    return dates
+
+
+def coerce_chunk(db: Session, frame: pd.DataFrame, report: IngestionReport) -> List[Dict[str, Any]]:
+    """Validate ``frame`` column by column; return insert rows for the valid ones."""
+    rows = frame.index.to_numpy()
+    valid = np.ones(len(frame), dtype=bool)
+    columns: Dict[str, Any] = {}
+
+    def check(column: str, ok: np.ndarray, message: str) -> None:
+        if not ok.all():
+            report.reject(rows[~ok], column, frame[column][~ok], message)
+            valid[:] = valid & ok
+
+    borrower_ids = pd.to_numeric(frame['borrower_id'], errors='coerce').to_numpy(dtype=np.float64)
+    integral = np.isfinite(borrower_ids) & (borrower_ids == np.round(borrower_ids))
+    check('borrower_id', integral, "borrower_id must be a whole number")
+    borrower_ids = np.where(integral, borrower_ids, 0).astype(np.int64)
+    if integral.any():
+        known = ~integral
+        known[integral] = _known_borrowers(db, borrower_ids[integral])
+        check('borrower_id', known, "Borrower not found")
+    columns['borrower_id'] = borrower_ids
+
+    for column in NUMERIC_COLUMNS:
+        values = pd.to_numeric(frame[column], errors='coerce').to_numpy(dtype=np.float64)
+        check(column, np.isfinite(values), f"{column} must be a number")
+        columns[column] = values
+
+    for column in DATE_COLUMNS:
+        values = _to_dates(frame[column])
+        check(column, values.notna().to_numpy(), f"{column} must be a date")
+        columns[column] = values.dt.date.to_numpy()
+
+    # A period listed twice in one chunk: the last row wins
+    keys = pd.DataFrame({column: columns[column] for column in KEY_COLUMNS})
+    superseded = (keys[valid].duplicated(keep='last')).reindex(keys.index, fill_value=False).to_numpy()
+    check('period_start_date', ~superseded, "Superseded by a later row for the same borrower and period")
+
+    report.rows_rejected += int((~valid).sum())
+    valid_columns = {column: columns[column][valid] for column in REQUIRED_COLUMNS}
+    valid_columns['content_hash'] = np.array(_content_hashes(valid_columns), dtype=object)
+    names = REQUIRED_COLUMNS + ('content_hash',)
+    return [dict(zip(names, values)) for values in zip(*(valid_columns[name].tolist() for name in names))]
+
+
+def upsert_chunk(db: Session, records: List[Dict[str, Any]], report: IngestionReport) -> None:
+    """Insert new periods and update changed ones; rows whose hash matches are skipped."""
+    accounts = TradingAccount.__table__
+    # Narrowed by each key column so borrowers with long histories only return candidate periods
+    existing = {
+        (borrower_id, start, end): (account_id, content_hash)
+        for account_id, borrower_id, start, end, content_hash in db.execute(
+            select(accounts.c.id, accounts.c.borrower_id, accounts.c.period_start_date,
+                   accounts.c.period_end_date, accounts.c.content_hash)
+            .where(*(
+                accounts.c[column].in_(sorted({record[column] for record in records}))
+                for column in KEY_COLUMNS
+            ))
+        )
+    }
+    inserts, updates = [], []
+    for record in records:
+        found = existing.get(tuple(record[column] for column in KEY_COLUMNS))
+        if found is None:
+            inserts.append(record)
+        elif found[1] != record['content_hash']:
+            changes = {column: record[column] for column in NUMERIC_COLUMNS + ('content_hash',)}
+            updates.append({'account_id': found[0], **changes})
+        else:
+            report.rows_unchanged += 1
+            continue
+        report.borrower_ids.add(record['borrower_id'])
+    if inserts:
+        db.execute(insert(accounts), inserts)
+    if updates:
+        db.execute(update(accounts).where(accounts.c.id == bindparam('account_id')), updates)
+    report.rows_inserted += len(inserts)
+    report.rows_updated += len(updates)
+
+
+def estimate_rows(path: str) -> Optional[int]:
+    """Data rows in a staged file when they can be counted cheaply, else None."""
+    extension = os.path.splitext(path.lower())[1]
+    try:
+        if extension == '.csv':
+            with open(path, 'rb') as f:
+                lines = sum(block.count(b'\n') for block in iter(lambda: f.read(1 << 20), b''))
+            return max(lines - 1, 0)
+        if extension == '.xlsx':
+            from openpyxl import load_workbook
+            workbook = load_workbook(path, read_only=True)
+            try:
+                # From the sheet's declared dimensions; may be absent or padded
+                max_row = workbook.active.max_row
+            finally:
+                workbook.close()
+            return max(max_row - 1, 0) if max_row else None
+        if extension == '.parquet':
+            import pyarrow.parquet as pq
+            return pq.ParquetFile(path).metadata.num_rows
+    except Exception:
+        return None
+    return None
+
+
+def ingest_trading_accounts(db: Session, file: BinaryIO, filename: str,
+                            chunk_size: int = INGEST_CHUNK_SIZE,
+                            report: Optional[IngestionReport] = None,
+                            skip_chunks: int = 0,
+                            on_chunk: Optional[Callable[[IngestionReport], None]] = None) -> IngestionReport:
+    """Insert the valid rows of ``file``, committing after every chunk.
+
+    Raises IngestionError before anything is written if the file type is not
+    supported or the first chunk lacks a required column. To resume, pass the
+    report and chunk count of the earlier run: those chunks are read again
+    but only their borrower ids are collected. ``on_chunk`` runs inside each
+    chunk's transaction, just before it commits.
+    """
+    read = reader_for(filename)
+    report = report or IngestionReport()
+    for index, frame in enumerate(read(file, chunk_size)):
+        missing = [column for column in REQUIRED_COLUMNS if column not in frame.columns]
+        if missing:
+            raise IngestionError(f"Missing required columns: {', '.join(missing)}.")
+        if index < skip_chunks:
+            # Already committed; its borrowers still need rescoring at the end
+            borrower_ids = pd.to_numeric(frame['borrower_id'], errors='coerce').dropna()
+            report.borrower_ids.update(int(borrower_id) for borrower_id in borrower_ids.unique())
+            continue
+        records = coerce_chunk(db, frame, report)
+        if records:
+            upsert_chunk(db, records, report)
+        report.rows_read += len(frame)
+        report.chunks += 1
+        if on_chunk is not None:
+            on_chunk(report)
+        db.commit()
+    return report
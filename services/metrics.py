@@ -0,0 +1,66 @@
+"""
+Prometheus metrics for the HTTP layer and the scoring engine.
+
+With ``PROMETHEUS_MULTIPROC_DIR`` set (to an empty directory, before the
+server starts) every process writes its samples to memory-mapped files
+there and ``/metrics`` sums them, so the figures cover all uvicorn workers
+and the batch scoring and stress test worker processes. Without it each
+process reports only its own samples.
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(10))  # 256 B to 64 MiB
+
+http_requests = Counter(
+    'http_requests_total', 'HTTP requests handled', ['method', 'route', 'status'],
+)
+http_requests_in_progress = Gauge(
+    'http_requests_in_progress', 'HTTP requests being handled', ['method', 'route'],
+    multiprocess_mode='livesum',
+)
+http_request_duration = Histogram(
+    'http_request_duration_seconds', 'Time to send the full response', ['method', 'route', 'status'],
+    buckets=REQUEST_BUCKETS,
+)
+http_response_size = Histogram(
+    'http_response_size_bytes', 'Response body size', ['method', 'route', 'status'],
+    buckets=SIZE_BUCKETS,
+)
+
+accounts_scored = Counter(
+    'scoring_accounts_scored_total', 'Trading accounts scored into a score matrix',
+)
+formula_evaluations = Counter(
+    'scoring_formula_evaluations_total', 'Factor formulas evaluated, counted once per account',
+)
+# Hit rate: rate(...{result="hit"}) / rate(...) per cache
+cache_requests = Counter(
+    'scoring_cache_requests_total', 'Lookups in the scoring caches', ['cache', 'result'],
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    cache_requests.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def render_metrics() -> bytes:
+    """All samples in the Prometheus text format."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop an exiting process's live gauges from the multiprocess files."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
+
@@ -0,0 +1,205 @@
+"""
+On-demand sampling profiles of single requests.
+
+A request is profiled when it carries a valid ``X-Profile`` header, or when
+its path starts with one of ``PROFILE_PATHS`` (an operator switch for an
+incident or a staging box). The header is ``<expires>.<signature>`` where
+the signature is an HMAC-SHA256 of ``<expires>:<path>`` under
+``PROFILE_SECRET``, so only holders of the secret can profile, and only the
+path they signed until it expires. ``python -m services.profiling <path>``
+prints a header value.
+
+While the request runs a thread snapshots every other thread's stack with
+``sys._current_frames`` each ``PROFILE_INTERVAL_MS``; idle threads (waiting
+on a lock, queue or selector) are skipped, so the samples show the request
+plus anything else this worker was busy with at the time. Profiles are
+written to ``PROFILE_DIR`` as collapsed stacks, readable by any worker, and
+can be rendered as speedscope JSON. Without ``PROFILE_SECRET`` and
+``PROFILE_PATHS`` none of this is installed.
+"""
+import hashlib
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+PROFILE_SECRET = os.getenv("PROFILE_SECRET", "")
+PROFILE_PATHS = tuple(path for path in os.getenv("PROFILE_PATHS", "").split(",") if path)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+# A profile stops sampling after this long even if the request is still running
+MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "120"))
+KEEP_PROFILES = int(os.getenv("PROFILE_KEEP", "100"))
+
+ENABLED = bool(PROFILE_SECRET or PROFILE_PATHS)
+
+# Leaf frames of threads that are blocked rather than working
+IDLE_FRAMES = {
+    ('threading.py', 'wait'), ('selectors.py', 'select'), ('queue.py', 'get'),
+    ('threading.py', '_wait_for_tstate_lock'), ('base_events.py', '_run_once'),
+}
+
+class ProfileError(ValueError):
+    pass
+
+
+def signature(path: str, expires: int) -> str:
+    return hmac.new(PROFILE_SECRET.encode(), f"{expires}:{path}".encode(), hashlib.sha256).hexdigest()
+
+
+def sign(path: str, ttl: int = 600) -> str:
+    """An ``X-Profile`` header value for ``path`` valid for ``ttl`` seconds."""
+    if not PROFILE_SECRET:
+        raise ProfileError("PROFILE_SECRET is not set")
+    expires = int(time.time()) + ttl
+    return f"{expires}.{signature(path, expires)}"
+
+
+def verify(path: str, header: str) -> bool:
+    if not PROFILE_SECRET:
+        return False
+    expires, _, signed = header.partition('.')
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signed, signature(path, int(expires)))
+
+
+class StackSampler(threading.Thread):
+    """Counts the busy stacks of every other thread until stopped."""
+
+    def __init__(self, interval: float = INTERVAL_SECONDS, max_seconds: float = MAX_SECONDS):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.samples: Counter = Counter()
+        self.started_at = 0.0
+        self.elapsed = 0.0
+        self._stop_event = threading.Event()
+        self._labels: Dict[Any, str] = {}
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _sample(self) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == self.ident:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.samples[tuple(reversed(stack))] += 1
+
+    def run(self) -> None:
+        self.started_at = time.perf_counter()
+        deadline = self.started_at + self.max_seconds
+        while not self._stop_event.wait(self.interval) and time.perf_counter() < deadline:
+            self._sample()
+        self.elapsed = time.perf_counter() - self.started_at
+
+    def stop(self) -> Counter:
+        self._stop_event.set()
+        self.join()
+        return self.samples
+
+
+def _short_path(filename: str) -> str:
+    """Path relative to the project or to site-packages, whichever applies."""
+    for root in sorted((p for p in sys.path if p), key=len, reverse=True):
+        if filename.startswith(root + os.sep):
+            return filename[len(root) + 1:]
+    return filename
+
+
+def collapsed(samples: Counter) -> str:
+    """One ``frame;frame;frame count`` line per distinct stack (flamegraph.pl, speedscope)."""
+    return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(samples.items()))
+
+
+def parse_collapsed(text: str) -> Counter:
+    samples: Counter = Counter()
+    for line in text.splitlines():
+        stack, _, count = line.rpartition(' ')
+        if stack:
+            samples[tuple(stack.split(';'))] += int(count)
+    return samples
+
+
+def speedscope(samples: Counter, name: str, interval: float) -> Dict[str, Any]:
+    """The samples as a speedscope 'sampled' profile, weighted in milliseconds."""
+    frames: List[Dict[str, str]] = []
+    index: Dict[str, int] = {}
+    stacks, weights = [], []
+    for stack, count in sorted(samples.items()):
+        ids = []
+        for frame in stack:
+            if frame not in index:
+                index[frame] = len(frames)
+                frames.append({'name': frame})
+            ids.append(index[frame])
+        stacks.append(ids)
+        weights.append(count * interval * 1000)
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled', 'name': name, 'unit': 'milliseconds',
+            'startValue': 0, 'endValue': sum(weights), 'samples': stacks, 'weights': weights,
+        }],
+        'name': name,
+        'exporter': 'financial-scorecard',
+    }
+
+
+def _paths(profile_id: str) -> Tuple[str, str]:
+    if not profile_id.isalnum():
+        raise ProfileError("Invalid profile id")
+    base = os.path.join(PROFILE_DIR, profile_id)
+    return base + '.collapsed', base + '.json'
+
+
+def save_profile(profile_id: str, samples: Counter, meta: Dict[str, Any]) -> None:
+    """Write a finished profile and drop the oldest beyond ``PROFILE_KEEP``."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stacks_path, meta_path = _paths(profile_id)
+    with open(stacks_path, 'w') as f:
+        f.write(collapsed(samples))
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+    saved = sorted(
+        (entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith('.json')),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in saved[:-KEEP_PROFILES] if KEEP_PROFILES > 0 else []:
+        for path in _paths(entry.name[:-len('.json')]):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def load_profile(profile_id: str) -> Optional[Tuple[Dict[str, Any], Counter]]:
+    """(metadata, samples) of a saved profile, or None."""
+    stacks_path, meta_path = _paths(profile_id)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    with open(stacks_path) as f:
+        return meta, parse_collapsed(f.read())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        sys.exit("usage: python -m services.profiling <path> [ttl-seconds]")
+    print(sign(sys.argv[1], int(sys.argv[2]) if len(sys.argv) == 3 else 600))
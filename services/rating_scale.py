@@ -0,0 +1,148 @@
+"""
+Compiled rating scales.
+
+A ``RiskFactor.rating_scale`` is a dict of bands such as
+``{"high_risk": {"min": 0, "max": 1.0, "score": 0.3}, ...}``. It is compiled
+once into sorted, non-overlapping breakpoint arrays so a ratio is rated with a
+binary search (``bisect`` for one value, ``np.searchsorted`` for a column).
+
+Band semantics:
+
+* every band covers the closed range ``[min, max]``;
+* bands are ordered by ``min`` (declaration order breaks ties);
+* where bands overlap, the lower band keeps the shared range, so a boundary
+  value shared by two adjacent bands belongs to the lower one;
+* values that fall in a gap, outside every band, or are NaN get no band and
+  a score of 0.0.
+"""
+import math
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from services.metrics import record_cache
+
+
+class RatingScaleError(ValueError):
+    """Raised when a rating scale has malformed or inverted bands."""
+
+
+class CompiledRatingScale:
+    """Disjoint rating bands stored as parallel arrays sorted by upper bound."""
+    __slots__ = ('source', 'labels', 'lows', 'highs', 'scores', '_lows', '_highs', '_scores')
+
+    def __init__(self, source, labels, lows, highs, scores):
+        self.source = source
+        self.labels = tuple(labels)
+        self.lows = tuple(lows)
+        self.highs = tuple(highs)
+        self.scores = tuple(scores)
+        self._lows = np.array(lows, dtype=float)
+        self._highs = np.array(highs, dtype=float)
+        self._scores = np.array(scores, dtype=float)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def band_index(self, value: float) -> int:
+        """Index of the band containing ``value``, or -1."""
+        i = bisect_left(self.highs, value)
+        if i < len(self.highs) and self.lows[i] <= value:
+            return i
+        return -1
+
+    def score_for(self, value: float) -> float:
+        i = self.band_index(value)
+        return self.scores[i] if i >= 0 else 0.0
+
+    def band_for(self, value: float) -> Tuple[Optional[str], float]:
+        """(label, score) of the band containing ``value``; (None, 0.0) if none does."""
+        i = self.band_index(value)
+        if i < 0:
+            return None, 0.0
+        return self.labels[i], self.scores[i]
+
+    def band_indices(self, values: np.ndarray) -> np.ndarray:
+        """Vectorized ``band_index``; -1 where no band matches."""
+        values = np.asarray(values, dtype=float)
+        if not len(self.labels):
+            return np.full(values.shape, -1, dtype=np.int64)
+        idx = np.searchsorted(self._highs, values, side='left')
+        clipped = np.minimum(idx, len(self.labels) - 1)
+        hit = (idx < len(self.labels)) & (self._lows[clipped] <= values)
+        return np.where(hit, clipped, -1)
+
+    def scores_at(self, idx: np.ndarray) -> np.ndarray:
+        """Scores for band indices from ``band_indices``; 0.0 where the index is -1."""
+        if not len(self.labels):
+            return np.zeros(idx.shape, dtype=float)
+        return np.where(idx >= 0, self._scores[np.maximum(idx, 0)], 0.0)
+
+    def score_array(self, values: np.ndarray) -> np.ndarray:
+        """Vectorized ``score_for``."""
+        return self.scores_at(self.band_indices(values))
+
+
+def compile_rating_scale(rating_scale: Optional[Dict[str, Dict[str, Any]]]) -> CompiledRatingScale:
+    """Validate a rating scale dict and resolve it into disjoint sorted bands."""
+    bands = []
+    for order, (label, bounds) in enumerate((rating_scale or {}).items()):
+        try:
+            low = float(bounds['min'])
+            high = float(bounds['max'])
+            score = float(bounds.get('score', 0.0))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise RatingScaleError(f"Band {label!r} needs numeric 'min', 'max' and 'score' values")
+        if math.isnan(low) or math.isnan(high) or math.isnan(score):
+            raise RatingScaleError(f"Band {label!r} contains NaN")
+        if low > high:
+            raise RatingScaleError(f"Band {label!r} has min {low} greater than max {high}")
+        bands.append((low, order, high, label, score))
+    bands.sort(key=lambda band: (band[0], band[1]))
+
+    labels, lows, highs, scores = [], [], [], []
+    covered = -math.inf
+    for low, _, high, label, score in bands:
+        if high <= covered and labels:
+            # Entirely inside a lower band
+            continue
+        # A band starting inside the covered range keeps only (covered, high];
+        # the point ``covered`` itself still resolves to the lower band
+        lows.append(max(low, covered))
+        highs.append(high)
+        labels.append(label)
+        scores.append(score)
+        covered = high
+    return CompiledRatingScale(rating_scale, labels, lows, highs, scores)
+
+
+# Compiled scales per risk factor id, tagged with the factor's updated_at
+_scale_cache: Dict[int, Tuple[Any, CompiledRatingScale]] = {}
+_scale_cache_lock = threading.Lock()
+
+
+def get_compiled_rating_scale(risk_factor) -> CompiledRatingScale:
+    """Return the compiled rating scale for a RiskFactor, reusing the cached one
+    while the factor's id, updated_at and scale are unchanged."""
+    cached = _scale_cache.get(risk_factor.id)
+    if cached is not None:
+        updated_at, compiled = cached
+        if updated_at == risk_factor.updated_at and compiled.source == risk_factor.rating_scale:
+            record_cache('rating_scale', hit=True)
+            return compiled
+    record_cache('rating_scale', hit=False)
+    compiled = compile_rating_scale(risk_factor.rating_scale)
+    with _scale_cache_lock:
+        _scale_cache[risk_factor.id] = (risk_factor.updated_at, compiled)
+    return compiled
+
+
+def clear_rating_scale_cache(factor_id: Optional[int] = None) -> None:
+    """Drop cached compiled scales for one factor, or for all factors."""
+    with _scale_cache_lock:
+        if factor_id is None:
+            _scale_cache.clear()
+        else:
+            _scale_cache.pop(factor_id, None)
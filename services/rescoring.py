@@ -0,0 +1,226 @@
+"""
+Incremental rescoring of stored scorecards.
+
+Each compiled formula knows which trading-account fields it reads, and each
+account belongs to one borrower. When an account or a risk factor changes,
+only the affected (borrower, factor) cells are recomputed and the borrower's
+latest scorecard is patched in place. The rest of its ``score_breakdown`` is
+reused, including the per-account details of the factors left untouched.
+
+A stored breakdown can be patched only if it was produced under the config
+version the change started from. Anything older is rescored in full, which
+costs a vectorized pass over that borrower's accounts.
+
+Patched scorecards are re-tagged with the current config version and, when
+the borrower's accounts changed, a fresh input digest, so a later
+``/scorecards/calculate`` can reuse them.
+
+The entry points open their own session so they can run as background tasks
+once the change that triggered them has been committed. Borrowers are
+rescored ``RESCORE_CHUNK_SIZE`` at a time, which bounds the accounts held in
+memory and the size of the ``IN`` lists sent to the database.
+"""
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from models.database import SessionLocal
+from models.scorecard import Scorecard
+from services.calculation_service import classify_score
+from services.formula import ACCOUNT_FIELDS
+from services.risk_config import RiskConfig, get_risk_config
+from services.scoring_engine import (
+    account_entries,
+    borrower_bounds,
+    borrower_digests,
+    borrower_rows,
+    build_score_breakdown,
+    evaluate_factors,
+    factor_contributions,
+    final_score_from_cells,
+    load_account_columns,
+    score_accounts,
+)
+
+# Borrowers whose scorecards are patched per pass and transaction
+RESCORE_CHUNK_SIZE = int(os.getenv("RESCORE_CHUNK_SIZE", "500"))
+
+_scorecards = Scorecard.__table__
+
+
+def latest_scorecards(db: Session, borrower_ids: Optional[Sequence[int]] = None) -> List[Any]:
+    """(id, borrower_id, score_breakdown, input_hash, config_version) of each borrower's most recent scorecard."""
+    latest = select(func.max(_scorecards.c.id)).group_by(_scorecards.c.borrower_id)
+    if borrower_ids is not None:
+        latest = latest.where(_scorecards.c.borrower_id.in_(list(borrower_ids)))
+    stmt = (
+        select(_scorecards.c.id, _scorecards.c.borrower_id, _scorecards.c.score_breakdown,
+               _scorecards.c.input_hash, _scorecards.c.config_version)
+        .where(_scorecards.c.id.in_(latest))
+        .order_by(_scorecards.c.borrower_id)
+    )
+    return db.execute(stmt).all()
+
+
+def _patched_cells(config: RiskConfig, breakdown: Optional[Dict[str, Any]],
+                   recomputed: Dict[int, Tuple[float, List[Dict[str, Any]]]],
+                   accepted_versions: Set[int]) -> Optional[Tuple[List[float], List[List[Dict[str, Any]]]]]:
+    """Merge recomputed cells into a stored breakdown.
+
+    Returns (cells, per-factor account entries), or None if it cannot be patched.
+    """
+    if not breakdown or breakdown.get('config_version') not in accepted_versions:
+        return None
+    stored = {
+        entry['factor_id']: (entry['contribution'], entry['accounts'])
+        for entry in breakdown.get('factors', [])
+        if 'accounts' in entry
+    }
+    cells = []
+    accounts = []
+    for factor in config.financial_factors:
+        if factor.id in recomputed:
+            cell, entries = recomputed[factor.id]
+        elif factor.id in stored:
+            cell, entries = stored[factor.id]
+        else:
+            return None
+        cells.append(cell)
+        accounts.append(entries)
+    return cells, accounts
+
+
+def _patch_scorecards(db: Session, config: RiskConfig, scorecards: Sequence[Any],
+                      factor_ids: Set[int], accepted_versions: Set[int],
+                      borrower_ids: Optional[Sequence[int]] = None) -> int:
+    if not scorecards:
+        return 0
+    factors = [factor for factor in config.financial_factors if factor.id in factor_ids]
+    recomputed: Dict[int, Dict[int, Tuple[float, List[Dict[str, Any]]]]] = {}
+    # Account changes need a new input digest; factor changes keep the stored one
+    input_hashes = {sc.borrower_id: sc.input_hash for sc in scorecards}
+    if factors:
+        scored = [sc.borrower_id for sc in scorecards]
+        if borrower_ids is None:
+            # Only the fields the affected formulas read are loaded
+            fields = sorted({field for factor in factors for field in factor.formula.variables})
+            accounts = load_account_columns(db, None, fields)
+            accounts = accounts.subset(np.isin(accounts.borrower_ids, scored))
+        else:
+            # Borrowers without a scorecard have nothing to patch
+            accounts = load_account_columns(db, scored)
+        borrowers, rows = borrower_rows(accounts, scored)
+        results = evaluate_factors(accounts, factors)
+        contributions = factor_contributions(results, rows, len(borrowers))
+        starts, ends = borrower_bounds(accounts, borrowers)
+        for i, borrower_id in enumerate(borrowers.tolist()):
+            entries = account_entries(accounts.account_ids, results, starts[i], ends[i])
+            recomputed[borrower_id] = {
+                factor.id: (float(contributions[i, j]), entries[j]) for j, factor in enumerate(factors)
+            }
+        if borrower_ids is not None:
+            input_hashes.update(zip(borrowers.tolist(), borrower_digests(accounts, borrowers)))
+
+    updates = []
+    stale = []
+    for sc in scorecards:
+        patched = _patched_cells(config, sc.score_breakdown, recomputed.get(sc.borrower_id, {}), accepted_versions)
+        if patched is None:
+            stale.append(sc)
+            continue
+        cells, entries = patched
+        updates.append(_scorecard_update(sc.id, config, cells, entries, input_hashes[sc.borrower_id]))
+
+    if stale:
+        stale_ids = [sc.borrower_id for sc in stale]
+        matrix = score_accounts(load_account_columns(db, stale_ids), config, stale_ids)
+        rows_by_borrower = {int(b): i for i, b in enumerate(matrix.borrower_ids)}
+        for sc in stale:
+            row = rows_by_borrower[sc.borrower_id]
+            updates.append(_scorecard_update(sc.id, config, matrix.contributions[row],
+                                             matrix.account_entries(row), matrix.input_hashes[row]))
+
+    if updates:
+        db.execute(update(Scorecard), updates)
+        db.commit()
+    return len(updates)
+
+
+def _scorecard_update(scorecard_id: int, config: RiskConfig, cells: Sequence[float],
+                      accounts: Sequence[List[Dict[str, Any]]], input_hash: Optional[str]) -> Dict[str, Any]:
+    final_score = final_score_from_cells(cells)
+    return {
+        'id': scorecard_id,
+        'final_score': final_score,
+        'score_breakdown': build_score_breakdown(config.version, config.financial_factors, cells, accounts),
+        'risk_classification': classify_score(final_score),
+        'generated_at': datetime.utcnow(),
+        'input_hash': input_hash,
+        'config_version': config.version,
+    }
+
+
+def rescore_account_change(borrower_id: int, changed_fields: Iterable[str]) -> int:
+    """Patch a borrower's latest scorecard after some of its account fields changed.
+
+    Only factors whose formulas read one of ``changed_fields`` are recomputed.
+    Returns the number of scorecards updated.
+    """
+    db = SessionLocal()
+    try:
+        config = get_risk_config(db)
+        factor_ids = config.factors_reading(field for field in changed_fields if field in ACCOUNT_FIELDS)
+        if not factor_ids:
+            return 0
+        scorecards = latest_scorecards(db, [borrower_id])
+        return _patch_scorecards(db, config, scorecards, factor_ids, {config.version}, [borrower_id])
+    finally:
+        db.close()
+
+
+def rescore_borrowers(borrower_ids: Iterable[int]) -> int:
+    """Recompute every factor for the given borrowers' latest scorecards (accounts added or removed).
+
+    Each chunk of ``RESCORE_CHUNK_SIZE`` borrowers is committed on its own.
+    """
+    borrower_ids = sorted(set(borrower_ids))
+    if not borrower_ids:
+        return 0
+    db = SessionLocal()
+    try:
+        config = get_risk_config(db)
+        factor_ids = {factor.id for factor in config.financial_factors}
+        updated = 0
+        for start in range(0, len(borrower_ids), RESCORE_CHUNK_SIZE):
+            chunk = borrower_ids[start:start + RESCORE_CHUNK_SIZE]
+            scorecards = latest_scorecards(db, chunk)
+            updated += _patch_scorecards(db, config, scorecards, factor_ids, {config.version}, chunk)
+        return updated
+    finally:
+        db.close()
+
+
+def rescore_factor_change(factor_id: int) -> int:
+    """Recompute one factor's column across every borrower's latest scorecard.
+
+    Runs with its own session so it can be scheduled as a background task after
+    the risk factor change has been committed and the config version bumped.
+    A deleted factor, or one that is no longer financial, simply drops out of
+    the breakdowns.
+    """
+    return rescore_factors_change([factor_id])
+
+
+def rescore_factors_change(factor_ids: Iterable[int]) -> int:
+    """As rescore_factor_change, for several factors changed under one version bump."""
+    db = SessionLocal()
+    try:
+        config = get_risk_config(db)
+        scorecards = latest_scorecards(db)
+        return _patch_scorecards(db, config, scorecards, set(factor_ids), {config.version - 1, config.version})
+    finally:
+        db.close()
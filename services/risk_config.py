@@ -0,0 +1,155 @@
+"""
+Process-wide snapshot of the active risk configuration.
+
+The snapshot holds every risk factor with its compiled formula, compiled
+rating scale and weight, tagged with the value of the ``risk_config_version``
+counter it was loaded under. Risk factor writes bump that counter in the same
+transaction and drop the local snapshot; other worker processes notice the new
+version on their next check, which happens at most once per
+``RISK_CONFIG_CHECK_INTERVAL`` seconds.
+
+Snapshots are immutable and replaced by reference, so a scoring run that has
+already taken one keeps a consistent view even if the config changes under it.
+
+A stored factor whose formula or rating scale no longer compiles is logged and
+left out of the snapshot, weight included, rather than stopping scoring for
+the whole portfolio; its id is kept in ``RiskConfig.skipped``.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from models.risk_config import RiskConfigVersion
+from models.risk_factors import RiskFactor
+from services.formula import CompiledFormula, FormulaError, clear_formula_cache, get_compiled_formula
+from services.metrics import record_cache
+from services.rating_scale import (
+    CompiledRatingScale, RatingScaleError, clear_rating_scale_cache, get_compiled_rating_scale,
+)
+
+logger = logging.getLogger(__name__)
+
+VERSION_CHECK_INTERVAL = float(os.getenv("RISK_CONFIG_CHECK_INTERVAL", "1.0"))
+
+_version_table = RiskConfigVersion.__table__
+
+
+class CompiledFactor:
+    """A risk factor with its formula and rating scale compiled."""
+    __slots__ = ('id', 'name', 'factor_type', 'weight', 'formula', 'scale')
+
+    def __init__(self, id: int, name: str, factor_type: str, weight: float,
+                 formula: Optional[CompiledFormula], scale: CompiledRatingScale):
+        self.id = id
+        self.name = name
+        self.factor_type = factor_type
+        self.weight = weight
+        self.formula = formula
+        self.scale = scale
+
+    @property
+    def is_financial(self) -> bool:
+        return self.factor_type == 'financial' and self.formula is not None
+
+
+class RiskConfig:
+    """Immutable view of every risk factor at one config version."""
+
+    def __init__(self, version: int, factors: Tuple[CompiledFactor, ...], skipped: Tuple[int, ...] = ()):
+        self.version = version
+        self.factors = factors
+        # Ids of stored factors left out because they failed to compile
+        self.skipped = skipped
+        self.financial_factors = tuple(factor for factor in factors if factor.is_financial)
+        self.by_id: Dict[int, CompiledFactor] = {factor.id: factor for factor in factors}
+        # Which financial factors read each trading account field
+        self.factors_by_field: Dict[str, Tuple[int, ...]] = {}
+        for factor in self.financial_factors:
+            for field in factor.formula.variables:
+                self.factors_by_field[field] = self.factors_by_field.get(field, ()) + (factor.id,)
+
+    def factors_reading(self, fields: Iterable[str]) -> Set[int]:
+        """Ids of the financial factors whose formulas read any of ``fields``."""
+        return {factor_id for field in fields for factor_id in self.factors_by_field.get(field, ())}
+
+
+_config: Optional[RiskConfig] = None
+_last_check = 0.0
+_lock = threading.Lock()
+
+
+def read_config_version(db: Session) -> int:
+    return db.execute(select(_version_table.c.version).where(_version_table.c.id == 1)).scalar() or 0
+
+
+def bump_config_version(db: Session) -> None:
+    """Increment the shared version counter inside the caller's transaction."""
+    result = db.execute(
+        update(_version_table)
+        .where(_version_table.c.id == 1)
+        .values(version=_version_table.c.version + 1)
+    )
+    if result.rowcount == 0:
+        db.execute(insert(_version_table).values(id=1, version=1))
+
+
+def load_risk_config(db: Session, version: int) -> RiskConfig:
+    # The version is read before the factors, so a snapshot is never tagged
+    # newer than the rows it holds; at worst it is reloaded once more
+    factors = []
+    skipped = []
+    for risk in db.query(RiskFactor).order_by(RiskFactor.id).all():
+        try:
+            formula = get_compiled_formula(risk) if risk.factor_type == 'financial' else None
+            scale = get_compiled_rating_scale(risk)
+        except (FormulaError, RatingScaleError) as e:
+            logger.error("Risk factor %s (%s) is left out of risk config version %s: %s",
+                         risk.id, risk.name, version, e)
+            skipped.append(risk.id)
+            continue
+        factors.append(CompiledFactor(
+            id=risk.id,
+            name=risk.name,
+            factor_type=risk.factor_type,
+            weight=float(risk.weight),
+            formula=formula,
+            scale=scale,
+        ))
+    return RiskConfig(version, tuple(factors), tuple(skipped))
+
+
+def get_risk_config(db: Session) -> RiskConfig:
+    """Return the current snapshot, reloading it only when the version moved."""
+    global _config, _last_check
+    config = _config
+    now = time.monotonic()
+    if config is not None and now - _last_check < VERSION_CHECK_INTERVAL:
+        record_cache('risk_config', hit=True)
+        return config
+    with _lock:
+        config = _config
+        version = read_config_version(db)
+        reload = config is None or config.version != version
+        if reload:
+            config = load_risk_config(db, version)
+            _config = config
+        _last_check = now
+    record_cache('risk_config', hit=not reload)
+    return config
+
+
+def invalidate_risk_config(factor_id: Optional[int] = None) -> None:
+    """Drop the local snapshot (and the compiled formula/scale for ``factor_id``).
+
+    Call after committing a transaction that went through ``bump_config_version``.
+    """
+    global _config
+    with _lock:
+        _config = None
+    clear_formula_cache(factor_id)
+    clear_rating_scale_cache(factor_id)
@@ -0,0 +1,304 @@
+"""
+Vectorized portfolio scoring.
+
+Trading account numerics are loaded column-wise into NumPy arrays, every
+financial formula is evaluated as an array expression, and each ratio column
+is mapped through its rating scale in one step. The result is a
+borrowers x factors matrix of weighted rating contributions that sums to the
+same final scores as ``CalculationService.calculate_final_score``.
+
+The per-account ratio, matched band and rating behind each cell are kept so
+the stored ``score_breakdown`` can explain a score without recomputing it.
+"""
+import hashlib
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.entities import TradingAccount
+from services.formula import ACCOUNT_FIELDS
+from services.metrics import accounts_scored, formula_evaluations
+from services.risk_config import CompiledFactor, RiskConfig, get_risk_config
+
+# Placeholder non-financial factors applied to every borrower until they have their own table
+NON_FINANCIAL_FACTORS = [
+    {'name': 'Management Quality', 'weight': 0.1, 'score': 0.8},
+    {'name': 'Market Position', 'weight': 0.1, 'score': 0.7}
+]
+
+
+class AccountColumns:
+    """Trading account numerics for a set of accounts, one array per field.
+
+    Accounts are ordered by (borrower_id, id), the same order the scalar path
+    walks them in.
+    """
+
+    def __init__(self, account_ids: np.ndarray, borrower_ids: np.ndarray, columns: Dict[str, np.ndarray]):
+        self.account_ids = account_ids
+        self.borrower_ids = borrower_ids
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.account_ids)
+
+    def subset(self, mask: np.ndarray) -> 'AccountColumns':
+        return AccountColumns(
+            self.account_ids[mask],
+            self.borrower_ids[mask],
+            {field: column[mask] for field, column in self.columns.items()},
+        )
+
+
+class FactorResult:
+    """One factor evaluated over a set of accounts: ratio, band index, rating and
+    weighted rating per account."""
+    __slots__ = ('factor', 'ratios', 'bands', 'ratings', 'weighted')
+
+    def __init__(self, factor: CompiledFactor, ratios: np.ndarray, bands: np.ndarray,
+                 ratings: np.ndarray, weighted: np.ndarray):
+        self.factor = factor
+        self.ratios = ratios
+        self.bands = bands
+        self.ratings = ratings
+        self.weighted = weighted
+
+
+class ScoreMatrix:
+    """Weighted rating contributions, one row per borrower and one column per factor."""
+
+    def __init__(self, borrower_ids: np.ndarray, factors: Sequence[CompiledFactor],
+                 contributions: np.ndarray, final_scores: np.ndarray,
+                 account_count: int = 0, config_version: int = 0,
+                 input_hashes: Optional[List[str]] = None,
+                 accounts: Optional[AccountColumns] = None,
+                 results: Optional[List[FactorResult]] = None):
+        self.borrower_ids = borrower_ids
+        self.factors = factors
+        self.contributions = contributions
+        self.final_scores = final_scores
+        self.account_count = account_count
+        self.config_version = config_version
+        self.input_hashes = input_hashes
+        self.accounts = accounts
+        self.results = results
+        if accounts is not None:
+            self.starts, self.ends = borrower_bounds(accounts, borrower_ids)
+
+    @property
+    def factor_ids(self) -> List[int]:
+        return [factor.id for factor in self.factors]
+
+    @property
+    def factor_names(self) -> List[str]:
+        return [factor.name for factor in self.factors]
+
+    def scores_by_borrower(self) -> Dict[int, float]:
+        return {int(b): float(s) for b, s in zip(self.borrower_ids, self.final_scores)}
+
+    def account_entries(self, row: int) -> Optional[List[List[Dict[str, Any]]]]:
+        """Per-factor account details for one borrower row, if they were kept."""
+        if self.accounts is None or self.results is None:
+            return None
+        return account_entries(self.accounts.account_ids, self.results, self.starts[row], self.ends[row])
+
+    def breakdown(self, row: int) -> Dict[str, Any]:
+        return build_score_breakdown(self.config_version, self.factors, self.contributions[row],
+                                     self.account_entries(row))
+
+
+def borrower_bounds(accounts: AccountColumns, borrowers: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """[start, end) account positions of each borrower; accounts must be sorted by borrower."""
+    starts = np.searchsorted(accounts.borrower_ids, borrowers, side='left')
+    ends = np.searchsorted(accounts.borrower_ids, borrowers, side='right')
+    return starts, ends
+
+
+def accounts_digest(account_ids: np.ndarray, columns: Dict[str, np.ndarray]) -> str:
+    """SHA-256 over one borrower's account ids and numeric fields, in account order.
+
+    Anything that can change the borrower's score changes the digest; the
+    scalar and vectorized paths hash identical bytes for identical rows.
+    """
+    digest = hashlib.sha256(np.ascontiguousarray(account_ids, dtype=np.int64).tobytes())
+    for field in ACCOUNT_FIELDS:
+        digest.update(np.ascontiguousarray(columns[field], dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def borrower_digests(accounts: AccountColumns, borrowers: np.ndarray) -> List[str]:
+    """``accounts_digest`` for each borrower; accounts must be sorted by borrower."""
+    starts, ends = borrower_bounds(accounts, borrowers)
+    return [
+        accounts_digest(
+            accounts.account_ids[start:end],
+            {field: accounts.columns[field][start:end] for field in ACCOUNT_FIELDS},
+        )
+        for start, end in zip(starts.tolist(), ends.tolist())
+    ]
+
+
+def final_score_from_cells(cells: Sequence[float]) -> float:
+    """Sum per-factor contributions plus the non-financial factors, in engine order."""
+    final_score = 0.0
+    for cell in cells:
+        final_score += cell
+    for nf in NON_FINANCIAL_FACTORS:
+        final_score += nf['score'] * nf['weight']
+    return final_score
+
+
+def account_factor_entry(trading_account_id: int, ratio: float, band: Optional[str],
+                         rating: float, contribution: float) -> Dict[str, Any]:
+    """How one trading account scored on one factor."""
+    return {
+        'trading_account_id': int(trading_account_id),
+        # JSON has no NaN or infinity
+        'ratio': float(ratio) if math.isfinite(ratio) else None,
+        'band': band,
+        'rating': float(rating),
+        'contribution': float(contribution),
+    }
+
+
+def account_entries(account_ids: np.ndarray, results: Sequence[FactorResult],
+                    start: int, end: int) -> List[List[Dict[str, Any]]]:
+    """``account_factor_entry`` lists for accounts ``start:end``, one list per factor."""
+    ids = account_ids[start:end].tolist()
+    entries = []
+    for result in results:
+        labels = result.factor.scale.labels
+        entries.append([
+            account_factor_entry(account_id, ratio, labels[band] if band >= 0 else None, rating, weighted)
+            for account_id, ratio, band, rating, weighted in zip(
+                ids,
+                result.ratios[start:end].tolist(),
+                result.bands[start:end].tolist(),
+                result.ratings[start:end].tolist(),
+                result.weighted[start:end].tolist(),
+            )
+        ])
+    return entries
+
+
+def build_score_breakdown(config_version: int, factors: Sequence[CompiledFactor],
+                          cells: Sequence[float],
+                          accounts: Optional[Sequence[List[Dict[str, Any]]]] = None) -> Dict[str, Any]:
+    """The ``Scorecard.score_breakdown`` record.
+
+    One weighted contribution per factor and, when ``accounts`` is given, the
+    ratio, band, rating and contribution of every account behind it.
+    """
+    factor_entries = []
+    for j, (factor, cell) in enumerate(zip(factors, cells)):
+        entry = {
+            'factor_id': factor.id,
+            'name': factor.name,
+            'weight': factor.weight,
+            'contribution': float(cell),
+        }
+        if accounts is not None:
+            entry['accounts'] = accounts[j]
+        factor_entries.append(entry)
+    return {
+        'config_version': config_version,
+        'factors': factor_entries,
+        'non_financial': [
+            {
+                'name': nf['name'],
+                'weight': nf['weight'],
+                'score': nf['score'],
+                'contribution': nf['score'] * nf['weight'],
+            }
+            for nf in NON_FINANCIAL_FACTORS
+        ],
+    }
+
+
+def load_account_columns(db: Session, borrower_ids: Optional[Sequence[int]] = None,
+                         fields: Sequence[str] = ACCOUNT_FIELDS) -> AccountColumns:
+    """Read numeric trading account columns for some (or all) borrowers."""
+    fields = tuple(fields)
+    table = TradingAccount.__table__
+    stmt = select(table.c.id, table.c.borrower_id, *[table.c[field] for field in fields])
+    if borrower_ids is not None:
+        stmt = stmt.where(table.c.borrower_id.in_(list(borrower_ids)))
+    stmt = stmt.order_by(table.c.borrower_id, table.c.id)
+    rows = db.execute(stmt).all()
+
+    data = np.array(rows, dtype=float).reshape(len(rows), 2 + len(fields))
+    columns = {field: data[:, 2 + i].copy() for i, field in enumerate(fields)}
+    return AccountColumns(data[:, 0].astype(np.int64), data[:, 1].astype(np.int64), columns)
+
+
+def borrower_rows(accounts: AccountColumns,
+                  borrower_ids: Optional[Sequence[int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorted borrower ids and, for every account, the row of its borrower."""
+    if borrower_ids is None:
+        borrowers = np.unique(accounts.borrower_ids)
+    else:
+        borrowers = np.unique(np.asarray(list(borrower_ids), dtype=np.int64))
+    return borrowers, np.searchsorted(borrowers, accounts.borrower_ids)
+
+
+def evaluate_factors(accounts: AccountColumns, factors: Sequence[CompiledFactor]) -> List[FactorResult]:
+    """Evaluate each factor's formula and rating scale over every account."""
+    results = []
+    for factor in factors:
+        ratios = factor.formula.evaluate_columns(accounts.columns)
+        bands = factor.scale.band_indices(ratios)
+        ratings = factor.scale.scores_at(bands)
+        results.append(FactorResult(factor, ratios, bands, ratings, ratings * factor.weight))
+    formula_evaluations.inc(len(factors) * len(accounts))
+    return results
+
+
+def factor_contributions(results: Sequence[FactorResult], rows: np.ndarray, n_borrowers: int) -> np.ndarray:
+    """Weighted rating sums for each (borrower row, factor) cell."""
+    contributions = np.zeros((n_borrowers, len(results)), dtype=float)
+    for j, result in enumerate(results):
+        # bincount accumulates in account order, exactly like the scalar loop
+        contributions[:, j] = np.bincount(rows, weights=result.weighted, minlength=n_borrowers)
+    return contributions
+
+
+def score_accounts(accounts: AccountColumns, config: RiskConfig,
+                   borrower_ids: Optional[Sequence[int]] = None) -> ScoreMatrix:
+    """Score already-loaded accounts against a risk configuration snapshot.
+
+    When ``borrower_ids`` is given every listed borrower gets a row, including
+    borrowers without accounts, who only receive the non-financial score.
+    """
+    borrowers, rows = borrower_rows(accounts, borrower_ids)
+    financial = config.financial_factors
+    results = evaluate_factors(accounts, financial)
+    contributions = factor_contributions(results, rows, len(borrowers))
+
+    final_scores = np.zeros(len(borrowers), dtype=float)
+    for j in range(len(financial)):
+        final_scores += contributions[:, j]
+    for nf in NON_FINANCIAL_FACTORS:
+        final_scores += nf['score'] * nf['weight']
+    accounts_scored.inc(len(accounts))
+
+    return ScoreMatrix(
+        borrower_ids=borrowers,
+        factors=financial,
+        contributions=contributions,
+        final_scores=final_scores,
+        account_count=len(accounts),
+        config_version=config.version,
+        input_hashes=borrower_digests(accounts, borrowers),
+        accounts=accounts,
+        results=results,
+    )
+
+
+def score_portfolio(db: Session, borrower_ids: Optional[Sequence[int]] = None) -> ScoreMatrix:
+    """Load accounts and score every (or the given) borrower in one pass."""
+    config = get_risk_config(db)
+    accounts = load_account_columns(db, borrower_ids)
+    return score_accounts(accounts, config, borrower_ids)
@@ -0,0 +1,187 @@
+"""
+SQL instrumentation on SQLAlchemy cursor events.
+
+Every statement is timed and folded into per-statement aggregates, keyed by
+the statement with literals, bind markers and repeated IN/VALUES groups
+collapsed, so ``IN (?, ?, ?)`` and ``IN (?, ?)`` count as one statement.
+Statements slower than ``SQL_SLOW_QUERY_MS`` are always logged with the
+shape of their parameters (types and sizes, never values); a random
+``SQL_LOG_SAMPLE_RATE`` fraction of the rest is logged at INFO. Aggregates
+are per process.
+"""
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+LOG_SAMPLE_RATE = float(os.getenv("SQL_LOG_SAMPLE_RATE", "0.01"))
+# Distinct normalized statements kept; the least recently seen are dropped past this
+MAX_STATEMENTS = int(os.getenv("SQL_STATS_MAX_STATEMENTS", "1000"))
+
+_NORMALIZE_CACHE_SIZE = 4096
+_MAX_LOGGED_SQL = 2000
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_BIND = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):(?!:)\w+|\?")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"(\([^()]*\))(?:\s*,\s*\([^()]*\))+")
+_SPACE = re.compile(r"\s+")
+
+
+class StatementStats:
+    __slots__ = ('count', 'total_seconds', 'max_seconds', 'slow', 'rows')
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.slow = 0
+        self.rows = 0
+
+
+_stats: "OrderedDict[str, StatementStats]" = OrderedDict()
+_normalized: "OrderedDict[str, str]" = OrderedDict()
+_lock = threading.Lock()
+_since = datetime.utcnow()
+
+
+def normalize(statement: str) -> str:
+    """``statement`` with literals and bind markers as ``?`` and repeated groups collapsed."""
+    text = _SPACE.sub(' ', statement).strip()
+    text = _STRING.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = _BIND.sub('?', text)
+    text = _LIST.sub('(?, ...)', text)
+    return _ROWS.sub(r'\1, ...', text)
+
+
+def _normalized_statement(statement: str) -> str:
+    with _lock:
+        found = _normalized.get(statement)
+        if found is not None:
+            _normalized.move_to_end(statement)
+            return found
+    found = normalize(statement)
+    with _lock:
+        _normalized[statement] = found
+        if len(_normalized) > _NORMALIZE_CACHE_SIZE:
+            _normalized.popitem(last=False)
+    return found
+
+
+def _shape(value: Any) -> str:
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}[{len(value)}]"
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def parameter_shape(parameters: Any, executemany: bool) -> str:
+    """Types and sizes of the bound parameters, without their values."""
+    if executemany:
+        rows = list(parameters) if parameters is not None else []
+        return f"{len(rows)} x {parameter_shape(rows[0], False)}" if rows else "0 rows"
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f"{key}: {_shape(value)}" for key, value in parameters.items()) + '}'
+    if isinstance(parameters, (list, tuple)):
+        return '(' + ', '.join(_shape(value) for value in parameters) + ')'
+    return _shape(parameters)
+
+
+def _record(statement: str, seconds: float, rows: int) -> bool:
+    key = _normalized_statement(statement)
+    slow = seconds * 1000 >= SLOW_QUERY_MS
+    with _lock:
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = StatementStats()
+            if len(_stats) > MAX_STATEMENTS:
+                _stats.popitem(last=False)
+        else:
+            _stats.move_to_end(key)
+        stats.count += 1
+        stats.total_seconds += seconds
+        stats.max_seconds = max(stats.max_seconds, seconds)
+        stats.rows += max(rows, 0)
+        if slow:
+            stats.slow += 1
+    return slow
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('sql_stats_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('sql_stats_start')
+    if not starts:
+        return
+    seconds = time.perf_counter() - starts.pop()
+    rows = getattr(cursor, 'rowcount', -1) or 0
+    if _record(statement, seconds, rows):
+        logger.warning("Slow query (%.1f ms) %s params=%s", seconds * 1000,
+                       statement[:_MAX_LOGGED_SQL], parameter_shape(parameters, executemany))
+    elif LOG_SAMPLE_RATE > 0 and random.random() < LOG_SAMPLE_RATE:
+        logger.info("Sampled query (%.1f ms) %s params=%s", seconds * 1000,
+                    statement[:_MAX_LOGGED_SQL], parameter_shape(parameters, executemany))
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('sql_stats_start'):
+        connection.info['sql_stats_start'].pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement run on ``engine`` (the ``sync_engine`` of an async engine)."""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+
+
+def top_statements(limit: int = 20, sort: str = 'total') -> Dict[str, Any]:
+    """The ``limit`` statements with the highest total, mean or max time, or count."""
+    with _lock:
+        rows: List[Dict[str, Any]] = [
+            {
+                'statement': statement,
+                'count': stats.count,
+                'total_ms': round(stats.total_seconds * 1000, 3),
+                'mean_ms': round(stats.total_seconds / stats.count * 1000, 3),
+                'max_ms': round(stats.max_seconds * 1000, 3),
+                'slow': stats.slow,
+                'rows': stats.rows,
+            }
+            for statement, stats in _stats.items()
+        ]
+        since = _since
+    key = {'total': 'total_ms', 'mean': 'mean_ms', 'max': 'max_ms', 'count': 'count'}[sort]
+    rows.sort(key=lambda row: row[key], reverse=True)
+    return {
+        'pid': os.getpid(),
+        'since': since,
+        'slow_query_ms': SLOW_QUERY_MS,
+        'statements_tracked': len(rows),
+        'statements': rows[:limit],
+    }
+
+
+def reset_stats() -> None:
+    global _since
+    with _lock:
+        _stats.clear()
+        _since = datetime.utcnow()
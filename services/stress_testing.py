@@ -0,0 +1,308 @@
+"""
+Monte Carlo stress testing of borrower scores.
+
+Each draw is a random relative shock to trading account fields, taken from a
+per-field distribution (normal, lognormal or uniform) and optionally
+correlated across fields through a Gaussian copula. Draws are either shared
+by the whole portfolio (a macro shock) or taken independently per account.
+
+Draws are scored in fixed-size chunks with the what-if engine, and each
+chunk is reduced to running statistics before the next one is generated.
+Chunks are shrunk so draws x accounts stays under ``MAX_CELLS_PER_CHUNK``,
+so memory is bounded regardless of the number of draws or portfolio size. Chunk ``i`` always uses the ``i``-th child of the run's
+``SeedSequence`` and chunks are merged in index order, so a given seed and
+chunk size give the same result whether the run uses one process or many.
+"""
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from models.database import SessionLocal
+from services.calculation_service import CLASSIFICATION_LABELS, classification_indices
+from services.formula import ACCOUNT_FIELDS
+from services.risk_config import RiskConfig, get_risk_config
+from services.scoring_engine import NON_FINANCIAL_FACTORS, AccountColumns, borrower_rows, load_account_columns
+from services.what_if import score_scenarios
+
+DEFAULT_CHUNK_SIZE = int(os.getenv("STRESS_TEST_CHUNK_SIZE", "1000"))
+DEFAULT_WORKERS = int(os.getenv("STRESS_TEST_WORKERS", "0")) or (os.cpu_count() or 1)
+# Upper bound on draws x accounts cells per chunk; shocked columns are that size
+# whether draws are shared by the portfolio or taken per account
+MAX_CELLS_PER_CHUNK = int(os.getenv("STRESS_TEST_MAX_CELLS", "5000000"))
+
+DISTRIBUTIONS = ('normal', 'lognormal', 'uniform')
+
+
+class StressSpec:
+    """Validated shock distributions for a stress test.
+
+    ``distributions`` holds one dict per shocked field with the keys
+    ``distribution`` and either ``mean``/``std`` or ``low``/``high``. For
+    ``normal`` the shock is ``mean + std * z``; for ``lognormal`` the field is
+    multiplied by ``exp(mean + std * z)``; for ``uniform`` the shock is spread
+    evenly over ``[low, high]``. Shocks never take a field below zero.
+    """
+
+    def __init__(self, distributions: Dict[str, Dict[str, Any]],
+                 correlation: Optional[Sequence[Sequence[float]]] = None,
+                 per_account: bool = False, histogram_bins: int = 20):
+        if not distributions:
+            raise ValueError("At least one field needs a shock distribution")
+        self.fields = list(distributions)
+        self.distributions = []
+        for field in self.fields:
+            if field not in ACCOUNT_FIELDS:
+                raise ValueError(f"Unknown trading account field {field!r}")
+            spec = dict(distributions[field])
+            kind = spec.get('distribution', 'normal')
+            if kind not in DISTRIBUTIONS:
+                raise ValueError(f"Distribution for {field!r} must be one of {', '.join(DISTRIBUTIONS)}")
+            if kind == 'uniform':
+                low, high = float(spec.get('low', 0.0)), float(spec.get('high', 0.0))
+                if not low <= high:
+                    raise ValueError(f"Uniform shock for {field!r} needs low <= high")
+                self.distributions.append({'distribution': kind, 'low': low, 'high': high})
+            else:
+                std = float(spec.get('std', 0.0))
+                if std < 0:
+                    raise ValueError(f"Standard deviation for {field!r} must not be negative")
+                self.distributions.append({'distribution': kind, 'mean': float(spec.get('mean', 0.0)), 'std': std})
+
+        if correlation is None:
+            self.cholesky = None
+        else:
+            matrix = np.asarray(correlation, dtype=float)
+            if matrix.shape != (len(self.fields), len(self.fields)):
+                raise ValueError(f"Correlation matrix must be {len(self.fields)}x{len(self.fields)}, "
+                                 f"ordered like the shocked fields")
+            if not np.allclose(matrix, matrix.T) or not np.allclose(np.diag(matrix), 1.0):
+                raise ValueError("Correlation matrix must be symmetric with a unit diagonal")
+            try:
+                self.cholesky = np.linalg.cholesky(matrix)
+            except np.linalg.LinAlgError:
+                raise ValueError("Correlation matrix must be positive definite")
+        self.per_account = per_account
+        if histogram_bins < 1:
+            raise ValueError("histogram_bins must be at least 1")
+        self.histogram_bins = histogram_bins
+
+    def multipliers(self, rng: np.random.Generator, draws: int, n_accounts: int) -> Dict[str, np.ndarray]:
+        """Field multipliers for ``draws`` draws, shaped (draws,) or (draws, accounts)."""
+        shape = (draws, n_accounts) if self.per_account else (draws,)
+        z = rng.standard_normal(shape + (len(self.fields),))
+        if self.cholesky is not None:
+            z = z @ self.cholesky.T
+        multipliers = {}
+        for k, (field, spec) in enumerate(zip(self.fields, self.distributions)):
+            if spec['distribution'] == 'normal':
+                multiplier = 1.0 + spec['mean'] + spec['std'] * z[..., k]
+            elif spec['distribution'] == 'lognormal':
+                multiplier = np.exp(spec['mean'] + spec['std'] * z[..., k])
+            else:
+                multiplier = 1.0 + spec['low'] + (spec['high'] - spec['low']) * _normal_cdf(z[..., k])
+            multipliers[field] = np.maximum(multiplier, 0.0)
+        return multipliers
+
+
+def _normal_cdf(z: np.ndarray) -> np.ndarray:
+    # Abramowitz & Stegun 7.1.26; absolute error below 1.5e-7
+    x = np.abs(z) / math.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-x * x)
+    return 0.5 * (1.0 + np.sign(z) * erf)
+
+
+class ChunkStats:
+    """Running statistics over draws, mergeable across chunks."""
+
+    def __init__(self, n_borrowers: int, bins: int):
+        n_classes = len(CLASSIFICATION_LABELS)
+        self.draws = 0
+        self.mean = np.zeros(n_borrowers)
+        self.m2 = np.zeros(n_borrowers)
+        self.min = np.full(n_borrowers, np.inf)
+        self.max = np.full(n_borrowers, -np.inf)
+        self.histogram = np.zeros((n_borrowers, bins), dtype=np.int64)
+        # Per borrower: how many draws landed in each classification
+        self.class_counts = np.zeros((n_classes, n_borrowers), dtype=np.int64)
+        # Per classification: how many draws had k borrowers in it, for k = 0..n_borrowers
+        self.portfolio_counts = np.zeros((n_classes, n_borrowers + 1), dtype=np.int64)
+
+    @classmethod
+    def from_scores(cls, scores: np.ndarray, lows: np.ndarray, highs: np.ndarray, bins: int) -> 'ChunkStats':
+        draws, n_borrowers = scores.shape
+        stats = cls(n_borrowers, bins)
+        stats.draws = draws
+        stats.mean = scores.mean(axis=0)
+        stats.m2 = ((scores - stats.mean) ** 2).sum(axis=0)
+        stats.min = scores.min(axis=0)
+        stats.max = scores.max(axis=0)
+
+        span = np.where(highs > lows, highs - lows, 1.0)
+        positions = np.clip(np.floor((scores - lows) / span * bins), 0, bins - 1).astype(np.int64)
+        cells = (np.arange(n_borrowers)[None, :] * bins + positions).ravel()
+        stats.histogram = np.bincount(cells, minlength=n_borrowers * bins).reshape(n_borrowers, bins)
+
+        classes = classification_indices(scores)
+        for c in range(len(CLASSIFICATION_LABELS)):
+            in_class = classes == c
+            stats.class_counts[c] = in_class.sum(axis=0)
+            stats.portfolio_counts[c] = np.bincount(in_class.sum(axis=1), minlength=n_borrowers + 1)
+        return stats
+
+    def merge(self, other: 'ChunkStats') -> None:
+        """Fold ``other`` into this one (Chan et al. parallel variance)."""
+        if other.draws == 0:
+            return
+        total = self.draws + other.draws
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.draws / total)
+        self.m2 = self.m2 + other.m2 + delta ** 2 * (self.draws * other.draws / total)
+        self.draws = total
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.histogram += other.histogram
+        self.class_counts += other.class_counts
+        self.portfolio_counts += other.portfolio_counts
+
+
+class _Simulation:
+    """Everything a process needs to score chunks of draws for one run."""
+
+    def __init__(self, accounts: AccountColumns, config: RiskConfig,
+                 borrower_ids: Optional[Sequence[int]], spec: StressSpec):
+        self.accounts = accounts
+        self.config = config
+        self.spec = spec
+        self.borrowers, self.rows = borrower_rows(accounts, borrower_ids)
+        self.lows, self.highs = score_bounds(config, np.bincount(self.rows, minlength=len(self.borrowers)))
+
+    def run_chunk(self, seed: np.random.SeedSequence, draws: int) -> ChunkStats:
+        rng = np.random.default_rng(seed)
+        multipliers = self.spec.multipliers(rng, draws, len(self.accounts))
+        scores = score_scenarios(self.accounts, self.config, self.borrowers, self.rows, multipliers)
+        return ChunkStats.from_scores(scores, self.lows, self.highs, self.spec.histogram_bins)
+
+
+def score_bounds(config: RiskConfig, account_counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Lowest and highest score each borrower could reach, used as histogram ranges."""
+    low = high = 0.0
+    for factor in config.financial_factors:
+        # A ratio outside every band rates 0.0
+        ratings = list(factor.scale.scores) + [0.0]
+        contributions = [rating * factor.weight for rating in ratings]
+        low += min(contributions)
+        high += max(contributions)
+    non_financial = sum(nf['score'] * nf['weight'] for nf in NON_FINANCIAL_FACTORS)
+    return non_financial + account_counts * low, non_financial + account_counts * high
+
+
+_worker_simulation: Optional[_Simulation] = None
+
+
+def _init_worker(borrower_ids: Optional[List[int]], config_version: int, spec: StressSpec) -> None:
+    global _worker_simulation
+    db = SessionLocal()
+    try:
+        config = get_risk_config(db)
+        if config.version != config_version:
+            raise RuntimeError("Risk configuration changed while the stress test was starting")
+        _worker_simulation = _Simulation(load_account_columns(db, borrower_ids), config, borrower_ids, spec)
+    finally:
+        db.close()
+
+
+def _run_worker_chunk(seed: np.random.SeedSequence, draws: int) -> ChunkStats:
+    return _worker_simulation.run_chunk(seed, draws)
+
+
+def _percentile(histogram: np.ndarray, total: int, q: float) -> int:
+    return int(np.searchsorted(np.cumsum(histogram), q * total, side='left'))
+
+
+def run_stress_test(db: Session, borrower_ids: Optional[Sequence[int]], spec: StressSpec, draws: int,
+                    seed: int, chunk_size: Optional[int] = None, max_workers: Optional[int] = None,
+                    include_borrowers: bool = True) -> Dict[str, Any]:
+    """Run ``draws`` shocked scorings of the selected borrowers and summarise them.
+
+    A single chunk, or a single worker, runs inline; otherwise chunks are
+    spread over a ``spawn`` ProcessPoolExecutor whose workers each load the
+    accounts once.
+    """
+    started = time.perf_counter()
+    borrower_ids = list(borrower_ids) if borrower_ids is not None else None
+    config = get_risk_config(db)
+    accounts = load_account_columns(db, borrower_ids)
+    simulation = _Simulation(accounts, config, borrower_ids, spec)
+
+    chunk_size = max(1, min(chunk_size or DEFAULT_CHUNK_SIZE, MAX_CELLS_PER_CHUNK // max(len(accounts), 1)))
+    sizes = [min(chunk_size, draws - offset) for offset in range(0, draws, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    workers = min(max_workers or DEFAULT_WORKERS, len(sizes)) or 1
+
+    stats = ChunkStats(len(simulation.borrowers), spec.histogram_bins)
+    if workers == 1:
+        for chunk_seed, size in zip(seeds, sizes):
+            stats.merge(simulation.run_chunk(chunk_seed, size))
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(borrower_ids, config.version, spec)) as executor:
+            # map yields in submission order, which keeps the merge deterministic
+            for chunk_stats in executor.map(_run_worker_chunk, seeds, sizes):
+                stats.merge(chunk_stats)
+
+    n_borrowers = len(simulation.borrowers)
+    classifications = {}
+    for c, label in enumerate(CLASSIFICATION_LABELS):
+        counts = stats.portfolio_counts[c]
+        values = np.arange(n_borrowers + 1)
+        mean = float((counts * values).sum() / draws) if draws else 0.0
+        classifications[label] = {
+            'mean': mean,
+            'std': float(math.sqrt(max((counts * (values - mean) ** 2).sum() / draws, 0.0))) if draws else 0.0,
+            'p05': _percentile(counts, draws, 0.05),
+            'p50': _percentile(counts, draws, 0.50),
+            'p95': _percentile(counts, draws, 0.95),
+        }
+
+    result = {
+        'config_version': config.version,
+        'draws': draws,
+        'seed': seed,
+        'chunk_size': chunk_size,
+        'chunks': len(sizes),
+        'workers': workers,
+        'borrowers': n_borrowers,
+        'accounts': len(accounts),
+        'classifications': classifications,
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+    }
+    if include_borrowers:
+        std = np.sqrt(stats.m2 / stats.draws) if stats.draws else np.zeros(n_borrowers)
+        result['borrower_scores'] = [
+            {
+                'borrower_id': int(borrower_id),
+                'mean': float(stats.mean[i]),
+                'std': float(std[i]),
+                'min': float(stats.min[i]),
+                'max': float(stats.max[i]),
+                'classification_probabilities': {
+                    label: float(stats.class_counts[c, i] / draws) for c, label in enumerate(CLASSIFICATION_LABELS)
+                },
+                'histogram': {
+                    'low': float(simulation.lows[i]),
+                    'high': float(simulation.highs[i]),
+                    'counts': stats.histogram[i].tolist(),
+                },
+            }
+            for i, borrower_id in enumerate(simulation.borrowers.tolist())
+        ]
+    return result
@@ -0,0 +1,287 @@
+"""
+Background jobs: trading account uploads and batch scoring runs.
+
+The request handler streams an upload to ``UPLOAD_STAGING_DIR``, records an
+``upload_jobs`` row and returns its id; a thread pool of
+``UPLOAD_JOB_WORKERS`` then runs the chunked ingestion from the staged file.
+Each chunk's progress is committed together with its rows, so a job
+interrupted by a crash resumes after the last committed chunk when any API
+process next starts. A worker claims a job with a conditional UPDATE, which
+keeps two processes from running it at once; running jobs whose heartbeat is
+older than ``UPLOAD_JOB_STALE_SECONDS`` are considered abandoned.
+
+A batch scoring job stores its borrower selection and options, and runs on
+the same pool and heartbeat. A restarted batch runs again from the start;
+borrowers it already scored are still current and are skipped.
+"""
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+from models.database import SessionLocal
+from models.upload_job import UploadJob
+from services.batch_scoring import DEFAULT_CHUNK_SIZE as BATCH_CHUNK_SIZE, resolve_borrower_ids, run_batch
+from services.ingestion import (
+    INGEST_CHUNK_SIZE, IngestionError, IngestionReport, estimate_rows, ingest_trading_accounts, reader_for,
+    upload_summary,
+)
+from services.rescoring import rescore_borrowers
+
+logger = logging.getLogger(__name__)
+
+STAGING_DIR = os.getenv("UPLOAD_STAGING_DIR", "./upload-staging")
+JOB_WORKERS = int(os.getenv("UPLOAD_JOB_WORKERS", "2"))
+STALE_SECONDS = float(os.getenv("UPLOAD_JOB_STALE_SECONDS", "300"))
+
+_jobs = UploadJob.__table__
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="upload-job")
+        return _executor
+
+
+def stage_upload(db: Session, file: BinaryIO, filename: str) -> UploadJob:
+    """Copy an upload to the staging directory and queue a job for it."""
+    extension = os.path.splitext(filename.lower())[1]
+    reader_for(filename)  # reject unsupported types before staging anything
+    job = UploadJob(
+        status='queued', filename=filename, chunk_size=INGEST_CHUNK_SIZE,
+        rows_read=0, rows_inserted=0, rows_updated=0, rows_unchanged=0, rows_rejected=0, chunks_committed=0,
+        errors_truncated=False, created_at=datetime.utcnow(),
+    )
+    db.add(job)
+    db.flush()
+    os.makedirs(STAGING_DIR, exist_ok=True)
+    path = os.path.join(STAGING_DIR, f"upload-job-{job.id}{extension}")
+    with open(path, 'wb') as staged:
+        shutil.copyfileobj(file, staged, 1 << 20)
+    job.staged_path = path
+    job.total_rows = estimate_rows(path)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def queue_batch(db: Session, borrower_ids: Optional[List[int]] = None, name_contains: Optional[str] = None,
+                period_from: Optional[date] = None, period_to: Optional[date] = None,
+                chunk_size: Optional[int] = None, max_workers: Optional[int] = None) -> UploadJob:
+    """Record a batch scoring job; the selection is resolved when it runs."""
+    job = UploadJob(
+        kind='batch_scoring', status='queued', chunk_size=chunk_size or BATCH_CHUNK_SIZE,
+        rows_read=0, rows_inserted=0, rows_updated=0, rows_unchanged=0, rows_rejected=0, chunks_committed=0,
+        errors_truncated=False, created_at=datetime.utcnow(),
+        parameters={
+            'borrower_ids': borrower_ids,
+            'name_contains': name_contains,
+            'period_from': period_from.isoformat() if period_from else None,
+            'period_to': period_to.isoformat() if period_to else None,
+            'max_workers': max_workers,
+        },
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def submit(job_id: int) -> None:
+    _get_executor().submit(run_job, job_id)
+
+
+def _claim(db: Session, job_id: int) -> bool:
+    now = datetime.utcnow()
+    result = db.execute(
+        update(_jobs)
+        .where(_jobs.c.id == job_id)
+        .where(or_(
+            _jobs.c.status == 'queued',
+            (_jobs.c.status == 'running') & (_jobs.c.heartbeat_at < now - timedelta(seconds=STALE_SECONDS)),
+        ))
+        .values(status='running', heartbeat_at=now)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def _resume_report(job: UploadJob) -> IngestionReport:
+    report = IngestionReport()
+    report.rows_read = job.rows_read
+    report.rows_inserted = job.rows_inserted
+    report.rows_updated = job.rows_updated
+    report.rows_unchanged = job.rows_unchanged
+    report.rows_rejected = job.rows_rejected
+    report.errors = list(job.errors or [])
+    report.errors_truncated = job.errors_truncated
+    report.chunks = job.chunks_committed
+    return report
+
+
+def _finish(db: Session, job_id: int, status: str, message: Optional[str] = None,
+            result: Optional[Dict[str, Any]] = None) -> None:
+    db.rollback()
+    job = db.get(UploadJob, job_id)
+    job.status = status
+    job.message = message
+    job.result = result
+    job.finished_at = datetime.utcnow()
+    if job.staged_path and os.path.exists(job.staged_path):
+        os.remove(job.staged_path)
+    db.commit()
+
+
+def run_job(job_id: int) -> None:
+    """Run a claimed job; an upload resumes after its committed chunks."""
+    db = SessionLocal()
+    try:
+        if not _claim(db, job_id):
+            return
+        job = db.get(UploadJob, job_id)
+        if job.started_at is None:
+            job.started_at = datetime.utcnow()
+            db.commit()
+        if job.kind == 'batch_scoring':
+            _run_batch(db, job)
+            return
+
+        def record_progress(report: IngestionReport) -> None:
+            db.execute(
+                update(_jobs).where(_jobs.c.id == job_id).values(
+                    rows_read=report.rows_read,
+                    rows_inserted=report.rows_inserted,
+                    rows_updated=report.rows_updated,
+                    rows_unchanged=report.rows_unchanged,
+                    rows_rejected=report.rows_rejected,
+                    chunks_committed=report.chunks,
+                    errors=report.errors,
+                    errors_truncated=report.errors_truncated,
+                    heartbeat_at=datetime.utcnow(),
+                )
+            )
+
+        try:
+            with open(job.staged_path, 'rb') as staged:
+                report = ingest_trading_accounts(
+                    db, staged, job.filename, chunk_size=job.chunk_size,
+                    report=_resume_report(job), skip_chunks=job.chunks_committed, on_chunk=record_progress,
+                )
+        except IngestionError as e:
+            _finish(db, job_id, 'failed', str(e))
+            return
+        except Exception as e:
+            logger.exception("Upload job %s failed", job_id)
+            _finish(db, job_id, 'failed', f"Error processing file: {str(e)}")
+            return
+        _finish(db, job_id, 'succeeded', upload_summary(report))
+    finally:
+        db.close()
+    # The rows are committed whether or not their scorecards can be patched
+    try:
+        rescore_borrowers(report.borrower_ids)
+    except Exception:
+        logger.exception("Rescoring after upload job %s failed", job_id)
+
+
+def _run_batch(db: Session, job: UploadJob) -> None:
+    job_id = job.id
+    parameters = dict(job.parameters or {})
+
+    def record_progress(totals: Dict[str, int]) -> None:
+        db.execute(
+            update(_jobs).where(_jobs.c.id == job_id).values(
+                rows_read=totals['borrowers_scored'],
+                rows_inserted=totals['scorecards_written'],
+                rows_unchanged=totals['borrowers_scored'] - totals['scorecards_written'],
+                heartbeat_at=datetime.utcnow(),
+            )
+        )
+        db.commit()
+
+    try:
+        borrower_ids = resolve_borrower_ids(
+            db,
+            borrower_ids=parameters.get('borrower_ids'),
+            name_contains=parameters.get('name_contains'),
+            period_from=date.fromisoformat(parameters['period_from']) if parameters.get('period_from') else None,
+            period_to=date.fromisoformat(parameters['period_to']) if parameters.get('period_to') else None,
+        )
+        db.execute(update(_jobs).where(_jobs.c.id == job_id).values(total_rows=len(borrower_ids)))
+        db.commit()
+        result = run_batch(db, borrower_ids, chunk_size=job.chunk_size, max_workers=parameters.get('max_workers'),
+                           on_chunk=record_progress)
+    except Exception as e:
+        logger.exception("Batch scoring job %s failed", job_id)
+        _finish(db, job_id, 'failed', f"Error running batch scoring: {str(e)}")
+        return
+    _finish(db, job_id, 'succeeded',
+            f"Scored {result['borrowers_scored']} borrowers; {result['scorecards_written']} new scorecards, "
+            f"{result['unchanged']} unchanged", result)
+
+
+def resume_jobs() -> int:
+    """Queue waiting and abandoned jobs; returns how many were found.
+
+    A running job whose heartbeat is still fresh may belong to another live
+    process or to this one before a quick restart, so it is retried once
+    its heartbeat would have gone stale.
+    """
+    db = SessionLocal()
+    try:
+        jobs = db.execute(
+            select(_jobs.c.id, _jobs.c.status, _jobs.c.heartbeat_at)
+            .where(_jobs.c.status.in_(('queued', 'running')))
+            .order_by(_jobs.c.id)
+        ).all()
+    finally:
+        db.close()
+    now = datetime.utcnow()
+    for job_id, status, heartbeat_at in jobs:
+        wait = 0.0
+        if status == 'running' and heartbeat_at is not None:
+            wait = (heartbeat_at + timedelta(seconds=STALE_SECONDS) - now).total_seconds()
+        if wait > 0:
+            timer = threading.Timer(wait + 1, submit, [job_id])
+            timer.daemon = True
+            timer.start()
+        else:
+            submit(job_id)
+    return len(jobs)
+
+
+def job_status(job: UploadJob) -> Dict[str, Any]:
+    """The job's row plus derived progress and throughput."""
+    end = job.finished_at or datetime.utcnow()
+    elapsed = (end - job.started_at).total_seconds() if job.started_at else 0.0
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'filename': job.filename,
+        'total_rows': job.total_rows,
+        'rows_read': job.rows_read,
+        'rows_inserted': job.rows_inserted,
+        'rows_updated': job.rows_updated,
+        'rows_unchanged': job.rows_unchanged,
+        'rows_rejected': job.rows_rejected,
+        'progress': min(job.rows_read / job.total_rows, 1.0) if job.total_rows else None,
+        'rows_per_second': round(job.rows_read / elapsed, 1) if elapsed > 0 else None,
+        'errors': sorted(job.errors or [], key=lambda error: error['row']),
+        'errors_truncated': job.errors_truncated,
+        'message': job.message,
+        'result': job.result,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
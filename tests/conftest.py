@@ -0,0 +1,82 @@
+"""
+Tests run against a throwaway SQLite database migrated with Alembic.
+
+DATABASE_URL is set here, before any test module imports models.database,
+so the app's sync and async engines both point at it.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+WORKDIR = tempfile.mkdtemp(prefix='scorecard-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORKDIR, 'test.db')}"
+
+
+def migrate(database_url: str, revision: str = 'head') -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    # alembic/env.py reads the target database from DATABASE_URL
+    previous = os.environ['DATABASE_URL']
+    os.environ['DATABASE_URL'] = database_url
+    try:
+        config = Config(str(ROOT / 'alembic.ini'))
+        config.set_main_option('script_location', str(ROOT / 'alembic'))
+        command.upgrade(config, revision)
+    finally:
+        os.environ['DATABASE_URL'] = previous
+
+
+@pytest.fixture(scope='session')
+def database():
+    migrate(os.environ['DATABASE_URL'])
+    return os.environ['DATABASE_URL']
+
+
+@pytest.fixture
+def db(database):
+    """A session on the migrated database; every table is emptied afterwards."""
+    from sqlalchemy import MetaData
+    from models.database import SessionLocal, engine
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        # The models span several declarative bases; reflect to get every table.
+        # The borrower search index is kept in step by triggers on borrowers.
+        metadata = MetaData()
+        metadata.reflect(engine)
+        with engine.begin() as connection:
+            for table in reversed(metadata.sorted_tables):
+                if table.name != 'alembic_version' and not table.name.startswith('borrowers_fts'):
+                    connection.execute(table.delete())
+
+
+@pytest.fixture
+def client(db):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def portfolio(db):
+    """A small synthetic portfolio with zero denominators, seeded into ``db``."""
+    from benchmarks.synthetic_portfolio import generate_portfolio, seed_database
+    from services.risk_config import invalidate_risk_config
+
+    portfolio = generate_portfolio(500, n_factors=4, accounts_per_borrower=5, seed=7)
+    seed_database(db, portfolio)
+    # The factors are inserted without bumping the config version
+    invalidate_risk_config()
+    yield portfolio
+    invalidate_risk_config()
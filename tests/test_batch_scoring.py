@@ -0,0 +1,46 @@
+import time
+
+import numpy as np
+
+from models.scorecard import Scorecard
+
+
+def wait_for_job(client, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f'/api/v1/jobs/{job_id}').json()
+        if job['status'] not in ('queued', 'running') or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def test_batch_is_queued_and_polled_as_a_job(client, db, portfolio):
+    response = client.post('/api/v1/scorecards/batch', json={'whole_portfolio': True, 'max_workers': 1})
+
+    assert response.status_code == 202
+    queued = response.json()
+    assert queued['kind'] == 'batch_scoring'
+    job = wait_for_job(client, queued['id'])
+    borrowers = len(np.unique(portfolio.borrower_ids))
+    assert job['status'] == 'succeeded', job['message']
+    assert (job['total_rows'], job['rows_read'], job['rows_inserted']) == (borrowers, borrowers, borrowers)
+    assert job['result']['scorecards_written'] == borrowers
+    assert db.query(Scorecard).count() == borrowers
+
+
+def test_rerun_of_unchanged_portfolio_writes_nothing(client, db, portfolio):
+    selection = {'borrower_ids': [1, 2, 3], 'max_workers': 1, 'chunk_size': 2}
+    wait_for_job(client, client.post('/api/v1/scorecards/batch', json=selection).json()['id'])
+
+    job = wait_for_job(client, client.post('/api/v1/scorecards/batch', json=selection).json()['id'])
+
+    assert job['status'] == 'succeeded', job['message']
+    assert (job['rows_read'], job['rows_inserted'], job['rows_unchanged']) == (3, 0, 3)
+    assert job['result']['chunks'] == 2
+    assert db.query(Scorecard).count() == 3
+
+
+def test_batch_needs_exactly_one_selection(client, db):
+    response = client.post('/api/v1/scorecards/batch', json={'borrower_ids': [1], 'whole_portfolio': True})
+
+    assert response.status_code == 400
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from services.calculation_service import CalculationService
+from services.formula import FormulaError, compile_formula
+
+
+@pytest.mark.parametrize('formula, values, expected', [
+    ('total_assets / total_liabilities', {'total_assets': 300, 'total_liabilities': 150}, 2.0),
+    ('(sales - purchases) / sales', {'sales': 200, 'purchases': 50}, 0.75),
+    ('-inventory + 2.5 * sales', {'inventory': 1, 'sales': 2}, 4.0),
+    ('+sales - -purchases', {'sales': 1, 'purchases': 2}, 3.0),
+    ('1e3 * sales', {'sales': 2}, 2000.0),
+])
+def test_allowed_constructs(formula, values, expected):
+    assert compile_formula(formula).evaluate(values) == pytest.approx(expected)
+
+
+def test_variables_are_the_referenced_fields_in_order():
+    compiled = compile_formula('total_liabilities / total_assets + sales')
+    assert compiled.variables == ('sales', 'total_assets', 'total_liabilities')
+    assert compiled(1.0, 4.0, 2.0) == pytest.approx(1.5)
+
+
+@pytest.mark.parametrize('formula', [
+    'sales ** 2',
+    'sales // 2',
+    'sales % 2',
+    'sales << 1',
+    '~sales',
+    'not sales',
+])
+def test_rejected_operators(formula):
+    with pytest.raises(FormulaError, match='not allowed'):
+        compile_formula(formula)
+
+
+@pytest.mark.parametrize('formula', [
+    '__import__("os").system("true")',
+    'abs(sales)',
+    'sales.real',
+    'sales.__class__',
+    '[sales][0]',
+    'sales if sales else 1',
+    'sales < purchases',
+    'sales and purchases',
+    'lambda: sales',
+    '(sales := 1)',
+    '{sales: 1}',
+    'f"{sales}"',
+])
+def test_rejected_elements(formula):
+    with pytest.raises(FormulaError, match='Unsafe formula element'):
+        compile_formula(formula)
+
+
+@pytest.mark.parametrize('formula, message', [
+    ('', 'empty'),
+    ('   ', 'empty'),
+    ('sales +', 'syntax'),
+    ('sales; purchases', 'syntax'),
+    ('borrower_id / sales', 'Unknown variable'),
+    ('__builtins__', 'Unknown variable'),
+    ('"sales"', 'Constant'),
+    ('True * sales', 'Constant'),
+    ('1j * sales', 'Constant'),
+])
+def test_invalid_formulas(formula, message):
+    with pytest.raises(FormulaError, match=message):
+        compile_formula(formula)
+
+
+def test_zero_division_yields_zero():
+    compiled = compile_formula('total_assets / total_liabilities')
+    assert compiled.evaluate({'total_assets': 10, 'total_liabilities': 0}) == 0.0
+    assert CalculationService(None).calculate_ratio({'sales': 5, 'purchases': 0}, 'sales / purchases') == 0.0
+
+
+def test_zero_division_yields_zero_column_wise():
+    compiled = compile_formula('sales / purchases + 1')
+    result = compiled.evaluate_columns({
+        'sales': np.array([4.0, 4.0, 0.0]),
+        'purchases': np.array([2.0, 0.0, 0.0]),
+    })
+    # Any zero denominator zeroes the whole result, as in evaluate
+    assert result.tolist() == [3.0, 0.0, 0.0]
+
+
+def test_column_wise_matches_row_wise():
+    compiled = compile_formula('(sales - purchases) / (total_assets - total_liabilities) * inventory')
+    rng = np.random.default_rng(0)
+    columns = {name: rng.integers(-3, 4, size=50).astype(float) for name in compiled.variables}
+    expected = [compiled.evaluate({name: columns[name][i] for name in columns}) for i in range(50)]
+    assert compiled.evaluate_columns(columns).tolist() == pytest.approx(expected)
+
+
+def test_missing_value():
+    with pytest.raises(FormulaError, match='Missing value'):
+        compile_formula('sales / purchases').evaluate({'sales': 1})
@@ -0,0 +1,174 @@
+import io
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from conftest import WORKDIR, migrate
+from models.entities import Borrower, TradingAccount
+from services.ingestion import account_content_hash, ingest_trading_accounts
+
+HEADER = "borrower_id,sales,purchases,total_assets,total_liabilities,inventory,period_start_date,period_end_date\n"
+
+
+def upload(db, *rows, chunk_size=1000):
+    csv = HEADER + ''.join(row + '\n' for row in rows)
+    return ingest_trading_accounts(db, io.BytesIO(csv.encode()), 'accounts.csv', chunk_size=chunk_size)
+
+
+def accounts(db):
+    return db.query(TradingAccount).order_by(TradingAccount.id).all()
+
+
+@pytest.fixture
+def borrower(db):
+    borrower = Borrower(name='Acme Trading')
+    db.add(borrower)
+    db.commit()
+    return borrower.id
+
+
+def test_new_periods_are_inserted(db, borrower):
+    report = upload(db, f"{borrower},100,50,400,200,30,2024-01-01,2024-03-31",
+                    f"{borrower},120,60,420,210,35,2024-04-01,2024-06-30")
+
+    assert (report.rows_inserted, report.rows_updated, report.rows_unchanged) == (2, 0, 0)
+    assert report.borrower_ids == {borrower}
+    rows = accounts(db)
+    assert [row.sales for row in rows] == [100, 120]
+    assert rows[0].content_hash == account_content_hash({
+        'sales': 100, 'purchases': 50, 'total_assets': 400, 'total_liabilities': 200, 'inventory': 30,
+    })
+
+
+def test_changed_figures_update_the_existing_period(db, borrower):
+    upload(db, f"{borrower},100,50,400,200,30,2024-01-01,2024-03-31")
+    original = accounts(db)[0]
+    original_id, original_hash = original.id, original.content_hash
+
+    report = upload(db, f"{borrower},150,50,400,200,30,2024-01-01,2024-03-31")
+
+    assert (report.rows_inserted, report.rows_updated, report.rows_unchanged) == (0, 1, 0)
+    assert report.borrower_ids == {borrower}
+    db.expire_all()
+    [updated] = accounts(db)
+    assert updated.id == original_id
+    assert updated.sales == 150
+    assert updated.content_hash != original_hash
+
+
+def test_unchanged_rows_are_skipped(db, borrower):
+    row = f"{borrower},100,50,400,200,30,2024-01-01,2024-03-31"
+    upload(db, row)
+
+    report = upload(db, row)
+
+    assert (report.rows_inserted, report.rows_updated, report.rows_unchanged) == (0, 0, 1)
+    # Nothing changed, so nothing needs rescoring
+    assert report.borrower_ids == set()
+    assert len(accounts(db)) == 1
+
+
+def test_later_row_for_the_same_period_wins_within_a_chunk(db, borrower):
+    report = upload(db, f"{borrower},100,50,400,200,30,2024-01-01,2024-03-31",
+                    f"{borrower},999,50,400,200,30,2024-01-01,2024-03-31")
+
+    assert (report.rows_inserted, report.rows_rejected) == (1, 1)
+    [error] = report.errors
+    assert error['row'] == 2
+    assert 'Superseded' in error['message']
+    assert [row.sales for row in accounts(db)] == [999]
+
+
+def test_same_period_in_later_chunk_updates(db, borrower):
+    report = upload(db, f"{borrower},100,50,400,200,30,2024-01-01,2024-03-31",
+                    f"{borrower},999,50,400,200,30,2024-01-01,2024-03-31", chunk_size=1)
+
+    assert (report.rows_inserted, report.rows_updated, report.rows_rejected) == (1, 1, 0)
+    assert [row.sales for row in accounts(db)] == [999]
+
+
+def test_invalid_rows_are_reported_and_skipped(db, borrower):
+    report = upload(db, f"{borrower},abc,50,400,200,30,2024-01-01,2024-03-31",
+                    f"{borrower + 1000},100,50,400,200,30,2024-01-01,2024-03-31",
+                    f"{borrower},100,50,400,200,30,2024-01-01,2024-03-31")
+
+    assert (report.rows_inserted, report.rows_rejected) == (1, 2)
+    assert {(error['row'], error['column']) for error in report.errors} == {(2, 'sales'), (3, 'borrower_id')}
+
+
+def bulk_item(borrower, sales, start='2024-01-01', end='2024-03-31'):
+    return {'borrower_id': borrower, 'sales': sales, 'purchases': 50, 'total_assets': 400,
+            'total_liabilities': 200, 'inventory': 30, 'period_start_date': start, 'period_end_date': end}
+
+
+def test_bulk_rejects_existing_period_by_default(client, db, borrower):
+    client.post('/api/v1/trading_accounts/bulk', json=[bulk_item(borrower, 100)]).raise_for_status()
+
+    response = client.post('/api/v1/trading_accounts/bulk', json=[bulk_item(borrower, 150)])
+
+    assert response.status_code == 422
+    assert [row.sales for row in accounts(db)] == [100]
+
+
+def test_bulk_updates_changed_and_keeps_unchanged_periods(client, db, borrower):
+    first = client.post('/api/v1/trading_accounts/bulk', json=[
+        bulk_item(borrower, 100), bulk_item(borrower, 200, '2024-04-01', '2024-06-30'),
+    ]).json()
+
+    response = client.post('/api/v1/trading_accounts/bulk?on_conflict=update', json=[
+        bulk_item(borrower, 150),
+        bulk_item(borrower, 200, '2024-04-01', '2024-06-30'),
+        bulk_item(borrower, 300, '2024-07-01', '2024-09-30'),
+    ])
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body['created'], body['updated'], body['unchanged'], body['failed']) == (1, 1, 1, 0)
+    assert body['ids'][:2] == first['ids']
+    db.expire_all()
+    assert [row.sales for row in accounts(db)] == [150, 200, 300]
+
+
+def test_bulk_rejects_a_period_repeated_in_the_request(client, db, borrower):
+    response = client.post('/api/v1/trading_accounts/bulk?mode=partial', json=[
+        bulk_item(borrower, 100), bulk_item(borrower, 150),
+    ])
+
+    body = response.json()
+    assert (body['created'], body['failed']) == (1, 1)
+    assert body['errors'][0]['index'] == 1
+    assert [row.sales for row in accounts(db)] == [100]
+
+
+def test_migration_008_keeps_latest_duplicate_and_invalidates_scorecards(capsys):
+    database_url = f"sqlite:///{os.path.join(WORKDIR, 'migration_008.db')}"
+    migrate(database_url, '007')
+    engine = create_engine(database_url)
+    account = ("INSERT INTO trading_accounts (id, borrower_id, sales, purchases, total_assets, "
+               "total_liabilities, inventory, period_start_date, period_end_date) "
+               "VALUES (:id, :borrower_id, :sales, 0, 1, 1, 0, '2024-01-01', :end)")
+    scorecard = ("INSERT INTO scorecards (borrower_id, final_score, input_hash, config_version) "
+                 "VALUES (:borrower_id, 0.5, 'digest', 1)")
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO borrowers (id, name) VALUES (1, 'Duplicated'), (2, 'Clean')"))
+        connection.execute(text(account), [
+            {'id': 1, 'borrower_id': 1, 'sales': 100, 'end': '2024-03-31'},
+            {'id': 2, 'borrower_id': 1, 'sales': 200, 'end': '2024-03-31'},
+            {'id': 3, 'borrower_id': 1, 'sales': 300, 'end': '2024-06-30'},
+            {'id': 4, 'borrower_id': 2, 'sales': 400, 'end': '2024-03-31'},
+        ])
+        connection.execute(text(scorecard), [{'borrower_id': 1}, {'borrower_id': 2}])
+
+    # alembic.ini logs to stderr
+    migrate(database_url, '008')
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT id, sales FROM trading_accounts ORDER BY id")).all() == [
+            (2, 200), (3, 300), (4, 400),
+        ]
+        assert connection.execute(text(
+            "SELECT borrower_id, input_hash, config_version FROM scorecards ORDER BY borrower_id"
+        )).all() == [(1, None, None), (2, 'digest', 1)]
+    assert "Deleting 1 duplicate trading accounts of 1 borrowers" in capsys.readouterr().err
+    engine.dispose()
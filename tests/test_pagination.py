@@ -0,0 +1,61 @@
+import base64
+import json
+from datetime import date
+
+import pytest
+
+from api.pagination import encode_cursor
+from models.entities import Borrower, TradingAccount
+
+
+def raw_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+@pytest.fixture
+def accounts(db):
+    db.add(Borrower(id=1, name='Acme Trading'))
+    for month in range(1, 6):
+        db.add(TradingAccount(borrower_id=1, sales=100 * month, purchases=50, total_assets=400,
+                              total_liabilities=200, inventory=30, period_start_date=date(2024, month, 1),
+                              period_end_date=date(2024, month, 28)))
+    db.commit()
+
+
+def test_pages_follow_the_cursor(client, accounts):
+    seen = []
+    params = {'limit': 2, 'sort': 'period_end_date', 'order': 'desc'}
+    while True:
+        response = client.get('/api/v1/trading_accounts/', params=params)
+        assert response.status_code == 200
+        seen += [row['period_end_date'] for row in response.json()]
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+        params['cursor'] = cursor
+
+    assert seen == [f'2024-0{month}-28' for month in range(5, 0, -1)]
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64 json',
+    raw_cursor({'s': 'period_end_date', 'o': 'asc', 'v': 'abc', 'id': 1}),
+    raw_cursor({'s': 'period_end_date', 'o': 'asc', 'v': 20240101, 'id': 1}),
+    raw_cursor({'s': 'period_end_date', 'o': 'asc', 'v': '2024-02-30', 'id': 1}),
+    raw_cursor({'s': 'period_end_date', 'o': 'asc', 'v': '2024-01-28', 'id': 'x'}),
+    raw_cursor({'s': 'period_end_date', 'o': 'asc', 'id': 1}),
+    raw_cursor(['period_end_date', 'asc']),
+    # Issued for another sort order
+    encode_cursor('id', 'asc', 1, 1),
+])
+def test_invalid_cursors_are_rejected(client, accounts, cursor):
+    response = client.get('/api/v1/trading_accounts/', params={'sort': 'period_end_date', 'cursor': cursor})
+
+    assert response.status_code == 400
+    assert response.json()['detail'] == "Invalid cursor for this sort order"
+
+
+def test_range_filters(client, accounts):
+    response = client.get('/api/v1/trading_accounts/', params={'min_sales': 200, 'max_sales': 400})
+
+    assert [row['sales'] for row in response.json()] == [200, 300, 400]
@@ -0,0 +1,115 @@
+import math
+
+import numpy as np
+import pytest
+
+from services.rating_scale import RatingScaleError, compile_rating_scale
+
+SCALE = {
+    'high_risk': {'min': 0.0, 'max': 1.0, 'score': 0.2},
+    'medium_risk': {'min': 1.0, 'max': 2.0, 'score': 0.5},
+    # Gap between 2.0 and 3.0
+    'low_risk': {'min': 3.0, 'max': 5.0, 'score': 0.9},
+}
+
+
+def assert_paths_agree(scale, value, label, score):
+    """band_for and score_array must give the same answer for one value."""
+    assert scale.band_for(value) == (label, score)
+    assert scale.score_array(np.array([value])).tolist() == [score]
+    assert scale.score_for(value) == score
+
+
+@pytest.mark.parametrize('value, label, score', [
+    (0.0, 'high_risk', 0.2),
+    (0.5, 'high_risk', 0.2),
+    # A boundary shared by adjacent bands belongs to the lower one
+    (1.0, 'high_risk', 0.2),
+    (math.nextafter(1.0, 2.0), 'medium_risk', 0.5),
+    (2.0, 'medium_risk', 0.5),
+    (2.5, None, 0.0),
+    (3.0, 'low_risk', 0.9),
+    (5.0, 'low_risk', 0.9),
+    (math.nextafter(5.0, 6.0), None, 0.0),
+    (-0.1, None, 0.0),
+    (float('nan'), None, 0.0),
+    (float('inf'), None, 0.0),
+    (float('-inf'), None, 0.0),
+])
+def test_band_edges_and_gaps(value, label, score):
+    assert_paths_agree(compile_rating_scale(SCALE), value, label, score)
+
+
+@pytest.mark.parametrize('value, label, score', [
+    (0.5, 'wide', 0.2),
+    # The overlap (1.0, 2.0] stays with the lower band, including the shared point 2.0
+    (1.5, 'wide', 0.2),
+    (2.0, 'wide', 0.2),
+    (2.5, 'overlapping', 0.7),
+    (3.0, 'overlapping', 0.7),
+])
+def test_overlapping_bands_keep_the_lower_band(value, label, score):
+    scale = compile_rating_scale({
+        'overlapping': {'min': 1.0, 'max': 3.0, 'score': 0.7},
+        'wide': {'min': 0.0, 'max': 2.0, 'score': 0.2},
+    })
+    assert_paths_agree(scale, value, label, score)
+
+
+def test_band_inside_a_lower_band_is_dropped():
+    scale = compile_rating_scale({
+        'outer': {'min': 0.0, 'max': 10.0, 'score': 0.4},
+        'inner': {'min': 2.0, 'max': 3.0, 'score': 0.8},
+    })
+    assert scale.labels == ('outer',)
+    assert_paths_agree(scale, 2.5, 'outer', 0.4)
+
+
+def test_equal_minimums_keep_declaration_order():
+    scale = compile_rating_scale({
+        'first': {'min': 0.0, 'max': 1.0, 'score': 0.1},
+        'second': {'min': 0.0, 'max': 2.0, 'score': 0.9},
+    })
+    assert_paths_agree(scale, 1.0, 'first', 0.1)
+    assert_paths_agree(scale, 1.5, 'second', 0.9)
+
+
+def test_point_band():
+    scale = compile_rating_scale({'exact': {'min': 1.0, 'max': 1.0, 'score': 1.0}})
+    assert_paths_agree(scale, 1.0, 'exact', 1.0)
+    assert_paths_agree(scale, 0.999, None, 0.0)
+
+
+@pytest.mark.parametrize('rating_scale', [None, {}])
+def test_empty_scale_rates_everything_zero(rating_scale):
+    assert_paths_agree(compile_rating_scale(rating_scale), 1.0, None, 0.0)
+
+
+def test_vector_path_matches_scalar_path_over_many_values():
+    scale = compile_rating_scale(SCALE)
+    edges = [bound for band in SCALE.values() for bound in (band['min'], band['max'])]
+    values = np.concatenate([
+        np.linspace(-1.0, 6.0, 701),
+        edges,
+        [math.nextafter(edge, -math.inf) for edge in edges],
+        [math.nextafter(edge, math.inf) for edge in edges],
+        [np.nan, np.inf, -np.inf],
+    ])
+
+    assert scale.score_array(values).tolist() == [scale.band_for(value)[1] for value in values.tolist()]
+    labels = [None if i < 0 else scale.labels[i] for i in scale.band_indices(values).tolist()]
+    assert labels == [scale.band_for(value)[0] for value in values.tolist()]
+
+
+@pytest.mark.parametrize('bounds, message', [
+    ({'min': float('nan'), 'max': 1.0, 'score': 0.5}, 'NaN'),
+    ({'min': 0.0, 'max': float('nan'), 'score': 0.5}, 'NaN'),
+    ({'min': 0.0, 'max': 1.0, 'score': float('nan')}, 'NaN'),
+    ({'min': 2.0, 'max': 1.0, 'score': 0.5}, 'greater than max'),
+    ({'max': 1.0, 'score': 0.5}, "numeric 'min'"),
+    ({'min': 'low', 'max': 1.0, 'score': 0.5}, "numeric 'min'"),
+    ('not a band', "numeric 'min'"),
+])
+def test_malformed_bands_are_rejected(bounds, message):
+    with pytest.raises(RatingScaleError, match=message):
+        compile_rating_scale({'band': bounds})
@@ -0,0 +1,64 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from models.scorecard import Scorecard
+from services import rescoring
+from services.calculation_service import CalculationService
+from services.rescoring import rescore_borrowers
+
+
+def latest_score(db, borrower_id):
+    db.expire_all()
+    return (db.query(Scorecard).filter(Scorecard.borrower_id == borrower_id)
+            .order_by(Scorecard.id.desc()).first())
+
+
+def test_account_writes_rescore_after_the_response(client, db, portfolio):
+    service = CalculationService(db)
+    before = service.calculate_scorecard(1)
+    account = {'borrower_id': 1, 'sales': 1.0, 'purchases': 1e9, 'total_assets': 1.0,
+               'total_liabilities': 1e9, 'inventory': 0.0,
+               'period_start_date': '1990-01-01', 'period_end_date': '1990-12-31'}
+
+    response = client.post('/api/v1/trading_accounts/', json=account)
+
+    assert response.status_code == 200
+    patched = latest_score(db, 1)
+    assert patched.id == before.id
+    assert patched.final_score == pytest.approx(service.compute_final_score(1))
+    # The patched scorecard matches the new accounts, so calculate reuses it
+    assert service.calculate_scorecard(1).id == before.id
+
+
+def test_rescore_failure_does_not_fail_the_committed_write(db, portfolio, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("rescoring failed")
+    monkeypatch.setattr('api.endpoints.trading_accounts.rescore_borrowers', fail)
+    account = {'borrower_id': 1, 'sales': 1.0, 'purchases': 1.0, 'total_assets': 1.0,
+               'total_liabilities': 1.0, 'inventory': 0.0,
+               'period_start_date': '1990-01-01', 'period_end_date': '1990-12-31'}
+
+    client = TestClient(app, raise_server_exceptions=False)
+
+    response = client.post('/api/v1/trading_accounts/', json=account)
+
+    # Rescoring runs once the response is sent, so the committed write still succeeds
+    assert response.status_code == 200
+    retry = client.post('/api/v1/trading_accounts/', json=account)
+    assert retry.status_code == 409
+
+
+def test_borrowers_are_rescored_in_chunks(db, portfolio, monkeypatch):
+    service = CalculationService(db)
+    for borrower_id in range(1, 6):
+        service.calculate_scorecard(borrower_id)
+    batches = []
+    latest = rescoring.latest_scorecards
+    monkeypatch.setattr(rescoring, 'RESCORE_CHUNK_SIZE', 2)
+    monkeypatch.setattr(rescoring, 'latest_scorecards',
+                        lambda session, borrower_ids=None: batches.append(list(borrower_ids)) or
+                        latest(session, borrower_ids))
+
+    assert rescore_borrowers([5, 3, 1, 2, 4, 3]) == 5
+    assert batches == [[1, 2], [3, 4], [5]]
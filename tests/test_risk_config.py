@@ -0,0 +1,55 @@
+import logging
+from datetime import date
+
+import pytest
+
+from models.entities import Borrower, TradingAccount
+from models.risk_factors import RiskFactor
+from services.calculation_service import CalculationService
+from services.risk_config import get_risk_config, invalidate_risk_config
+from services.scoring_engine import NON_FINANCIAL_FACTORS, score_portfolio
+
+SCALE = {'any': {'min': 0.0, 'max': 100.0, 'score': 1.0}}
+
+
+@pytest.fixture
+def factors(db):
+    """One factor that compiles, and two stored before their formula or scale became invalid."""
+    valid = RiskFactor(name='Current Ratio', factor_type='financial', formula='total_assets / total_liabilities',
+                       weight=0.5, rating_scale=SCALE)
+    bad_formula = RiskFactor(name='Squared Sales', factor_type='financial', formula='sales ** 2',
+                             weight=0.2, rating_scale=SCALE)
+    bad_scale = RiskFactor(name='Inverted Scale', factor_type='financial', formula='sales / purchases',
+                           weight=0.1, rating_scale={'band': {'min': 2.0, 'max': 1.0, 'score': 1.0}})
+    db.add_all([valid, bad_formula, bad_scale])
+    db.commit()
+    invalidate_risk_config()
+    yield valid, bad_formula, bad_scale
+    invalidate_risk_config()
+
+
+def test_factors_that_do_not_compile_are_skipped_and_logged(db, factors, caplog):
+    valid, bad_formula, bad_scale = factors
+
+    with caplog.at_level(logging.ERROR, logger='services.risk_config'):
+        config = get_risk_config(db)
+
+    assert [factor.id for factor in config.factors] == [valid.id]
+    assert config.skipped == (bad_formula.id, bad_scale.id)
+    messages = [record.getMessage() for record in caplog.records]
+    assert any('Squared Sales' in message and 'not allowed' in message for message in messages)
+    assert any('Inverted Scale' in message and 'greater than max' in message for message in messages)
+
+
+def test_scoring_continues_without_the_skipped_factors(db, factors):
+    db.add(Borrower(id=1, name='Acme Trading'))
+    db.add(TradingAccount(borrower_id=1, sales=100, purchases=50, total_assets=400, total_liabilities=200,
+                          inventory=30, period_start_date=date(2024, 1, 1), period_end_date=date(2024, 12, 31)))
+    db.commit()
+
+    score = CalculationService(db).compute_final_score(1)
+
+    # Only the valid factor's weight counts: ratio 2.0 rates 1.0
+    non_financial = sum(nf['score'] * nf['weight'] for nf in NON_FINANCIAL_FACTORS)
+    assert score == pytest.approx(0.5 + non_financial)
+    assert score_portfolio(db).scores_by_borrower() == {1: score}
@@ -0,0 +1,67 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from models.entities import Borrower, TradingAccount
+from models.risk_factors import RiskFactor
+from services.calculation_service import CalculationService
+from services.risk_config import get_risk_config, invalidate_risk_config
+from services.scoring_engine import load_account_columns, score_accounts
+
+EDGE_BORROWER = 100001
+# Ratios of sales / total_assets for the edge borrower's accounts, hitting
+# every band edge, the gap between b and c, and a zero denominator
+EDGE_ACCOUNTS = [(50, 100), (100, 100), (150, 100), (200, 100), (300, 100), (10, 0), (0, 100)]
+EDGE_SCALE = {
+    'a': {'min': 0.0, 'max': 0.5, 'score': 0.3},
+    'b': {'min': 0.5, 'max': 1.0, 'score': 0.6},
+    'c': {'min': 2.0, 'max': 3.0, 'score': 0.9},
+}
+
+
+@pytest.fixture
+def edge_portfolio(db, portfolio):
+    """The synthetic portfolio plus a factor and borrower built to land on band edges."""
+    db.add(RiskFactor(name='Edge Factor', factor_type='financial', formula='sales / total_assets',
+                      weight=0.05, rating_scale=EDGE_SCALE))
+    db.add(Borrower(id=EDGE_BORROWER, name='Edge Cases'))
+    db.flush()
+    for year, (sales, total_assets) in enumerate(EDGE_ACCOUNTS):
+        db.add(TradingAccount(borrower_id=EDGE_BORROWER, sales=sales, purchases=sales, total_assets=total_assets,
+                              total_liabilities=0.0, inventory=0.0,
+                              period_start_date=date(2000 + year, 1, 1), period_end_date=date(2000 + year, 12, 31)))
+    db.commit()
+    invalidate_risk_config()
+    return portfolio
+
+
+def test_scalar_and_vectorized_scores_are_identical(db, edge_portfolio):
+    config = get_risk_config(db)
+    matrix = score_accounts(load_account_columns(db), config)
+    service = CalculationService(db)
+
+    # The synthetic portfolio has zero liabilities and inventory on about 1% of accounts
+    assert np.any(matrix.accounts.columns['total_liabilities'] == 0)
+    assert EDGE_BORROWER in matrix.borrower_ids
+    for row, borrower_id in enumerate(matrix.borrower_ids.tolist()):
+        _, factor_scores, factor_accounts = service.compute_factor_scores(borrower_id, config=config)
+        # Exact equality: both paths accumulate in the same order
+        assert factor_scores == matrix.contributions[row].tolist(), borrower_id
+        assert service.compute_final_score(borrower_id) == matrix.final_scores[row], borrower_id
+        assert factor_accounts == matrix.account_entries(row), borrower_id
+
+
+def test_band_edges_rate_the_same_both_ways(db, edge_portfolio):
+    config = get_risk_config(db)
+    [edge_factor] = [factor for factor in config.financial_factors if factor.name == 'Edge Factor']
+    matrix = score_accounts(load_account_columns(db, [EDGE_BORROWER]), config, [EDGE_BORROWER])
+    column = matrix.factor_ids.index(edge_factor.id)
+
+    entries = matrix.account_entries(0)[column]
+    # 0.5 belongs to the lower band, 1.5 falls in a gap and x / 0 rates as 0.0
+    assert [(entry['ratio'], entry['band']) for entry in entries] == [
+        (0.5, 'a'), (1.0, 'b'), (1.5, None), (2.0, 'c'), (3.0, 'c'), (0.0, 'a'), (0.0, 'a'),
+    ]
+    _, factor_scores, _ = CalculationService(db).compute_factor_scores(EDGE_BORROWER, config=config)
+    assert factor_scores[column] == matrix.contributions[0, column]
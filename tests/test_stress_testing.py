@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from services import stress_testing
+from services.stress_testing import StressSpec, run_stress_test
+
+SALES_SHOCK = {'sales': {'distribution': 'normal', 'mean': -0.1, 'std': 0.2}}
+
+
+def test_portfolio_wide_draws_are_chunked_by_portfolio_size(db, portfolio, monkeypatch):
+    # 500 accounts and 10k cells: at most 20 draws per chunk
+    monkeypatch.setattr(stress_testing, 'MAX_CELLS_PER_CHUNK', 10000)
+
+    result = run_stress_test(db, None, StressSpec(SALES_SHOCK), draws=100, seed=1,
+                             chunk_size=1000, max_workers=1)
+
+    assert result['chunk_size'] == 20
+    assert result['chunks'] == 5
+    assert result['accounts'] == len(portfolio)
+
+
+def test_per_account_draws_are_chunked_by_portfolio_size(db, portfolio, monkeypatch):
+    monkeypatch.setattr(stress_testing, 'MAX_CELLS_PER_CHUNK', 10000)
+
+    result = run_stress_test(db, None, StressSpec(SALES_SHOCK, per_account=True), draws=50, seed=1,
+                             chunk_size=1000, max_workers=1)
+
+    assert (result['chunk_size'], result['chunks']) == (20, 3)
+
+
+def test_chunked_run_counts_every_draw(db, portfolio, monkeypatch):
+    monkeypatch.setattr(stress_testing, 'MAX_CELLS_PER_CHUNK', 3000)
+
+    result = run_stress_test(db, None, StressSpec(SALES_SHOCK), draws=40, seed=3, max_workers=1)
+
+    assert (result['chunk_size'], result['chunks']) == (6, 7)
+    assert result['borrowers'] == len(np.unique(portfolio.borrower_ids))
+    assert all(sum(b['histogram']['counts']) == 40 for b in result['borrower_scores'])
+    means = [classification['mean'] for classification in result['classifications'].values()]
+    assert sum(means) == pytest.approx(result['borrowers'])